@@ -1,7 +1,31 @@
+import json
+import os
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from firebase_config import firebase_auth
+from firebase_config import firebase_auth as firebase_backend
+from cached_database import cached
+from pagination import current_cursor, pagination_controls, reset_pagination
+from session_data import SessionWriteTracker, cached_page_data
+from reports import FORMATS, MIME_TYPES, REPORTS, build_report_file, parquet_available, report_chunks
+
+# Rows of a generated report shown on the page
+REPORT_PREVIEW_ROWS = 100
+
+# Collection -> (tab label, fields shown by default)
+EXPLORER_COLLECTIONS = {
+    'users': ("👥 Users", ['name', 'email', 'role', 'location', 'availability', 'is_banned', 'created_at']),
+    'skills': ("🎯 Skills", ['name', 'category', 'users_offering', 'users_wanting', 'total_swaps', 'popularity_score']),
+    'user_skills': ("🤝 User Skills", ['user_id', 'skill_name', 'type', 'proficiency_level', 'is_active']),
+    'barter_requests': ("📋 Requests", ['sender_id', 'receiver_id', 'offered_skill_name', 'requested_skill_name', 'status', 'created_at']),
+    'transactions': ("🔄 Transactions", ['user1_id', 'user2_id', 'user1_skill', 'user2_skill', 'status', 'created_at']),
+    'reviews': ("⭐ Reviews", ['reviewer_id', 'reviewee_id', 'rating', 'title', 'is_public', 'created_at']),
+    'system_messages': ("📢 Messages", ['title', 'type', 'target_audience', 'is_active', 'show_until']),
+}
+EXPLORER_OPERATORS = ['==', '!=', '<', '<=', '>', '>=', 'in', 'not-in', 'array_contains', 'array_contains_any']
+
+# Shares cached entries and session page snapshots with main.py
+firebase_auth = SessionWriteTracker(cached(firebase_backend))
 
 def check_admin_access():
     """Check if current user is admin"""
@@ -27,24 +51,25 @@ def admin_dashboard():
     # Quick stats
     col1, col2, col3, col4 = st.columns(4)
     
-    # Get platform statistics
-    users_result = firebase_auth.get_public_users(1000)
-    total_users = len(users_result.get('users', [])) if users_result['success'] else 0
-    
-    skills_result = firebase_auth.get_all_skills()
-    total_skills = len(skills_result.get('skills', [])) if skills_result['success'] else 0
+    # Get platform statistics and recent users together
+    page_data = cached_page_data('admin_dashboard', (), ('users', 'skills', 'requests', 'stats'), lambda: firebase_auth.fetch_many({
+        'stats': ('get_platform_stats',),
+        'recent': ('get_recent_users', 5),
+    }))
+    stats_result = page_data['stats']
+    stats = stats_result['stats'] if stats_result['success'] else {}
     
     with col1:
-        st.metric("👥 Total Users", total_users)
+        st.metric("👥 Total Users", stats.get('users_total', 0))
     
     with col2:
-        st.metric("🎯 Total Skills", total_skills)
+        st.metric("🎯 Total Skills", stats.get('skills_total', 0))
     
     with col3:
-        st.metric("🔄 Active Swaps", "Coming Soon")
+        st.metric("🔄 Active Swaps", stats.get('active_swaps', 0))
     
     with col4:
-        st.metric("📋 Pending Reviews", "Coming Soon")
+        st.metric("📋 Pending Requests", stats.get('pending_requests', 0))
     
     st.markdown("---")
     
@@ -77,9 +102,9 @@ def admin_dashboard():
     st.markdown("---")
     st.subheader("📈 Recent Activity")
     
-    if users_result['success'] and users_result['users']:
-        recent_users = sorted(users_result['users'],
-                            key=lambda x: x.get('created_at', ''), reverse=True)[:5]
+    recent_result = page_data['recent']
+    if recent_result['success'] and recent_result['users']:
+        recent_users = recent_result['users']
         
         st.write("**🆕 Recent User Registrations:**")
         for user in recent_users:
@@ -91,8 +116,11 @@ def admin_users_management():
     
     st.subheader("👥 User Management")
     
-    # Get all users
-    users_result = firebase_auth.get_public_users(1000)
+    # Get the current page of users
+    cursor = current_cursor('admin_users_pager')
+    users_result = cached_page_data(
+        'admin_users', (cursor,), ('users',), lambda: {'users': firebase_auth.get_public_users(50, start_after=cursor, view='row')}
+    )['users']
     
     if users_result['success']:
         users = users_result['users']
@@ -185,6 +213,8 @@ def admin_users_management():
                                     st.rerun()
                                 else:
                                     st.error("Failed to remove admin privileges")
+            
+            pagination_controls('admin_users_pager', users_result['next_cursor'])
         else:
             st.info("No users found.")
     else:
@@ -204,14 +234,21 @@ def admin_system_messages():
             title = st.text_input("📝 Message Title", placeholder="e.g., Maintenance Notice")
             message = st.text_area("💬 Message Content", placeholder="Enter your platform-wide message...")
             message_type = st.selectbox("📂 Message Type", ["announcement", "maintenance", "feature_update", "warning"])
+            target_audience = st.selectbox("🎯 Audience", ["all", "users", "admins", "specific"])
+            target_user_ids = st.text_input("🆔 User IDs (comma separated, for specific)")
+            days_shown = st.number_input("⏳ Show for (days)", min_value=1, max_value=90, value=7)
             
             if st.form_submit_button("📤 Send Message", use_container_width=True):
                 if title and message:
                     admin_id = st.session_state.user['localId']
-                    result = firebase_auth.create_system_message(admin_id, title, message, message_type)
+                    result = firebase_auth.create_system_message(
+                        admin_id, title, message, message_type, target_audience,
+                        target_user_ids=[user_id.strip() for user_id in target_user_ids.split(',') if user_id.strip()],
+                        show_until=datetime.now() + timedelta(days=days_shown)
+                    )
                     
                     if result['success']:
-                        st.success("✅ Message sent to all users!")
+                        st.success(f"✅ Message sent to {target_audience}!")
                         st.rerun()
                     else:
                         st.error(f"❌ Failed to send message: {result['error']}")
@@ -220,7 +257,9 @@ def admin_system_messages():
     
     with col2:
         st.write("**Active Messages**")
-        messages_result = firebase_auth.get_active_messages()
+        messages_result = cached_page_data(
+            'admin_messages', (), ('messages',), lambda: {'messages': firebase_auth.get_active_messages()}
+        )['messages']
         
         if messages_result['success']:
             messages = messages_result['messages']
@@ -249,83 +288,114 @@ def admin_analytics():
     st.write("**📈 Platform Statistics**")
     
     # Get basic stats
-    users_result = firebase_auth.get_public_users(1000)
-    total_users = len(users_result.get('users', [])) if users_result['success'] else 0
-    
-    skills_result = firebase_auth.get_all_skills()
-    total_skills = len(skills_result.get('skills', [])) if skills_result['success'] else 0
+    stats_result = firebase_auth.get_platform_stats()
+    stats = stats_result['stats'] if stats_result['success'] else {}
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("👥 Total Users", total_users)
+        st.metric("👥 Total Users", stats.get('users_total', 0))
     
     with col2:
-        st.metric("🎯 Total Skills", total_skills)
+        st.metric("🎯 Total Skills", stats.get('skills_total', 0))
     
     with col3:
-        admin_count = len([u for u in users_result.get('users', []) if u.get('role') == 'admin']) if users_result['success'] else 0
-        st.metric("👑 Admins", admin_count)
+        st.metric("👑 Admins", stats.get('users_admin', 0))
     
     with col4:
-        banned_count = len([u for u in users_result.get('users', []) if u.get('is_banned')]) if users_result['success'] else 0
-        st.metric("🚫 Banned Users", banned_count)
+        st.metric("🚫 Banned Users", stats.get('users_banned', 0))
+    
+    if st.button("🔁 Recount Statistics"):
+        with st.spinner("Recounting..."):
+            rebuild_result = firebase_auth.rebuild_platform_stats()
+        if rebuild_result['success']:
+            st.success("✅ Statistics recounted!")
+            st.rerun()
+        else:
+            st.error(f"❌ Error: {rebuild_result['error']}")
     
     st.markdown("---")
     
     # Generate reports
     st.write("**📋 Generate Reports**")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([2, 1, 1])
     
     with col1:
-        if st.button("📊 User Activity Report", use_container_width=True):
-            if users_result['success']:
-                users_df = pd.DataFrame(users_result['users'])
-                
-                st.write("**User Statistics:**")
-                if not users_df.empty:
-                    # Select relevant columns
-                    display_columns = ['name', 'email', 'role', 'rating_avg', 'total_swaps', 'is_banned']
-                    available_columns = [col for col in display_columns if col in users_df.columns]
-                    st.dataframe(users_df[available_columns], use_container_width=True)
-                    
-                    # Download option
-                    csv = users_df.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Download User Report",
-                        data=csv,
-                        file_name=f"user_report_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
-                else:
-                    st.info("No user data available")
+        report = st.selectbox("📄 Report", list(REPORTS), format_func=lambda name: f"{name.title()} Report")
     
     with col2:
-        if st.button("🎯 Skills Report", use_container_width=True):
-            if skills_result['success']:
-                skills_df = pd.DataFrame(skills_result['skills'])
-                
-                st.write("**Skills Statistics:**")
-                if not skills_df.empty:
-                    # Select relevant columns
-                    display_columns = ['name', 'category', 'users_offering', 'users_wanting', 'total_swaps']
-                    available_columns = [col for col in display_columns if col in skills_df.columns]
-                    st.dataframe(skills_df[available_columns], use_container_width=True)
-                    
-                    # Download option
-                    csv = skills_df.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Download Skills Report",
-                        data=csv,
-                        file_name=f"skills_report_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
-                else:
-                    st.info("No skills data available")
+        file_format = st.selectbox("🗂️ Format", [f for f in FORMATS if f == 'csv' or parquet_available()])
+    
+    with col3:
+        st.write("")
+        generate = st.button("📊 Generate", use_container_width=True)
+    
+    if generate:
+        discard_report_file()
+        with st.spinner("Generating report..."):
+            try:
+                path, rows = build_report_file(firebase_auth, report, file_format)
+                preview = next(report_chunks(firebase_auth, report, REPORT_PREVIEW_ROWS), [])
+            except Exception as e:
+                st.error(f"❌ Failed to generate report: {e}")
+            else:
+                st.session_state.report_file = {
+                    'path': path,
+                    'rows': rows,
+                    'report': report,
+                    'preview': preview,
+                    'file_name': f"{report}_report_{datetime.now().strftime('%Y%m%d')}.{file_format}",
+                    'mime': MIME_TYPES[file_format]
+                }
+    
+    # The report stays on disk across reruns until a new one replaces it
+    report_file = st.session_state.get('report_file')
+    if report_file and os.path.exists(report_file['path']):
+        st.write(f"**{report_file['report'].title()} Report:** {report_file['rows']:,} rows")
+        if report_file['preview']:
+            columns = ['id'] + [column for column, _ in REPORTS[report_file['report']][1]]
+            st.dataframe(pd.DataFrame(report_file['preview'], columns=columns), use_container_width=True)
+        
+        with open(report_file['path'], 'rb') as f:
+            st.download_button(
+                label="💾 Download Report",
+                data=f,
+                file_name=report_file['file_name'],
+                mime=report_file['mime'],
+                use_container_width=True
+            )
+
+def discard_report_file():
+    """Remove this session's last generated report file"""
+    report_file = st.session_state.pop('report_file', None)
+    if report_file and os.path.exists(report_file['path']):
+        os.remove(report_file['path'])
+
+def parse_filters(text):
+    """Parse one `field op value` filter per line, e.g. `status == pending`.
+    
+    Values are read as JSON (numbers, true/false, quoted strings, lists),
+    then as an ISO date, and otherwise kept as plain text.
+    """
+    filters = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        parts = line.split(None, 2)
+        if len(parts) != 3 or parts[1] not in EXPLORER_OPERATORS:
+            raise ValueError(f"Can't read filter: {line.strip()}")
+        field, op, raw_value = parts
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            try:
+                value = datetime.fromisoformat(raw_value)
+            except ValueError:
+                value = raw_value
+        filters.append((field, op, tuple(value) if isinstance(value, list) else value))
+    return filters
 
 def admin_database_explorer():
     """Database explorer for admins"""
@@ -333,55 +403,70 @@ def admin_database_explorer():
     
     st.subheader("🗄️ Database Explorer")
     
-    st.info("🔍 Explore your Firebase collections and data structure")
+    st.info("🔍 Page through any collection, choosing the fields, filters and ordering the database applies")
     
-    # Collection explorer
-    collection_tabs = st.tabs(["👥 Users", "🎯 Skills", "🤝 User Skills", "📋 Requests", "🔄 Transactions", "⭐ Reviews", "📢 Messages"])
+    # Only the open collection is queried
+    collection = st.radio(
+        "Collection", list(EXPLORER_COLLECTIONS), horizontal=True, label_visibility="collapsed",
+        format_func=lambda name: EXPLORER_COLLECTIONS[name][0]
+    )
     
-    with collection_tabs[0]:  # Users
-        st.write("**👥 Users Collection**")
-        users_result = firebase_auth.get_public_users(100)
-        if users_result['success'] and users_result['users']:
-            users_df = pd.DataFrame(users_result['users'])
-            st.dataframe(users_df, use_container_width=True)
-            st.write(f"Total users: {len(users_df)}")
-        else:
-            st.info("No users found")
-    
-    with collection_tabs[1]:  # Skills
-        st.write("**🎯 Skills Collection**")
-        skills_result = firebase_auth.get_all_skills()
-        if skills_result['success'] and skills_result['skills']:
-            skills_df = pd.DataFrame(skills_result['skills'])
-            st.dataframe(skills_df, use_container_width=True)
-            st.write(f"Total skills: {len(skills_df)}")
-        else:
-            st.info("No skills found")
-    
-    with collection_tabs[2]:  # User Skills
-        st.write("**🤝 User Skills Collection**")
-        st.info("User skills data coming soon!")
-    
-    with collection_tabs[3]:  # Requests
-        st.write("**📋 Barter Requests Collection**")
-        st.info("Barter requests data coming soon!")
-    
-    with collection_tabs[4]:  # Transactions
-        st.write("**🔄 Transactions Collection**")
-        st.info("Transactions data coming soon!")
-    
-    with collection_tabs[5]:  # Reviews
-        st.write("**⭐ Reviews Collection**")
-        st.info("Reviews data coming soon!")
-    
-    with collection_tabs[6]:  # Messages
-        st.write("**📢 System Messages Collection**")
-        messages_result = firebase_auth.get_active_messages()
-        if messages_result['success'] and messages_result['messages']:
-            messages_df = pd.DataFrame(messages_result['messages'])
-            st.dataframe(messages_df, use_container_width=True)
-        else:
-            st.info("No messages found")
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        fields_text = st.text_input("🧾 Fields (comma separated, empty for whole documents)",
+                                    value=", ".join(EXPLORER_COLLECTIONS[collection][1]), key=f"explorer_fields_{collection}")
+    with col2:
+        order_by = st.text_input("↕️ Order by", key=f"explorer_order_{collection}")
+    with col3:
+        descending = st.checkbox("Descending", key=f"explorer_desc_{collection}")
+    with col4:
+        page_size = st.selectbox("Rows", [25, 50, 100, 250], index=1, key=f"explorer_rows_{collection}")
+    
+    filters_text = st.text_area(
+        "🔎 Filters, one per line (" + ", ".join(EXPLORER_OPERATORS) + ")",
+        placeholder="status == pending\ncreated_at >= 2024-01-01", key=f"explorer_filters_{collection}"
+    )
+    
+    try:
+        filters = parse_filters(filters_text)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    
+    fields = tuple(field.strip() for field in fields_text.split(',') if field.strip())
+    order_by = order_by.strip() or None
+    
+    # A changed query starts again from the first page
+    pager_key = f"explorer_pager_{collection}"
+    explorer_query = (fields, tuple(filters), order_by, descending, page_size)
+    if st.session_state.get(f"explorer_query_{collection}") != explorer_query:
+        st.session_state[f"explorer_query_{collection}"] = explorer_query
+        reset_pagination(pager_key)
+    
+    cursor = current_cursor(pager_key)
+    page_result = cached_page_data(
+        'explorer', (collection, explorer_query, _freeze_cursor(cursor)), ('users', 'skills', 'requests', 'messages', 'stats'),
+        lambda: {'page': firebase_auth.query_collection(
+            collection, list(fields), [(field, op, list(value) if isinstance(value, tuple) else value) for field, op, value in filters],
+            order_by, descending, page_size, cursor
+        )}
+    )['page']
+    
+    if not page_result['success']:
+        st.error(f"❌ Query failed: {page_result['error']}")
+        return
+    
+    documents = page_result['documents']
+    if documents:
+        st.dataframe(pd.DataFrame(documents).astype(str), use_container_width=True)
+        st.write(f"Showing {len(documents)} documents")
+    else:
+        st.info("No documents match")
+    
+    pagination_controls(pager_key, page_result['next_cursor'])
+
+def _freeze_cursor(cursor):
+    return tuple(cursor) if isinstance(cursor, list) else cursor
 
 def show_admin_interface():
     """Main admin interface with navigation"""
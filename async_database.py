@@ -0,0 +1,269 @@
+import asyncio
+import functools
+import heapq
+import threading
+from firebase_admin import firestore, firestore_async
+from complete_database import SkillSwapDatabase, IN_QUERY_LIMIT
+from documents import PLATFORM_STAT_FIELDS, view_fields
+
+
+class AsyncSkillSwapDatabase:
+    """asyncio counterpart of SkillSwapDatabase on the Firestore AsyncClient.
+
+    Page reads are implemented natively on the AsyncClient so several of
+    them can be awaited together. Every other method (writes, and reads
+    served from the in-process search, match and system message caches)
+    runs the matching SkillSwapDatabase method on a worker thread, so the
+    whole API is awaitable and write logic lives in one place.
+    """
+
+    def __init__(self, firebase_config=None, sync_database=None):
+        self.sync_database = sync_database or SkillSwapDatabase(firebase_config)
+        self.db = None
+        self.initialized = False
+
+    def __getattr__(self, name):
+        if name == 'sync_database':
+            raise AttributeError(name)
+        attr = getattr(self.sync_database, name)
+        if not callable(attr):
+            return attr
+
+        # wraps keeps the real signature visible, e.g. for the cache layer's keys
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        return call
+
+    async def initialize(self):
+        """Initialize Firebase Admin SDK and the AsyncClient"""
+        # The sync backend sets up the firebase_admin app both clients share
+        if not await asyncio.to_thread(self.sync_database.initialize):
+            return False
+        self.db = firestore_async.client()
+        self.initialized = True
+        return True
+
+    async def fetch_many(self, calls):
+        """Await several independent reads at once.
+
+        `calls` maps a name to a (method_name, *args) tuple; the result maps
+        the same names to each method's result dictionary.
+        """
+        names = list(calls)
+        results = await asyncio.gather(*(getattr(self, calls[name][0])(*calls[name][1:]) for name in names))
+        return dict(zip(names, results))
+
+    # USERS COLLECTION
+
+    async def get_user_profile(self, user_id):
+        """Get user profile"""
+        try:
+            doc = await self.db.collection('users').document(user_id).get()
+            if doc.exists:
+                return {'success': True, 'profile': doc.to_dict()}
+            else:
+                return {'success': False, 'error': 'User not found'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    async def get_recent_users(self, limit=5):
+        """Get the most recently registered users"""
+        try:
+            query = self.db.collection('users').order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
+            users = []
+            async for doc in query.stream():
+                user_data = doc.to_dict()
+                user_data['user_id'] = doc.id
+                users.append(user_data)
+            return {'success': True, 'users': users}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # SKILLS COLLECTION
+
+    async def get_all_skills(self):
+        """Get all approved skills"""
+        try:
+            skills_ref = self.db.collection('skills').where('is_approved', '==', True).where('is_flagged', '==', False)
+            skills = [doc.to_dict() async for doc in skills_ref.stream()]
+            return {'success': True, 'skills': skills}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # USER_SKILLS COLLECTION
+
+    async def get_user_skills(self, user_id, skill_type=None, view='full'):
+        """Get user's skills"""
+        try:
+            query = self.db.collection('user_skills').where('user_id', '==', user_id).where('is_active', '==', True)
+            if skill_type:
+                query = query.where('type', '==', skill_type)
+            fields = view_fields('user_skills', view)
+            if fields is not None:
+                query = query.select(fields)
+
+            skills = [doc.to_dict() async for doc in query.stream()]
+            return {'success': True, 'skills': skills}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    async def get_skills_for_users(self, user_ids, skill_type=None, view='full'):
+        """Get skills for many users at once, keyed by user id"""
+        try:
+            fields = view_fields('user_skills', view)
+            user_ids = list(dict.fromkeys(user_ids))
+            skills_by_user = {user_id: [] for user_id in user_ids}
+            chunks = [user_ids[i:i + IN_QUERY_LIMIT] for i in range(0, len(user_ids), IN_QUERY_LIMIT)]
+
+            async def fetch_chunk(chunk):
+                query = self.db.collection('user_skills').where('user_id', 'in', chunk).where('is_active', '==', True)
+                if skill_type:
+                    query = query.where('type', '==', skill_type)
+                if fields is not None:
+                    query = query.select(fields)
+                return [doc.to_dict() async for doc in query.stream()]
+
+            for chunk_skills in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+                for skill_data in chunk_skills:
+                    skills_by_user.setdefault(skill_data['user_id'], []).append(skill_data)
+
+            return {'success': True, 'skills': skills_by_user}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # BARTER_REQUESTS COLLECTION
+
+    async def get_user_requests(self, user_id, request_type='all', limit=None, view='full'):
+        """Get user's barter requests, newest first"""
+        try:
+            fields = view_fields('barter_requests', view)
+
+            async def fetch_requests(request_side):
+                field = 'sender_id' if request_side == 'sent' else 'receiver_id'
+                query = self.db.collection('barter_requests').where(field, '==', user_id)
+                query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+                if fields is not None:
+                    query = query.select(fields)
+                if limit:
+                    query = query.limit(limit)
+
+                requests = []
+                async for doc in query.stream():
+                    request_data = doc.to_dict()
+                    request_data['request_id'] = doc.id
+                    request_data['type'] = request_side
+                    requests.append(request_data)
+                return requests
+
+            sides = [side for side in ('sent', 'received') if request_type in [side, 'all']]
+            halves = await asyncio.gather(*(fetch_requests(side) for side in sides))
+            requests = list(heapq.merge(*halves, key=lambda r: r['created_at'], reverse=True))
+
+            return {'success': True, 'requests': requests[:limit] if limit else requests}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # TRANSACTIONS COLLECTION
+
+    async def get_user_transactions(self, user_id, limit=None, view='full'):
+        """Get user's transactions, newest first"""
+        try:
+            fields = view_fields('transactions', view)
+
+            async def fetch_transactions(user_role):
+                query = self.db.collection('transactions').where(f'{user_role}_id', '==', user_id)
+                query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+                if fields is not None:
+                    query = query.select(fields)
+                if limit:
+                    query = query.limit(limit)
+
+                transactions = []
+                async for doc in query.stream():
+                    transaction_data = doc.to_dict()
+                    transaction_data['transaction_id'] = doc.id
+                    transaction_data['user_role'] = user_role
+                    transactions.append(transaction_data)
+                return transactions
+
+            halves = await asyncio.gather(fetch_transactions('user1'), fetch_transactions('user2'))
+            transactions = list(heapq.merge(*halves, key=lambda t: t['created_at'], reverse=True))
+
+            return {'success': True, 'transactions': transactions[:limit] if limit else transactions}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # REVIEWS COLLECTION
+
+    async def get_user_reviews(self, user_id, as_reviewee=True):
+        """Get reviews for a user"""
+        try:
+            if as_reviewee:
+                query = self.db.collection('reviews').where('reviewee_id', '==', user_id).where('is_public', '==', True)
+            else:
+                query = self.db.collection('reviews').where('reviewer_id', '==', user_id)
+
+            reviews = []
+            async for doc in query.stream():
+                review_data = doc.to_dict()
+                review_data['review_id'] = doc.id
+                reviews.append(review_data)
+
+            return {'success': True, 'reviews': reviews}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # PLATFORM_STATS COLLECTION
+
+    async def get_platform_stats(self):
+        """Get platform-wide counters by summing the stats shards"""
+        try:
+            stats = {field: 0 for field in PLATFORM_STAT_FIELDS}
+            async for doc in self.db.collection('platform_stats').stream():
+                for field, value in doc.to_dict().items():
+                    if field in stats:
+                        stats[field] += value
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+
+class BlockingSkillSwapDatabase:
+    """Synchronous SkillSwapDatabase API over an AsyncSkillSwapDatabase.
+
+    An event loop runs on a background thread for the life of the process.
+    Every method blocks until its coroutine finishes there, so existing
+    pages keep working unchanged, and fetch_many lets a page await all of
+    its independent reads concurrently.
+    """
+
+    def __init__(self, async_database):
+        self.async_database = async_database
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='skillswap-async-db', daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name == 'async_database':
+            raise AttributeError(name)
+        attr = getattr(self.async_database, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return self._run(attr(*args, **kwargs))
+
+        return call
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def fetch_many(self, calls):
+        """Run several independent reads concurrently on the event loop"""
+        return self._run(self.async_database.fetch_many(calls))
@@ -0,0 +1,400 @@
+"""Benchmark every SkillSwapDatabase operation and page at several data scales.
+
+    python benchmark.py --backend sqlite --scales 1000 100000 1000000
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark.py --backend firestore --scales 1000
+    python benchmark.py --compare bench_results/before.json bench_results/after.json
+
+Results are written as JSON (latency percentiles plus documents read and
+written per call) so runs from different commits can be diffed.
+"""
+import argparse
+import inspect
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+from documents import SAMPLE_SKILLS
+from geo import GAZETTEER
+from synthetic_data import AVAILABILITY, CATEGORIES, CITIES, dataset_plan, seed_database
+
+# I/O COUNTING
+
+
+class FirestoreCounter:
+    """Count document reads and writes made through the Firestore client"""
+
+    def __init__(self):
+        self.docs_read = 0
+        self.docs_written = 0
+
+    def install(self):
+        from google.cloud.firestore_v1 import query, document, batch, client
+        counter = self
+
+        stream = query.Query.stream
+        def counted_stream(self, *args, **kwargs):
+            for snapshot in stream(self, *args, **kwargs):
+                counter.docs_read += 1
+                yield snapshot
+        query.Query.stream = counted_stream
+
+        get = document.DocumentReference.get
+        def counted_get(self, *args, **kwargs):
+            counter.docs_read += 1
+            return get(self, *args, **kwargs)
+        document.DocumentReference.get = counted_get
+
+        get_all = client.Client.get_all
+        def counted_get_all(self, references, *args, **kwargs):
+            for snapshot in get_all(self, references, *args, **kwargs):
+                counter.docs_read += 1
+                yield snapshot
+        client.Client.get_all = counted_get_all
+
+        for method_name in ('set', 'update', 'delete', 'create'):
+            write = getattr(document.DocumentReference, method_name)
+            def counted_write(self, *args, _write=write, **kwargs):
+                counter.docs_written += 1
+                return _write(self, *args, **kwargs)
+            setattr(document.DocumentReference, method_name, counted_write)
+
+        commit = batch.WriteBatch.commit
+        def counted_commit(self, *args, **kwargs):
+            counter.docs_written += len(self._write_pbs)
+            return commit(self, *args, **kwargs)
+        batch.WriteBatch.commit = counted_commit
+
+
+def open_backend(backend, workdir):
+    """Create an initialized backend plus an object carrying docs_read/docs_written"""
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteSkillSwapDatabase
+        db = SQLiteSkillSwapDatabase({'apiKey': 'benchmark'}, path=os.path.join(workdir, 'benchmark.db'))
+        db.initialize()
+        return db, db
+
+    if backend == 'firestore':
+        if not os.getenv('FIRESTORE_EMULATOR_HOST'):
+            raise SystemExit("Set FIRESTORE_EMULATOR_HOST to benchmark against the Firestore emulator")
+        from google.cloud import firestore as cloud_firestore
+        from complete_database import SkillSwapDatabase
+
+        class EmulatorSkillSwapDatabase(SkillSwapDatabase):
+            def initialize(self):
+                # The emulator needs no service account
+                if self.db is None:
+                    self.db = cloud_firestore.Client(project=os.getenv('GCLOUD_PROJECT', 'skillswap-benchmark'))
+                self.initialized = True
+                return True
+
+        counter = FirestoreCounter()
+        counter.install()
+        db = EmulatorSkillSwapDatabase({'apiKey': 'benchmark'})
+        db.initialize()
+        return db, counter
+
+    raise SystemExit(f"Unknown backend: {backend}")
+
+
+def reset_backend(backend, db):
+    """Remove all data so the next scale starts empty"""
+    if backend == 'firestore':
+        import requests
+        project = db.db.project
+        requests.delete(f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/{project}/databases/(default)/documents")
+
+
+# MEASUREMENT
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(func, counter, iterations):
+    """Time func over iterations, counting document I/O per call"""
+    latencies = []
+    errors = 0
+    read_before, written_before = counter.docs_read, counter.docs_written
+
+    # The first call may build in-process indexes, report it separately
+    start = time.perf_counter()
+    first_result = func()
+    first_call_ms = (time.perf_counter() - start) * 1000
+    if isinstance(first_result, dict) and not first_result.get('success', True):
+        errors += 1
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if isinstance(result, dict) and not result.get('success', True):
+            errors += 1
+
+    calls = iterations + 1
+    return {
+        'iterations': iterations,
+        'first_call_ms': round(first_call_ms, 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'docs_read': round((counter.docs_read - read_before) / calls, 2),
+        'docs_written': round((counter.docs_written - written_before) / calls, 2),
+        'errors': errors,
+    }
+
+
+def operation_catalog(db, user_ids, rng):
+    """Benchmark call for each SkillSwapDatabase method, keyed by method name"""
+    skill_names = [skill['name'] for skill in SAMPLE_SKILLS]
+    counter = {'n': 0}
+
+    def next_id(prefix):
+        counter['n'] += 1
+        return f"bench_{prefix}_{counter['n']}"
+
+    def user():
+        return rng.choice(user_ids)
+
+    def new_request():
+        result = db.create_barter_request(user(), user(), rng.choice(skill_names), rng.choice(skill_names))
+        return result.get('request_id')
+
+    return {
+        'create_user_profile': lambda: db.create_user_profile(next_id('user'), 'bench@example.com', 'Bench User', rng.choice(CITIES)),
+        'get_user_profile': lambda: db.get_user_profile(user()),
+        'update_user_profile': lambda: db.update_user_profile(user(), {'availability': rng.choice(AVAILABILITY)}),
+        'get_public_users': lambda: db.get_public_users(50),
+        'get_public_users[card]': lambda: db.get_public_users(50, view='card'),
+        'get_nearby_users': lambda: db.get_nearby_users(*GAZETTEER[rng.choice(CITIES).lower()], radius_km=25, view='card'),
+        'get_public_users[filtered]': lambda: db.get_public_users(50, availability=rng.choice(AVAILABILITY), search=rng.choice(CITIES)),
+        'create_skill': lambda: db.create_skill(next_id('Skill'), 'Benchmark skill', rng.choice(CATEGORIES)),
+        'get_all_skills': lambda: db.get_all_skills(),
+        'search_skills': lambda: db.search_skills(rng.choice(['pro', 'design', 'guitar', 'skill 1'])),
+        'get_trending_skills': lambda: db.get_trending_skills(),
+        'get_trending_skills[category]': lambda: db.get_trending_skills(rng.choice(CATEGORIES)),
+        'update_trending_skills': lambda: db.update_trending_skills(),
+        'add_user_skill': lambda: db.add_user_skill(user(), rng.choice(skill_names), rng.choice(['offered', 'wanted'])),
+        'add_user_skills': lambda: db.add_user_skills(user(), [
+            {'skill_name': name, 'skill_type': rng.choice(['offered', 'wanted'])} for name in rng.sample(skill_names, 5)
+        ]),
+        'get_user_skills': lambda: db.get_user_skills(user()),
+        'get_skills_for_users': lambda: db.get_skills_for_users(rng.sample(user_ids, min(50, len(user_ids)))),
+        'get_skills_for_users[card]': lambda: db.get_skills_for_users(rng.sample(user_ids, min(50, len(user_ids))), view='card'),
+        'remove_user_skill': lambda: db.remove_user_skill(user(), rng.choice(skill_names), rng.choice(['offered', 'wanted'])),
+        'remove_user_skills': lambda: db.remove_user_skills(user(), [
+            (name, rng.choice(['offered', 'wanted'])) for name in rng.sample(skill_names, 5)
+        ]),
+        'get_reciprocal_matches': lambda: db.get_reciprocal_matches(user(), 10),
+        'get_swap_match': lambda: db.get_swap_match(user(), user()),
+        'create_barter_request': lambda: db.create_barter_request(user(), user(), rng.choice(skill_names), rng.choice(skill_names)),
+        'get_user_requests': lambda: db.get_user_requests(user(), limit=100),
+        'get_user_requests[card]': lambda: db.get_user_requests(user(), limit=100, view='card'),
+        'update_request_status': lambda: db.update_request_status(new_request(), rng.choice(['accepted', 'rejected'])),
+        'create_transaction_from_request': lambda: db.create_transaction_from_request(new_request()),
+        'get_user_transactions': lambda: db.get_user_transactions(user(), limit=100),
+        'get_user_transactions[card]': lambda: db.get_user_transactions(user(), limit=100, view='card'),
+        'create_review': lambda: db.create_review(user(), user(), next_id('txn'), rng.randint(1, 5), 'Benchmark review'),
+        'update_user_rating': lambda: db.update_user_rating(user()),
+        'get_user_reviews': lambda: db.get_user_reviews(user()),
+        'create_system_message': lambda: db.create_system_message('admin', 'Benchmark', 'Benchmark message'),
+        'get_active_messages': lambda: db.get_active_messages(),
+        'get_active_messages[targeted]': lambda: db.get_active_messages(user(), 'user'),
+        'query_collection': lambda: db.query_collection('barter_requests', ['status', 'created_at'], [('status', '==', 'pending')]),
+        'get_platform_stats': lambda: db.get_platform_stats(),
+        'get_recent_users': lambda: db.get_recent_users(5),
+        'rebuild_platform_stats': lambda: db.rebuild_platform_stats(),
+    }
+
+
+def uncovered_methods(db, catalog):
+    """Public database methods the catalog does not benchmark yet"""
+    covered = {name.split('[')[0] for name in catalog}
+    # Setup, maintenance and index-building helpers are exercised indirectly
+    skipped = {
+        'initialize', 'setup_sample_data', 'iter_public_users', 'put_documents', 'iter_collection_pages', 'write_batch',
+        'get_skill_index', 'get_match_index', 'backfill_user_search_fields', 'rebuild_rating_aggregates',
+        'expire_stale_requests', 'start_request_expiry_sweeper', 'watch_user_activity',
+        'deactivate_expired_messages', 'backfill_message_audience_keys', 'backfill_user_skill_names'
+    }
+    return sorted(
+        name for name, _ in inspect.getmembers(type(db), inspect.isfunction)
+        if not name.startswith('_') and name not in covered and name not in skipped
+    )
+
+
+# Page name -> session state that routes main.py to it
+PAGES = {
+    'main.home_page': {'current_page': 'home'},
+    'main.browse_users_page': {'current_page': 'browse'},
+    'main.profile_page': {'current_page': 'profile'},
+    'main.requests_page': {'current_page': 'requests'},
+    'main.transactions_page': {'current_page': 'transactions'},
+    'main.request_form_page': {'current_page': 'request_form'},
+    'admin_pages.admin_dashboard': {'current_page': 'admin', 'admin_nav': 'Dashboard'},
+    'admin_pages.admin_users_management': {'current_page': 'admin', 'admin_nav': 'User Management'},
+    'admin_pages.admin_database_explorer': {'current_page': 'admin', 'admin_nav': 'Database Explorer'},
+    'admin_pages.admin_system_messages': {'current_page': 'admin', 'admin_nav': 'System Messages'},
+    'admin_pages.admin_analytics': {'current_page': 'admin', 'admin_nav': 'Analytics'},
+}
+
+
+def page_benchmarks(db, user_ids, rng, warm_cache=False):
+    """Benchmark call for each page function, rendered through Streamlit's AppTest"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("⚠️ streamlit.testing is not available, skipping page benchmarks")
+        return {}
+
+    from cached_database import cached
+
+    # main.py and admin_pages.py import their backend from firebase_config
+    firebase_config = types.ModuleType('firebase_config')
+    firebase_config.firebase_auth = db
+    sys.modules['firebase_config'] = firebase_config
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+    def render(session):
+        def run():
+            if not warm_cache:
+                cached(db).clear_cache()
+            user_id = rng.choice(user_ids)
+            profile = db.get_user_profile(user_id)['profile']
+            profile['role'] = 'admin'
+            selected_user = db.get_user_profile(rng.choice(user_ids))['profile']
+
+            app = AppTest.from_file(script, default_timeout=120)
+            app.session_state['user'] = {'localId': user_id}
+            app.session_state['user_profile'] = profile
+            app.session_state['selected_user'] = selected_user
+            for key, value in session.items():
+                app.session_state[key] = value
+            app.run()
+            return {'success': not app.exception}
+        return run
+
+    return {name: render(session) for name, session in PAGES.items()}
+
+
+def current_commit():
+    """Commit of the code being benchmarked, wherever the benchmark is run from"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(backend, scales, iterations, output_dir, include_pages=True, warm_cache=False, seed=42):
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as workdir:
+            db, counter = open_backend(backend, workdir)
+            reset_backend(backend, db)
+
+            print(f"🌱 Seeding {scale:,} users into {backend}...")
+            start = time.perf_counter()
+            user_ids = seed_database(db, scale, seed)
+            seed_seconds = time.perf_counter() - start
+
+            # The app builds the match index in the background at startup
+            db.get_match_index(refresh=True)
+
+            rng = random.Random(seed)
+            catalog = operation_catalog(db, user_ids, rng)
+            results = {'operations': {}, 'pages': {}}
+
+            for name, func in catalog.items():
+                results['operations'][name] = measure(func, counter, iterations)
+                print(f"  {name:<36} p50 {results['operations'][name]['p50_ms']:>9.3f} ms  "
+                      f"reads {results['operations'][name]['docs_read']:>9}")
+
+            if include_pages:
+                for name, func in page_benchmarks(db, user_ids, rng, warm_cache).items():
+                    results['pages'][name] = measure(func, counter, max(1, iterations // 10))
+                    print(f"  {name:<36} p50 {results['pages'][name]['p50_ms']:>9.3f} ms  "
+                          f"reads {results['pages'][name]['docs_read']:>9}")
+
+            report = {
+                'backend': backend,
+                'scale': scale,
+                'dataset': dataset_plan(scale),
+                'seed': seed,
+                'commit': current_commit(),
+                'created_at': datetime.now().isoformat(),
+                'seed_seconds': round(seed_seconds, 2),
+                'uncovered_methods': uncovered_methods(db, catalog),
+                'results': results,
+            }
+
+            path = os.path.join(output_dir, f"{backend}_{scale}.json")
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            written.append(path)
+            print(f"✅ Wrote {path}")
+
+    return written
+
+
+def compare_reports(baseline_path, current_path, threshold=0.2):
+    """Print per-operation changes and return the regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    regressions = []
+    for section in ('operations', 'pages'):
+        for name, after in current['results'].get(section, {}).items():
+            before = baseline['results'].get(section, {}).get(name)
+            if before is None:
+                print(f"  {name:<36} new")
+                continue
+
+            p95_change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            reads_change = after['docs_read'] - before['docs_read']
+            flag = ''
+            if p95_change > threshold or reads_change > 0:
+                flag = '⚠️ regression'
+                regressions.append(name)
+            print(f"  {name:<36} p95 {before['p95_ms']:>9.3f} -> {after['p95_ms']:>9.3f} ms ({p95_change:+.0%})  "
+                  f"reads {before['docs_read']} -> {after['docs_read']}  {flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SkillSwapDatabase operations and pages")
+    parser.add_argument('--backend', choices=['sqlite', 'firestore'], default='sqlite')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output-dir', default='bench_results')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-pages', action='store_true', help="Skip the Streamlit page benchmarks")
+    parser.add_argument('--warm-cache', action='store_true', help="Keep the read cache between page renders")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Diff two result files")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed p95 slowdown when comparing")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare_reports(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    run_benchmarks(args.backend, args.scales, args.iterations, args.output_dir,
+                   include_pages=not args.no_pages, warm_cache=args.warm_cache, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
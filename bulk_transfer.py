@@ -0,0 +1,350 @@
+"""Stream NDJSON or CSV documents into and out of a SkillSwap database.
+
+    python bulk_transfer.py import users data/users.ndjson
+    python bulk_transfer.py import --all backup/
+    python bulk_transfer.py export backup/ --collections users skills --format csv
+
+Every record carries its document id in an `_id` field. Imports are
+written in chunks and record a checkpoint after each committed chunk, so
+an interrupted run picks up where it stopped when started again.
+Exports page through collections by document id and write numbered part
+files, so neither side ever holds a whole collection in memory.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from database_backends import create_database
+from documents import (
+    user_search_tokens, user_location_fields, new_user_doc, new_skill_doc, new_user_skill_doc, new_barter_request_doc,
+    new_transaction_doc, new_review_doc
+)
+
+COLLECTIONS = ['users', 'skills', 'user_skills', 'barter_requests', 'transactions', 'reviews']
+
+ID_FIELD = '_id'
+FORMATS = ('ndjson', 'csv')
+IMPORT_CHUNK = 5000
+EXPORT_PAGE_SIZE = 1000
+EXPORT_PART_SIZE = 100000
+
+
+def _field_types(doc):
+    return {field: type(value) for field, value in doc.items() if type(value) in (bool, int, float)}
+
+
+# Collection -> numeric and boolean fields, taken from the document builders.
+# CSV files written elsewhere may carry these as text like 'TRUE' or '4.0'.
+FIELD_TYPES = {
+    'users': _field_types(new_user_doc('', '', '', '', None)),
+    'skills': _field_types(new_skill_doc('', '', '', '', None)),
+    'user_skills': _field_types(new_user_skill_doc('', '', 'offered', '', '', None)),
+    'barter_requests': _field_types(new_barter_request_doc('', '', '', '', '', None)),
+    'transactions': _field_types(new_transaction_doc('', dict.fromkeys(
+        ['sender_id', 'receiver_id', 'offered_skill_name', 'requested_skill_name'], ''), None)),
+    'reviews': _field_types(new_review_doc('', '', '', 0, '', '', None)),
+}
+
+
+# ENCODING
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _to_cell(value):
+    """Encode a field for CSV: plain strings stay readable, everything else is JSON.
+
+    An empty string is written as "" so an empty cell always means a missing field.
+    """
+    if isinstance(value, str) and value:
+        try:
+            json.loads(value)
+        except ValueError:
+            return value
+    return json.dumps(value, default=_encode_value, ensure_ascii=False)
+
+
+def _from_cell(text):
+    try:
+        return json.loads(text, object_hook=_decode_object)
+    except ValueError:
+        return text
+
+
+def _file_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return 'ndjson' if extension in ('json', 'jsonl') else extension
+
+
+def read_records(path):
+    """Yield (doc_id, data) pairs from an NDJSON or CSV file"""
+    file_format = _file_format(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'ndjson':
+            for line in f:
+                if line.strip():
+                    data = json.loads(line, object_hook=_decode_object)
+                    yield str(data.pop(ID_FIELD)), data
+        elif file_format == 'csv':
+            for row in csv.DictReader(f):
+                doc_id = row.pop(ID_FIELD)
+                # Empty cells are fields the document doesn't have
+                yield doc_id, {field: _from_cell(text) for field, text in row.items() if text}
+        else:
+            raise ValueError(f"Unsupported file type: {path}")
+
+
+def write_records(path, records, file_format):
+    """Write (doc_id, data) pairs to a part file, returning how many were written"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if file_format == 'ndjson':
+            count = 0
+            for doc_id, data in records:
+                f.write(json.dumps({ID_FIELD: doc_id, **data}, default=_encode_value, ensure_ascii=False) + '\n')
+                count += 1
+            return count
+
+        # A CSV header must be known up front, so CSV parts are buffered
+        records = list(records)
+        fields = list(dict.fromkeys(field for _, data in records for field in data))
+        writer = csv.writer(f)
+        writer.writerow([ID_FIELD] + fields)
+        for doc_id, data in records:
+            writer.writerow([doc_id] + [_to_cell(data[field]) if field in data else '' for field in fields])
+        return len(records)
+
+
+# CHECKPOINTS
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    if not path:
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+
+# IMPORT
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _coerce(value, field_type):
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if field_type is bool:
+            if text not in ('true', 'false', '1', '0', 'yes', 'no'):
+                raise ValueError(f"Not a boolean: {value!r}")
+            return text in ('true', '1', 'yes')
+        value = float(text)
+    if field_type is bool:
+        return bool(value)
+    if field_type is int and float(value).is_integer():
+        return int(value)
+    return value
+
+
+def _prepare(collection, data):
+    """Type numeric and boolean fields and fill in derived fields the app
+    expects but exports from elsewhere may lack"""
+    for field, field_type in FIELD_TYPES.get(collection, {}).items():
+        if data.get(field) is not None:
+            data[field] = _coerce(data[field], field_type)
+    if collection == 'users' and 'search_tokens' not in data:
+        data['search_tokens'] = user_search_tokens(data.get('name', ''), data.get('location', ''))
+    if collection == 'users' and 'geohash' not in data:
+        data.update(user_location_fields(data.get('location', '')))
+    return data
+
+
+def import_file(db, collection, path, checkpoint=None, checkpoint_path=None, chunk_size=IMPORT_CHUNK, ops_per_second=None):
+    """Stream one file into a collection, resuming after the last committed chunk"""
+    if collection not in COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection}")
+    checkpoint = checkpoint if checkpoint is not None else {}
+    key = f"{collection}:{os.path.abspath(path)}"
+    done = checkpoint.get(key, 0)
+
+    imported = 0
+    started = time.monotonic()
+    records = read_records(path)
+    for _ in range(done):
+        next(records, None)
+
+    for chunk in _chunks(records, chunk_size):
+        db.put_documents(collection, [(doc_id, _prepare(collection, data)) for doc_id, data in chunk], ops_per_second=ops_per_second)
+        imported += len(chunk)
+        checkpoint[key] = done + imported
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        rate = imported / max(time.monotonic() - started, 1e-9)
+        print(f"  {collection:<16} {done + imported:>10,} documents  ({rate:,.0f}/s)", flush=True)
+
+    return imported
+
+
+def collection_files(directory, collection):
+    """Part files for a collection, as laid out by export_collection"""
+    paths = []
+    for file_format in FORMATS:
+        paths += glob.glob(os.path.join(directory, collection, f"*.{file_format}"))
+    return sorted(paths)
+
+
+# EXPORT
+
+
+def export_collection(db, collection, directory, file_format='ndjson', checkpoint=None, checkpoint_path=None,
+                      part_size=EXPORT_PART_SIZE, page_size=EXPORT_PAGE_SIZE):
+    """Page through a collection by document id into numbered part files.
+
+    Parts are written under a temporary name and only renamed once
+    complete, and the checkpoint records the last exported id and part
+    number, so a resumed export never leaves a truncated file behind.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format}")
+    checkpoint = checkpoint if checkpoint is not None else {}
+    state = checkpoint.setdefault(collection, {'cursor': None, 'part': 0, 'exported': 0, 'done': False})
+    if state['done']:
+        return 0
+
+    os.makedirs(os.path.join(directory, collection), exist_ok=True)
+    pages = db.iter_collection_pages(collection, page_size=page_size, start_after=state['cursor'])
+    exported = 0
+
+    while True:
+        part = []
+
+        def part_records():
+            # Pull pages lazily so an NDJSON part is streamed to disk
+            while len(part) < part_size:
+                page = next(pages, None)
+                if page is None:
+                    return
+                part.extend(doc_id for doc_id, _ in page)
+                yield from page
+
+        part_path = os.path.join(directory, collection, f"part-{state['part']:05d}.{file_format}")
+        count = write_records(f"{part_path}.tmp", part_records(), file_format)
+        if not count:
+            os.remove(f"{part_path}.tmp")
+            break
+
+        os.replace(f"{part_path}.tmp", part_path)
+        exported += count
+        state.update(cursor=part[-1], part=state['part'] + 1, exported=state['exported'] + count)
+        save_checkpoint(checkpoint_path, checkpoint)
+        print(f"  {collection:<16} {state['exported']:>10,} documents -> {part_path}", flush=True)
+
+        if len(part) < part_size:
+            break
+
+    state['done'] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export SkillSwap collections")
+    parser.add_argument('--backend', choices=['sqlite', 'firestore'], default=None,
+                        help="Storage backend (defaults to SKILLSWAP_BACKEND)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Load NDJSON/CSV files into collections")
+    import_parser.add_argument('collection', nargs='?', choices=COLLECTIONS)
+    import_parser.add_argument('paths', nargs='+', help="Files, or an export directory with --all")
+    import_parser.add_argument('--all', action='store_true', help="Import every collection from an export directory")
+    import_parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK)
+    import_parser.add_argument('--checkpoint', help="Checkpoint file (defaults to one next to the data)")
+    import_parser.add_argument('--ops-per-second', type=int, help="Fixed Firestore write rate instead of the 500/50/5 ramp-up")
+    import_parser.add_argument('--skip-stats', action='store_true', help="Don't recount platform stats afterwards")
+    import_parser.add_argument('--skip-skill-names', action='store_true',
+                               help="Don't rebuild the skill names embedded in user profiles afterwards")
+
+    export_parser = subparsers.add_parser('export', help="Write collections to numbered part files")
+    export_parser.add_argument('directory')
+    export_parser.add_argument('--collections', nargs='+', choices=COLLECTIONS, default=COLLECTIONS)
+    export_parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    export_parser.add_argument('--part-size', type=int, default=EXPORT_PART_SIZE)
+    export_parser.add_argument('--checkpoint', help="Checkpoint file (defaults to one in the export directory)")
+    args = parser.parse_args()
+
+    db = create_database(None, args.backend)
+    if not db.initialize():
+        sys.exit(1)
+    started = time.monotonic()
+
+    if args.command == 'import':
+        if args.all:
+            directory = args.paths[0]
+            jobs = [(collection, path) for collection in COLLECTIONS for path in collection_files(directory, collection)]
+        elif args.collection:
+            jobs = [(args.collection, path) for path in args.paths]
+        else:
+            parser.error("import needs a collection, or --all with an export directory")
+
+        checkpoint_path = args.checkpoint or os.path.join(os.path.dirname(os.path.abspath(args.paths[0])), '.import_checkpoint.json')
+        checkpoint = load_checkpoint(checkpoint_path)
+        total = 0
+        for collection, path in jobs:
+            total += import_file(db, collection, path, checkpoint, checkpoint_path, args.chunk_size, args.ops_per_second)
+
+        # Bulk writes bypass the counters and skill names the app keeps incrementally.
+        # Users and their user_skills can arrive in any order, so the names are
+        # rebuilt once everything is in rather than per document.
+        if not args.skip_stats:
+            db.rebuild_platform_stats()
+        if not args.skip_skill_names and any(collection in ('users', 'user_skills') for collection, _ in jobs):
+            result = db.backfill_user_skill_names()
+            if not result['success']:
+                print(f"❌ Rebuilding skill names failed: {result['error']}")
+                sys.exit(1)
+            print(f"  Rebuilt skill names on {result['updated']:,} profiles")
+        print(f"✅ Imported {total:,} documents in {time.monotonic() - started:.1f}s")
+
+    else:
+        checkpoint_path = args.checkpoint or os.path.join(args.directory, '.export_checkpoint.json')
+        os.makedirs(args.directory, exist_ok=True)
+        checkpoint = load_checkpoint(checkpoint_path)
+        total = 0
+        for collection in args.collections:
+            total += export_collection(db, collection, args.directory, args.format, checkpoint, checkpoint_path, args.part_size)
+        print(f"✅ Exported {total:,} documents in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import copy
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from database_backends import fetch_many
+
+
+# Seconds each read method may be served from cache. get_active_messages is
+# left out: the Firestore backend caches it itself until its first message expires.
+DEFAULT_TTLS = {
+    'get_user_profile': 60,
+    'get_user_skills': 60,
+    'get_skills_for_users': 60,
+    'get_all_skills': 300,
+    'get_trending_skills': 120,
+}
+
+_USER_SKILL_READS = [
+    ('get_user_profile', 'user_id'), ('get_user_skills', 'user_id'), ('get_skills_for_users', 'user_id'), ('get_all_skills', 'all')
+]
+
+# Write method -> read methods it invalidates.
+# A parameter name drops only the entries read for the user id the write got
+# in that parameter, 'all' drops every entry of the read method.
+DEFAULT_INVALIDATIONS = {
+    'create_user_profile': [('get_user_profile', 'user_id')],
+    'update_user_profile': [('get_user_profile', 'user_id')],
+    'add_user_skill': _USER_SKILL_READS,
+    'remove_user_skill': _USER_SKILL_READS,
+    'add_user_skills': _USER_SKILL_READS,
+    'remove_user_skills': _USER_SKILL_READS,
+    'create_skill': [('get_all_skills', 'all')],
+    # Profiles carry rating aggregates and pending request counters
+    'create_barter_request': [('get_user_profile', 'receiver_id')],
+    'update_request_status': [('get_user_profile', 'all')],
+    'expire_stale_requests': [('get_user_profile', 'all')],
+    'create_review': [('get_user_profile', 'reviewee_id')],
+    'update_user_rating': [('get_user_profile', 'user_id')],
+    'rebuild_rating_aggregates': [('get_user_profile', 'all')],
+    'backfill_user_skill_names': [('get_user_profile', 'all')],
+    'backfill_user_search_fields': [('get_user_profile', 'all')],
+}
+
+
+def _freeze(value):
+    """Turn call arguments into something hashable"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _reads_user(arguments, user_id):
+    """Whether a read with these bound arguments returned data for user_id"""
+    return arguments.get('user_id') == user_id or user_id in (arguments.get('user_ids') or ())
+
+
+class CachedSkillSwapDatabase:
+    """Read-through TTL/LRU cache in front of a SkillSwapDatabase.
+
+    Cached read methods are served from memory until their TTL runs out, write
+    methods clear the entries they make stale, and everything else is passed
+    straight through to the wrapped database.
+
+    Entries are keyed by the read's bound arguments, so a call means the same
+    entry however its arguments are passed. Every invalidation bumps the read
+    method's generation, and a read that started before it is not stored.
+    """
+
+    def __init__(self, database, ttls=None, invalidations=None, max_entries=2048):
+        self._database = database
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._invalidations = dict(DEFAULT_INVALIDATIONS if invalidations is None else invalidations)
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._generations = {}  # read method -> invalidations so far
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __getattr__(self, name):
+        if name == '_database':
+            raise AttributeError(name)
+        attr = getattr(self._database, name)
+        if name in self._ttls:
+            return self._cached_read(name, attr)
+        if name in self._invalidations:
+            return self._invalidating_write(name, attr)
+        return attr
+
+    # CACHE OPERATIONS
+
+    def _bind(self, method, args, kwargs):
+        """Get a call's arguments by parameter name, defaults included"""
+        signature = self._signatures.get(method)
+        if signature is None:
+            signature = self._signatures[method] = inspect.signature(getattr(self._database, method))
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.arguments
+
+    def _key(self, method, args, kwargs):
+        return (method, _freeze(tuple(self._bind(method, args, kwargs).items())))
+
+    def _generation(self, method):
+        with self._lock:
+            return self._generations.get(method, 0)
+
+    def _count(self, method, counter):
+        method_stats = self._stats.setdefault(method, {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0})
+        method_stats[counter] += 1
+
+    def _lookup(self, method, key):
+        """Get a live cached result, counting the hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(method, 'hits')
+                return copy.deepcopy(entry[1])
+            self._count(method, 'misses')
+        return None
+
+    def _store(self, method, key, result, now, generation):
+        # Only successful results are worth keeping
+        if not result.get('success'):
+            return
+        with self._lock:
+            # An invalidation landed while this was read, it may be stale already
+            if self._generations.get(method, 0) != generation:
+                return
+            self._entries[key] = (now + self._ttls[method], copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._count(evicted_key[0], 'evictions')
+
+    def _cached_read(self, method, func):
+        def read(*args, **kwargs):
+            key = self._key(method, args, kwargs)
+            now = time.monotonic()
+
+            result = self._lookup(method, key)
+            if result is None:
+                generation = self._generation(method)
+                result = func(*args, **kwargs)
+                self._store(method, key, result, now, generation)
+            return result
+
+        return read
+
+    def fetch_many(self, calls):
+        """Run several independent reads together, keyed like `calls`.
+
+        `calls` maps a name to a (method_name, *args) tuple. Cached results
+        are answered from memory and the misses go to the wrapped database
+        in one concurrent batch.
+        """
+        results = {}
+        misses = {}
+        keys = {}
+        generations = {}
+        now = time.monotonic()
+        for name, (method, *args) in calls.items():
+            if method in self._ttls:
+                keys[name] = self._key(method, args, {})
+                cached_result = self._lookup(method, keys[name])
+                if cached_result is not None:
+                    results[name] = cached_result
+                    continue
+                generations[name] = self._generation(method)
+            misses[name] = (method, *args)
+
+        for name, result in fetch_many(self._database, misses).items():
+            method = misses[name][0]
+            if method in self._ttls:
+                self._store(method, keys[name], result, now, generations[name])
+            results[name] = result
+        return {name: results[name] for name in calls}
+
+    def _invalidating_write(self, method, func):
+        def write(*args, **kwargs):
+            arguments = self._bind(method, args, kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # Invalidate even on failure, a partial write may have landed
+                for read_method, scope in self._invalidations[method]:
+                    self.invalidate(read_method, None if scope == 'all' else arguments.get(scope))
+
+        return write
+
+    def invalidate(self, method, user_id=None):
+        """Drop cached entries for a read method, optionally only those read for one user"""
+        with self._lock:
+            self._generations[method] = self._generations.get(method, 0) + 1
+            stale_keys = [
+                key for key in self._entries
+                if key[0] == method and (user_id is None or _reads_user(dict(key[1]), user_id))
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+                self._count(method, 'invalidations')
+
+    def clear_cache(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            for method in self._ttls:
+                self._generations[method] = self._generations.get(method, 0) + 1
+
+    def get_cache_stats(self):
+        """Get hit/miss/eviction counters per cached method"""
+        with self._lock:
+            stats = copy.deepcopy(self._stats)
+            entries = len(self._entries)
+
+        hits = sum(s['hits'] for s in stats.values())
+        misses = sum(s['misses'] for s in stats.values())
+        return {
+            'success': True,
+            'entries': entries,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'methods': stats
+        }
+
+
+_cached_databases = {}
+_cached_databases_lock = threading.Lock()
+
+
+def cached(database, **options):
+    """Get the shared cache layer for a database, creating it on first use"""
+    with _cached_databases_lock:
+        entry = _cached_databases.get(id(database))
+        if entry is None or entry[0] is not database:
+            entry = (database, CachedSkillSwapDatabase(database, **options))
+            _cached_databases[id(database)] = entry
+        return entry[1]
@@ -1,17 +1,87 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
 import requests
 import json
 from datetime import datetime, timedelta
+import heapq
+import copy
 import uuid
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from skill_index import SkillSearchIndex, tokenize
+from skill_matcher import MatchIndexMaintainer
+from geo import geohash_ranges, distance_km
+from documents import (
+    MAX_SEARCH_PREFIX, PLATFORM_STAT_FIELDS, SAMPLE_SKILLS, skill_id_for, user_search_tokens, rating_star,
+    rating_aggregates, new_user_doc, new_skill_doc, new_user_skill_doc, new_barter_request_doc,
+    new_transaction_doc, new_review_doc, new_system_message_doc, message_audience_keys, viewer_audience_keys,
+    new_skill_event_doc, add_log_scores, current_trend_score, merge_trending, view_fields, USER_SKILL_NAME_FIELDS,
+    user_skill_names, skill_name_updates, user_location_fields
+)
 
+# Firestore caps the number of values in an 'in' filter
+IN_QUERY_LIMIT = 30
+MAX_CONCURRENT_QUERIES = 8
+
+# Rebuild the in-process skill search and match indexes this often so
+# skills added by other app instances show up. The match index is rebuilt
+# on a background thread, reading user_skills this many at a time.
+SKILL_INDEX_MAX_AGE = 600
+MATCH_INDEX_MAX_AGE = 3600
+MATCH_INDEX_PAGE_SIZE = 1000
+
+# platform_stats is split over this many shard documents so concurrent
+# writes don't contend on one document
+STATS_SHARDS = 10
+
+# Pending requests past expires_at are flipped to 'expired' this many at a
+# time, every REQUEST_SWEEP_INTERVAL seconds per app process
+REQUEST_EXPIRY_BATCH = 200
+REQUEST_SWEEP_INTERVAL = 300
+
+# Live system messages are cached per audience for at most this long, and
+# never past the earliest show_until among them
+MESSAGES_CACHE_TTL = 300
+MESSAGES_CACHE_ENTRIES = 1024
+MESSAGE_EXPIRY_BATCH = 400
+
+# The trending job folds this many skill events into scores per transaction
+# and keeps this many skills per materialized trending list
+TREND_EVENT_BATCH = 100
+TRENDING_TOP_N = 20
+
+NEARBY_RADIUS_KM = 25
+
+# A BulkWriter gives up on a document after this many failed attempts
+BULK_WRITE_ATTEMPTS = 5
+
+
+def _run_concurrently(func, items):
+    """Run func over items on a thread pool, preserving order"""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_QUERIES, len(items))) as executor:
+        return list(executor.map(func, items))
 
 
 class SkillSwapDatabase:
     def __init__(self, firebase_config):
         self.db = None
         self.initialized = False
-        self.api_key = firebase_config["apiKey"]
+        self.api_key = (firebase_config or {}).get("apiKey")
+        self.skill_index = None
+        self.skill_index_built_at = 0
+        self._skill_index_lock = threading.Lock()
+        self.match_index = MatchIndexMaintainer(self._load_match_index, MATCH_INDEX_MAX_AGE)
+        self._expiry_sweeper = None
+        self._expiry_sweeper_lock = threading.Lock()
+        self._messages_cache = OrderedDict()  # audience keys -> (valid_until, messages)
+        self._messages_cache_lock = threading.Lock()
         
     def initialize(self):
         """Initialize Firebase Admin SDK"""
@@ -36,29 +106,12 @@ class SkillSwapDatabase:
     def create_user_profile(self, user_id, email, name, location=""):
         """Create user profile in Users collection"""
         try:
-            user_data = {
-                'user_id': user_id,
-                'email': email,
-                'name': name,
-                'location': location,
-                'profile_photo': '',
-                'availability': 'weekends',  # weekends, evenings, flexible, anytime
-                'profile_visibility': 'public',  # public, private
-                'role': 'user',  # user, admin
-                'is_banned': False,
-                'ban_reason': '',
-                'banned_until': None,
-                'rating_avg': 0.0,
-                'rating_count': 0,
-                'total_swaps': 0,
-                'successful_swaps': 0,
-                'pending_requests': 0,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP,
-                'last_login': firestore.SERVER_TIMESTAMP
-            }
+            user_data = new_user_doc(user_id, email, name, location, firestore.SERVER_TIMESTAMP)
             
-            self.db.collection('users').document(user_id).set(user_data)
+            batch = self.db.batch()
+            batch.set(self.db.collection('users').document(user_id), user_data)
+            self._bump_stats({'users_total': 1}, batch)
+            batch.commit()
             return {'success': True, 'message': 'User profile created'}
             
         except Exception as e:
@@ -76,24 +129,184 @@ class SkillSwapDatabase:
             return {'success': False, 'error': str(e)}
     
     def update_user_profile(self, user_id, updates):
-        """Update user profile"""
+        """Update user profile.
+        
+        Role and ban changes move the platform stats by comparing against the
+        current profile, so it is read in the same transaction as the writes.
+        The result's 'updates' holds every field written, derived ones included;
+        the caller's dict is left as it was.
+        """
         try:
-            updates['updated_at'] = firestore.SERVER_TIMESTAMP
-            self.db.collection('users').document(user_id).update(updates)
-            return {'success': True, 'message': 'Profile updated'}
+            user_ref = self.db.collection('users').document(user_id)
+            
+            @firestore.transactional
+            def apply_updates(transaction):
+                changes = dict(updates)
+                
+                # Derived fields need the current profile unless the update carries everything
+                changes_search = 'name' in changes or 'location' in changes
+                changes_stats = 'role' in changes or 'is_banned' in changes
+                current = {}
+                if changes_stats or (changes_search and not ('name' in changes and 'location' in changes)):
+                    current = user_ref.get(transaction=transaction).to_dict() or {}
+                
+                # Keep the denormalized search field in step with name and location
+                if changes_search:
+                    name = changes.get('name', current.get('name', ''))
+                    location = changes.get('location', current.get('location', ''))
+                    changes['search_tokens'] = user_search_tokens(name, location)
+                if 'location' in changes:
+                    changes.update(user_location_fields(changes['location']))
+                
+                stat_deltas = {}
+                if 'role' in changes:
+                    stat_deltas['users_admin'] = (changes['role'] == 'admin') - (current.get('role') == 'admin')
+                if 'is_banned' in changes:
+                    stat_deltas['users_banned'] = bool(changes['is_banned']) - bool(current.get('is_banned'))
+                
+                transaction.update(user_ref, {**changes, 'updated_at': firestore.SERVER_TIMESTAMP})
+                self._bump_stats(stat_deltas, transaction)
+                return changes
+            
+            changes = apply_updates(self.db.transaction())
+            return {'success': True, 'message': 'Profile updated', 'updates': changes}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_public_users(self, limit=50):
-        """Get all public user profiles"""
+    def get_public_users(self, limit=50, start_after=None, availability=None, search=None, view='full'):
+        """Get a page of public user profiles, ordered by user id.
+        
+        availability filters on the availability field and search matches
+        word prefixes of name and location, both inside the Firestore query.
+        view names the fields to fetch (see documents.VIEWS).
+        """
         try:
-            users_ref = self.db.collection('users').where('profile_visibility', '==', 'public').where('is_banned', '==', False).limit(limit)
+            users_ref = self.db.collection('users').where('profile_visibility', '==', 'public').where('is_banned', '==', False)
+            
+            if availability:
+                users_ref = users_ref.where('availability', '==', availability)
+            
+            # The longest search word narrows the query, any others are checked below
+            search_words = [word[:MAX_SEARCH_PREFIX] for word in tokenize(search)]
+            if search_words:
+                users_ref = users_ref.where('search_tokens', 'array_contains', max(search_words, key=len))
+            
+            fields = view_fields('users', view)
+            if fields is not None:
+                # Any other search words are checked against the fetched tokens
+                users_ref = users_ref.select(fields + ['search_tokens'] if search_words else fields)
+            
+            users_ref = users_ref.order_by('__name__').limit(limit)
+            
+            # Resume after the last user id of the previous page
+            if start_after:
+                users_ref = users_ref.start_after({'__name__': start_after})
+            
             users = []
+            last_user_id = None
+            page_count = 0
             for doc in users_ref.stream():
+                page_count += 1
+                last_user_id = doc.id
                 user_data = doc.to_dict()
                 user_data['user_id'] = doc.id
-                users.append(user_data)
-            return {'success': True, 'users': users}
+                if all(word in user_data.get('search_tokens', []) for word in search_words):
+                    users.append(user_data)
+            
+            next_cursor = last_user_id if page_count == limit else None
+            return {'success': True, 'users': users, 'next_cursor': next_cursor}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def iter_public_users(self, page_size=100):
+        """Yield public user profiles one page at a time"""
+        cursor = None
+        while True:
+            result = self.get_public_users(page_size, start_after=cursor)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            if result['users']:
+                yield result['users']
+            cursor = result['next_cursor']
+            if cursor is None:
+                return
+
+    def get_nearby_users(self, latitude, longitude, radius_km=NEARBY_RADIUS_KM, limit=50, start_after=None, view='full'):
+        """Get a page of public users within radius_km of a point.
+        
+        The circle is covered by at most four geohash ranges, read one after
+        another in (geohash, user id) order. A page reads at most `limit`
+        users and keeps those within the exact distance, nearest first;
+        pass next_cursor as start_after to continue. Locations are geocoded
+        to city centres, so everyone in a city shares one point and is paged
+        through in user id order.
+        """
+        try:
+            fields = view_fields('users', view)
+            ranges = geohash_ranges(latitude, longitude, radius_km)
+            range_index, last_geohash, last_user_id = start_after or (0, None, None)
+            
+            users = []
+            read = 0
+            while range_index < len(ranges) and read < limit:
+                query = self.db.collection('users').where('profile_visibility', '==', 'public').where('is_banned', '==', False)
+                query = query.where('geohash', '>=', ranges[range_index][0]).where('geohash', '<=', ranges[range_index][1])
+                if fields is not None:
+                    query = query.select(fields + ['latitude', 'longitude', 'geohash'])
+                query = query.order_by('geohash').order_by('__name__')
+                if last_user_id:
+                    query = query.start_after({'geohash': last_geohash, '__name__': last_user_id})
+                
+                wanted = limit - read
+                page = [(doc.id, doc.to_dict()) for doc in query.limit(wanted).stream()]
+                read += len(page)
+                for user_id, user_data in page:
+                    distance = distance_km(latitude, longitude, user_data['latitude'], user_data['longitude'])
+                    if distance <= radius_km:
+                        user_data['user_id'] = user_id
+                        user_data['distance_km'] = distance
+                        users.append(user_data)
+                
+                if len(page) < wanted:
+                    range_index, last_geohash, last_user_id = range_index + 1, None, None
+                else:
+                    last_user_id, last_geohash = page[-1][0], page[-1][1]['geohash']
+            
+            users.sort(key=lambda user: user['distance_km'])
+            next_cursor = (range_index, last_geohash, last_user_id) if range_index < len(ranges) else None
+            return {'success': True, 'users': users, 'next_cursor': next_cursor}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def backfill_user_search_fields(self, batch_size=400):
+        """Add search_tokens and coordinates to user profiles created before they existed"""
+        try:
+            batch = self.db.batch()
+            pending = 0
+            updated = 0
+            
+            for doc in self.db.collection('users').stream():
+                user_data = doc.to_dict()
+                search_fields = {
+                    'search_tokens': user_search_tokens(user_data.get('name', ''), user_data.get('location', '')),
+                    **user_location_fields(user_data.get('location', ''))
+                }
+                changed = {field: value for field, value in search_fields.items() if field not in user_data or user_data[field] != value}
+                if not changed:
+                    continue
+                
+                batch.update(doc.reference, changed)
+                pending += 1
+                updated += 1
+                if pending >= batch_size:
+                    batch.commit()
+                    batch = self.db.batch()
+                    pending = 0
+            
+            if pending:
+                batch.commit()
+            
+            return {'success': True, 'updated': updated}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -103,27 +316,22 @@ class SkillSwapDatabase:
     def create_skill(self, name, description, category="General", created_by="system"):
         """Create a skill in Skills collection"""
         try:
-            skill_id = name.lower().replace(' ', '_').replace('-', '_')
-            skill_data = {
-                'skill_id': skill_id,
-                'name': name,
-                'description': description,
-                'category': category,
-                'subcategory': '',
-                'tags': [],
-                'users_offering': 0,
-                'users_wanting': 0,
-                'total_swaps': 0,
-                'popularity_score': 0.0,
-                'is_approved': True,
-                'is_flagged': False,
-                'flag_count': 0,
-                'created_by': created_by,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }
+            skill_id = skill_id_for(name)
+            skill_data = new_skill_doc(name, description, category, created_by, firestore.SERVER_TIMESTAMP)
+            skill_ref = self.db.collection('skills').document(skill_id)
+            
+            # Re-creating an existing skill resets it but must not count it twice
+            is_new = not skill_ref.get().exists
+            batch = self.db.batch()
+            batch.set(skill_ref, skill_data)
+            if is_new:
+                self._bump_stats({'skills_total': 1}, batch)
+            batch.commit()
+            
+            # Keep the search index current without a rebuild
+            if self.skill_index is not None:
+                self.skill_index.add({k: v for k, v in skill_data.items() if v is not firestore.SERVER_TIMESTAMP})
             
-            self.db.collection('skills').document(skill_id).set(skill_data)
             return {'success': True, 'skill_id': skill_id}
             
         except Exception as e:
@@ -141,19 +349,91 @@ class SkillSwapDatabase:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def search_skills(self, query, category=None):
-        """Search skills by name or category"""
+    def get_skill_index(self, refresh=False):
+        """Get the skill search index, building it from Firestore when missing or stale"""
+        with self._skill_index_lock:
+            is_stale = time.monotonic() - self.skill_index_built_at > SKILL_INDEX_MAX_AGE
+            if self.skill_index is None or is_stale or refresh:
+                skills_ref = self.db.collection('skills').where('is_approved', '==', True)
+                self.skill_index = SkillSearchIndex(doc.to_dict() for doc in skills_ref.stream())
+                self.skill_index_built_at = time.monotonic()
+            return self.skill_index
+    
+    def update_trending_skills(self, batch_size=TREND_EVENT_BATCH, top_n=TRENDING_TOP_N):
+        """Fold pending skill events into trending scores and the top-N lists"""
         try:
-            skills_ref = self.db.collection('skills').where('is_approved', '==', True)
+            trending_ref = self.db.collection('trending').document('skills')
             
-            skills = []
-            for doc in skills_ref.stream():
-                skill_data = doc.to_dict()
-                # Simple text search
-                if query.lower() in skill_data['name'].lower():
-                    if category is None or skill_data.get('category') == category:
-                        skills.append(skill_data)
+            @firestore.transactional
+            def apply_events(transaction, event_refs):
+                # Another node may have consumed some of these events already
+                events = [snapshot.to_dict() for snapshot in transaction.get_all(event_refs) if snapshot.exists]
+                
+                log_scores, swaps = {}, {}
+                for event in events:
+                    skill_id = event['skill_id']
+                    log_scores[skill_id] = add_log_scores(log_scores.get(skill_id), event['log_score'])
+                    swaps[skill_id] = swaps.get(skill_id, 0) + (event['type'] == 'request_accepted')
+                
+                skill_refs = [self.db.collection('skills').document(skill_id) for skill_id in log_scores]
+                skills = {snapshot.id: snapshot.to_dict() for snapshot in transaction.get_all(skill_refs) if snapshot.exists}
+                trending = trending_ref.get(transaction=transaction).to_dict() or {}
+                
+                now = datetime.now()
+                entries = []
+                for skill_id, log_score in log_scores.items():
+                    skill_data = skills.get(skill_id)
+                    if skill_data is None:
+                        continue
+                    log_score = add_log_scores(skill_data.get('trend_log_score'), log_score)
+                    transaction.update(self.db.collection('skills').document(skill_id), {
+                        'trend_log_score': log_score,
+                        'popularity_score': round(current_trend_score(log_score, now), 3),
+                        'total_swaps': firestore.Increment(swaps[skill_id])
+                    })
+                    if skill_data.get('is_approved') and not skill_data.get('is_flagged'):
+                        entries.append({
+                            'skill_id': skill_id,
+                            'name': skill_data.get('name', skill_id),
+                            'category': skill_data.get('category', 'General'),
+                            'log_score': log_score
+                        })
+                
+                transaction.set(trending_ref, {**merge_trending(trending, entries, top_n), 'updated_at': firestore.SERVER_TIMESTAMP})
+                for event_ref in event_refs:
+                    transaction.delete(event_ref)
+                return len(events)
+            
+            applied = 0
+            while True:
+                event_refs = [doc.reference for doc in self.db.collection('skill_events').limit(batch_size).select(['__name__']).stream()]
+                if event_refs:
+                    applied += apply_events(self.db.transaction(), event_refs)
+                if len(event_refs) < batch_size:
+                    break
+            
+            return {'success': True, 'applied': applied}
             
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_trending_skills(self, category=None, limit=10):
+        """Get the trending skills overall or in one category, with their current scores"""
+        try:
+            trending = self.db.collection('trending').document('skills').get().to_dict() or {}
+            entries = trending.get('categories', {}).get(category, []) if category else trending.get('overall', [])
+            
+            now = datetime.now()
+            skills = [{**entry, 'score': round(current_trend_score(entry['log_score'], now), 3)} for entry in entries[:limit]]
+            return {'success': True, 'skills': skills, 'categories': sorted(trending.get('categories', {}))}
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def search_skills(self, query, category=None, limit=None):
+        """Search skills by name, description or tags"""
+        try:
+            skills = self.get_skill_index().search(query, category=category, limit=limit)
             return {'success': True, 'skills': skills}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -164,48 +444,94 @@ class SkillSwapDatabase:
     
     def add_user_skill(self, user_id, skill_name, skill_type, proficiency_level="intermediate", description=""):
         """Add skill to User_Skills collection"""
+        result = self.add_user_skills(user_id, [{
+            'skill_name': skill_name,
+            'skill_type': skill_type,
+            'proficiency_level': proficiency_level,
+            'description': description
+        }])
+        if not result['success']:
+            return result
+        return {'success': True, 'message': 'Skill added successfully'}
+    
+    def add_user_skills(self, user_id, skills):
+        """Add or update many user skills in one transaction.
+        
+        `skills` is a list of dicts with skill_name, skill_type and optional
+        proficiency_level/description. Missing skills are created, and skill
+        counters only move for relationships that were not already active.
+        """
         try:
-            # First, ensure skill exists in Skills collection
-            skill_id = skill_name.lower().replace(' ', '_').replace('-', '_')
-            skill_doc = self.db.collection('skills').document(skill_id).get()
-            
-            if not skill_doc.exists:
-                # Create skill if it doesn't exist
-                self.create_skill(skill_name, f"User-added skill: {skill_name}")
-            
-            # Create user-skill relationship
-            user_skill_id = f"{user_id}_{skill_id}_{skill_type}"
-            user_skill_data = {
-                'user_skill_id': user_skill_id,
-                'user_id': user_id,
-                'skill_id': skill_id,
-                'skill_name': skill_name,
-                'type': skill_type,  # 'offered' or 'wanted'
-                'proficiency_level': proficiency_level,  # beginner, intermediate, advanced, expert
-                'experience_years': 0,
-                'description': description,
-                'certifications': [],
-                'is_active': True,
-                'available_for_swap': True,
-                'max_concurrent_swaps': 2,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }
+            entries = {}
+            for skill in skills:
+                skill_id = skill_id_for(skill['skill_name'])
+                entries[f"{user_id}_{skill_id}_{skill['skill_type']}"] = (skill_id, skill)
+            if not entries:
+                return {'success': True, 'added': 0, 'updated': 0}
+            
+            user_ref = self.db.collection('users').document(user_id)
+            user_skill_refs = {user_skill_id: self.db.collection('user_skills').document(user_skill_id) for user_skill_id in entries}
+            skill_refs = {skill_id: self.db.collection('skills').document(skill_id) for skill_id, _ in entries.values()}
+            
+            @firestore.transactional
+            def write_skills(transaction):
+                # One read round trip for every document the writes depend on
+                refs = list(user_skill_refs.values()) + list(skill_refs.values()) + [user_ref]
+                snapshots = {snapshot.reference.path: snapshot for snapshot in transaction.get_all(refs)}
+                user_updates = self._skill_name_updates(
+                    transaction, snapshots[user_ref.path], added=[(skill['skill_name'], skill['skill_type']) for _, skill in entries.values()]
+                )
+                
+                added, counter_deltas, skill_names = [], {}, {}
+                for user_skill_id, (skill_id, skill) in entries.items():
+                    user_skill_data = new_user_skill_doc(
+                        user_id, skill['skill_name'], skill['skill_type'],
+                        skill.get('proficiency_level', 'intermediate'), skill.get('description', ''),
+                        firestore.SERVER_TIMESTAMP
+                    )
+                    existing = snapshots[user_skill_refs[user_skill_id].path]
+                    if existing.exists:
+                        user_skill_data.pop('created_at')
+                    if not existing.exists or not existing.to_dict().get('is_active'):
+                        counter = 'users_offering' if skill['skill_type'] == 'offered' else 'users_wanting'
+                        deltas = counter_deltas.setdefault(skill_id, {})
+                        deltas[counter] = deltas.get(counter, 0) + 1
+                        added.append(user_skill_id)
+                        transaction.set(self.db.collection('skill_events').document(),
+                                        new_skill_event_doc(skill_id, 'skill_added', firestore.SERVER_TIMESTAMP))
+                    transaction.set(user_skill_refs[user_skill_id], user_skill_data, merge=True)
+                    skill_names.setdefault(skill_id, skill['skill_name'])
+                
+                new_skills = {}
+                for skill_id, skill_ref in skill_refs.items():
+                    skill_data = {}
+                    if not snapshots[skill_ref.path].exists:
+                        name = skill_names[skill_id]
+                        skill_data = new_skill_doc(name, f"User-added skill: {name}", "General", "system", firestore.SERVER_TIMESTAMP)
+                        new_skills[skill_id] = dict(skill_data)
+                    skill_data.update({field: firestore.Increment(delta) for field, delta in counter_deltas.get(skill_id, {}).items()})
+                    if skill_data:
+                        transaction.set(skill_ref, skill_data, merge=True)
+                
+                if user_updates:
+                    transaction.update(user_ref, user_updates)
+                self._bump_stats({'skills_total': len(new_skills)}, transaction)
+                return added, new_skills
             
-            self.db.collection('user_skills').document(user_skill_id).set(user_skill_data)
+            added, new_skills = write_skills(self.db.transaction())
             
-            # Update skill counters
-            if skill_type == 'offered':
-                self.db.collection('skills').document(skill_id).update({'users_offering': firestore.Increment(1)})
-            else:
-                self.db.collection('skills').document(skill_id).update({'users_wanting': firestore.Increment(1)})
+            if self.skill_index is not None:
+                for skill_data in new_skills.values():
+                    self.skill_index.add({k: v for k, v in skill_data.items() if v is not firestore.SERVER_TIMESTAMP})
+            for skill_id, skill in entries.values():
+                self.match_index.add(user_id, skill_id, skill['skill_type'], skill['skill_name'])
             
-            return {'success': True, 'message': 'Skill added successfully'}
+            return {'success': True, 'added': len(added), 'updated': len(entries) - len(added)}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_user_skills(self, user_id, skill_type=None):
+    def get_user_skills(self, user_id, skill_type=None, view='full'):
         """Get user's skills"""
         try:
             query = self.db.collection('user_skills').where('user_id', '==', user_id).where('is_active', '==', True)
@@ -213,6 +539,10 @@ class SkillSwapDatabase:
             if skill_type:
                 query = query.where('type', '==', skill_type)
             
+            fields = view_fields('user_skills', view)
+            if fields is not None:
+                query = query.select(fields)
+            
             skills = []
             for doc in query.stream():
                 skill_data = doc.to_dict()
@@ -222,24 +552,178 @@ class SkillSwapDatabase:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def get_skills_for_users(self, user_ids, skill_type=None, view='full'):
+        """Get skills for many users at once, keyed by user id"""
+        try:
+            fields = view_fields('user_skills', view)
+            user_ids = list(dict.fromkeys(user_ids))
+            skills_by_user = {user_id: [] for user_id in user_ids}
+            chunks = [user_ids[i:i + IN_QUERY_LIMIT] for i in range(0, len(user_ids), IN_QUERY_LIMIT)]
+            
+            def fetch_chunk(chunk):
+                query = self.db.collection('user_skills').where('user_id', 'in', chunk).where('is_active', '==', True)
+                if skill_type:
+                    query = query.where('type', '==', skill_type)
+                if fields is not None:
+                    query = query.select(fields)
+                return [doc.to_dict() for doc in query.stream()]
+            
+            # One 'in' query per chunk, all chunks in flight at once
+            for chunk_skills in _run_concurrently(fetch_chunk, chunks):
+                for skill_data in chunk_skills:
+                    skills_by_user.setdefault(skill_data['user_id'], []).append(skill_data)
+            
+            return {'success': True, 'skills': skills_by_user}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     def remove_user_skill(self, user_id, skill_name, skill_type):
         """Remove user skill"""
+        result = self.remove_user_skills(user_id, [(skill_name, skill_type)])
+        if not result['success']:
+            return result
+        return {'success': True, 'message': 'Skill removed'}
+    
+    def remove_user_skills(self, user_id, skills):
+        """Remove many (skill_name, skill_type) user skills in one transaction"""
         try:
-            skill_id = skill_name.lower().replace(' ', '_').replace('-', '_')
-            user_skill_id = f"{user_id}_{skill_id}_{skill_type}"
+            entries = {}
+            for skill_name, skill_type in skills:
+                skill_id = skill_id_for(skill_name)
+                entries[f"{user_id}_{skill_id}_{skill_type}"] = (skill_id, skill_type, skill_name)
+            if not entries:
+                return {'success': True, 'removed': 0}
+            
+            user_ref = self.db.collection('users').document(user_id)
+            user_skill_refs = {user_skill_id: self.db.collection('user_skills').document(user_skill_id) for user_skill_id in entries}
+            skill_refs = {skill_id: self.db.collection('skills').document(skill_id) for skill_id, _, _ in entries.values()}
+            
+            @firestore.transactional
+            def delete_skills(transaction):
+                refs = list(user_skill_refs.values()) + list(skill_refs.values()) + [user_ref]
+                snapshots = {snapshot.reference.path: snapshot for snapshot in transaction.get_all(refs)}
+                user_updates = self._skill_name_updates(
+                    transaction, snapshots[user_ref.path], removed=[(skill_name, skill_type) for _, skill_type, skill_name in entries.values()]
+                )
+                
+                removed, counter_deltas = [], {}
+                for user_skill_id, (skill_id, skill_type, _) in entries.items():
+                    existing = snapshots[user_skill_refs[user_skill_id].path]
+                    if not existing.exists:
+                        continue
+                    # Only active relationships were ever counted
+                    if existing.to_dict().get('is_active'):
+                        counter = 'users_offering' if skill_type == 'offered' else 'users_wanting'
+                        deltas = counter_deltas.setdefault(skill_id, {})
+                        deltas[counter] = deltas.get(counter, 0) - 1
+                    transaction.delete(user_skill_refs[user_skill_id])
+                    removed.append(user_skill_id)
+                
+                for skill_id, deltas in counter_deltas.items():
+                    if snapshots[skill_refs[skill_id].path].exists:
+                        transaction.update(skill_refs[skill_id], {field: firestore.Increment(delta) for field, delta in deltas.items()})
+                if user_updates:
+                    transaction.update(user_ref, user_updates)
+                return removed
             
-            self.db.collection('user_skills').document(user_skill_id).delete()
+            removed = delete_skills(self.db.transaction())
             
-            # Update skill counters
-            if skill_type == 'offered':
-                self.db.collection('skills').document(skill_id).update({'users_offering': firestore.Increment(-1)})
-            else:
-                self.db.collection('skills').document(skill_id).update({'users_wanting': firestore.Increment(-1)})
+            for skill_id, skill_type, _ in entries.values():
+                self.match_index.remove(user_id, skill_id, skill_type)
             
-            return {'success': True, 'message': 'Skill removed'}
+            return {'success': True, 'removed': len(removed)}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
+    
+    def _skill_name_updates(self, transaction, user_snapshot, added=(), removed=()):
+        """Get the users skill name fields a user skills transaction should write"""
+        if not user_snapshot.exists:
+            return {}
+        user_data = user_snapshot.to_dict()
+        if any(field not in user_data for field in USER_SKILL_NAME_FIELDS.values()):
+            # Profiles from before the embedded names existed get a one-off recount
+            query = self.db.collection('user_skills').where('user_id', '==', user_snapshot.id).where('is_active', '==', True)
+            names = user_skill_names(doc.to_dict() for doc in transaction.get(query.select(['skill_name', 'type'])))
+            return {**names, **skill_name_updates(names, added, removed)}
+        return skill_name_updates(user_data, added, removed)
+    
+    def backfill_user_skill_names(self, batch_size=400):
+        """Rebuild the offered and wanted skill names embedded in user profiles.
+        
+        Adds them to profiles from before they existed and repairs any that
+        drifted from user_skills; only profiles that differ are written.
+        """
+        try:
+            batch = self.db.batch()
+            pending = 0
+            updated = 0
+            
+            for page in self.iter_collection_pages('users', page_size=batch_size, fields=list(USER_SKILL_NAME_FIELDS.values())):
+                skills_result = self.get_skills_for_users([user_id for user_id, _ in page], view='card')
+                if not skills_result['success']:
+                    raise RuntimeError(skills_result['error'])
+                
+                for user_id, user_data in page:
+                    names = user_skill_names(skills_result['skills'][user_id])
+                    changed = {field: value for field, value in names.items() if user_data.get(field) != value}
+                    if not changed:
+                        continue
+                    
+                    batch.update(self.db.collection('users').document(user_id), changed)
+                    pending += 1
+                    updated += 1
+                    if pending >= batch_size:
+                        batch.commit()
+                        batch = self.db.batch()
+                        pending = 0
+            
+            if pending:
+                batch.commit()
+            
+            return {'success': True, 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    
+    # SKILL MATCHING
+    
+    
+    def _load_match_index(self):
+        """Yield the active user_skills for the match index, a page at a time"""
+        fields = ['user_id', 'skill_id', 'type', 'skill_name', 'is_active']
+        for page in self.iter_collection_pages('user_skills', page_size=MATCH_INDEX_PAGE_SIZE, fields=fields):
+            yield from (data for _, data in page if data.get('is_active'))
+    
+    def get_match_index(self, refresh=False):
+        """Get the reciprocal match index, or None while it is first built in the background.
+    
+        refresh builds it now and waits, for scripts and benchmarks.
+        """
+        if refresh:
+            return self.match_index.rebuild()
+        return self.match_index.get()
+    
+    def get_reciprocal_matches(self, user_id, k=10):
+        """Get users who offer what this user wants and want what this user offers"""
+        try:
+            index = self.get_match_index()
+            if index is None:
+                # Not an empty result, so page snapshots don't keep it
+                return {'success': False, 'error': 'The match index is still being built'}
+            return {'success': True, 'matches': index.top_matches(user_id, k)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_swap_match(self, user_id, other_user_id):
+        """Get the reciprocal match between two users, if there is one"""
+        try:
+            index = self.get_match_index()
+            if index is None:
+                return {'success': False, 'error': 'The match index is still being built'}
+            return {'success': True, 'match': index.match_between(user_id, other_user_id)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
 
    
     # BARTER_REQUESTS COLLECTION
@@ -248,76 +732,95 @@ class SkillSwapDatabase:
     def create_barter_request(self, sender_id, receiver_id, offered_skill, requested_skill, message=""):
         """Create a skill swap request"""
         try:
-            request_data = {
-                'sender_id': sender_id,
-                'receiver_id': receiver_id,
-                'offered_skill_name': offered_skill,
-                'requested_skill_name': requested_skill,
-                'message': message,
-                'proposed_duration': '2 weeks',
-                'proposed_format': 'online',  # online, in_person, hybrid
-                'proposed_schedule': 'weekends',
-                'status': 'pending',  # pending, accepted, rejected, cancelled, completed
-                'priority': 'normal',  # low, normal, high
-                'response_message': '',
-                'rejection_reason': '',
-                'transaction_id': None,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP,
-                'responded_at': None,
-                'expires_at': datetime.now() + timedelta(days=7)  # Auto-expire in 7 days
-            }
+            request_data = new_barter_request_doc(sender_id, receiver_id, offered_skill, requested_skill, message, firestore.SERVER_TIMESTAMP)
             
             doc_ref = self.db.collection('barter_requests').document()
-            doc_ref.set(request_data)
             
-           
-            self.db.collection('users').document(receiver_id).update({'pending_requests': firestore.Increment(1)})
+            batch = self.db.batch()
+            batch.set(doc_ref, request_data)
+            batch.update(self.db.collection('users').document(receiver_id), {'pending_requests': firestore.Increment(1)})
+            for skill_name in (offered_skill, requested_skill):
+                batch.set(self.db.collection('skill_events').document(),
+                          new_skill_event_doc(skill_id_for(skill_name), 'request_created', firestore.SERVER_TIMESTAMP))
+            self._bump_stats({'pending_requests': 1}, batch)
+            batch.commit()
             
             return {'success': True, 'request_id': doc_ref.id}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_user_requests(self, user_id, request_type='all'):
-        """Get user's barter requests"""
+    def get_user_requests(self, user_id, request_type='all', limit=None, view='full'):
+        """Get user's barter requests, newest first"""
         try:
-            requests = []
-            
-            if request_type in ['sent', 'all']:
-                sent_query = self.db.collection('barter_requests').where('sender_id', '==', user_id)
-                for doc in sent_query.stream():
+            fields = view_fields('barter_requests', view)
+            
+            def fetch_requests(request_side):
+                field = 'sender_id' if request_side == 'sent' else 'receiver_id'
+                query = self.db.collection('barter_requests').where(field, '==', user_id)
+                query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+                if fields is not None:
+                    query = query.select(fields)
+                if limit:
+                    query = query.limit(limit)
+                
+                requests = []
+                for doc in query.stream():
                     request_data = doc.to_dict()
                     request_data['request_id'] = doc.id
-                    request_data['type'] = 'sent'
+                    request_data['type'] = request_side
                     requests.append(request_data)
+                return requests
             
-            if request_type in ['received', 'all']:
-                received_query = self.db.collection('barter_requests').where('receiver_id', '==', user_id)
-                for doc in received_query.stream():
-                    request_data = doc.to_dict()
-                    request_data['request_id'] = doc.id
-                    request_data['type'] = 'received'
-                    requests.append(request_data)
+            # Sent and received are separate queries, so run them side by side
+            sides = [side for side in ('sent', 'received') if request_type in [side, 'all']]
+            requests = list(heapq.merge(*_run_concurrently(fetch_requests, sides), key=lambda r: r['created_at'], reverse=True))
             
-            return {'success': True, 'requests': requests}
+            return {'success': True, 'requests': requests[:limit] if limit else requests}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def update_request_status(self, request_id, status, response_message=""):
-        """Update barter request status"""
+        """Answer a pending barter request.
+        
+        The request is re-read in the same transaction as the counter
+        updates, so a request that was answered or expired in the meantime
+        (e.g. by a second click or the expiry sweeper) is left untouched.
+        """
         try:
-            updates = {
-                'status': status,
-                'updated_at': firestore.SERVER_TIMESTAMP,
-                'responded_at': firestore.SERVER_TIMESTAMP,
-                'response_message': response_message
-            }
-            
-            self.db.collection('barter_requests').document(request_id).update(updates)
+            request_ref = self.db.collection('barter_requests').document(request_id)
+            
+            @firestore.transactional
+            def answer_request(transaction):
+                snapshot = request_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    raise LookupError('Request not found')
+                request_data = snapshot.to_dict()
+                if request_data.get('status') != 'pending':
+                    return request_data.get('status')
+                
+                transaction.update(request_ref, {
+                    'status': status,
+                    'updated_at': firestore.SERVER_TIMESTAMP,
+                    'responded_at': firestore.SERVER_TIMESTAMP,
+                    'response_message': response_message
+                })
+                transaction.update(self.db.collection('users').document(request_data['receiver_id']), {'pending_requests': firestore.Increment(-1)})
+                
+                stat_deltas = {'pending_requests': -1}
+                if status == 'accepted':
+                    stat_deltas['active_swaps'] = 1
+                    for skill_name in (request_data['offered_skill_name'], request_data['requested_skill_name']):
+                        transaction.set(self.db.collection('skill_events').document(),
+                                        new_skill_event_doc(skill_id_for(skill_name), 'request_accepted', firestore.SERVER_TIMESTAMP))
+                self._bump_stats(stat_deltas, transaction)
+                return None
+            
+            current_status = answer_request(self.db.transaction())
+            if current_status is not None:
+                return {'success': False, 'error': f"Request is already {current_status}"}
             
-           
             if status == 'accepted':
                 self.create_transaction_from_request(request_id)
             
@@ -327,6 +830,74 @@ class SkillSwapDatabase:
             return {'success': False, 'error': str(e)}
 
     
+    def expire_stale_requests(self, batch_size=REQUEST_EXPIRY_BATCH, now=None):
+        """Flip pending requests past their expires_at to 'expired', a page at a time"""
+        try:
+            now = now or datetime.now()
+            
+            @firestore.transactional
+            def expire_page(transaction, request_refs):
+                # Another node may have expired or answered some of these since the query ran
+                snapshots = [snapshot for snapshot in transaction.get_all(request_refs)
+                             if (snapshot.to_dict() or {}).get('status') == 'pending']
+                
+                expired_by_receiver = {}
+                for snapshot in snapshots:
+                    receiver_id = snapshot.get('receiver_id')
+                    expired_by_receiver[receiver_id] = expired_by_receiver.get(receiver_id, 0) + 1
+                receiver_refs = [self.db.collection('users').document(receiver_id) for receiver_id in expired_by_receiver]
+                existing_receivers = {snapshot.id for snapshot in transaction.get_all(receiver_refs) if snapshot.exists}
+                
+                for snapshot in snapshots:
+                    transaction.update(snapshot.reference, {'status': 'expired', 'updated_at': firestore.SERVER_TIMESTAMP})
+                for receiver_id, count in expired_by_receiver.items():
+                    # A deleted receiver must not wedge the sweep on this page forever
+                    if receiver_id in existing_receivers:
+                        transaction.update(self.db.collection('users').document(receiver_id), {'pending_requests': firestore.Increment(-count)})
+                expired = len(snapshots)
+                self._bump_stats({'pending_requests': -expired}, transaction)
+                return expired
+            
+            expired = 0
+            while True:
+                query = self.db.collection('barter_requests').where('status', '==', 'pending').where('expires_at', '<', now)
+                query = query.order_by('expires_at').limit(batch_size).select(['__name__'])
+                request_refs = [doc.reference for doc in query.stream()]
+                if request_refs:
+                    expired += expire_page(self.db.transaction(), request_refs)
+                if len(request_refs) < batch_size:
+                    break
+            
+            return {'success': True, 'expired': expired}
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def start_request_expiry_sweeper(self, interval=REQUEST_SWEEP_INTERVAL):
+        """Run the expiry sweeps and update_trending_skills on a background thread, once per process"""
+        with self._expiry_sweeper_lock:
+            if self._expiry_sweeper is not None and self._expiry_sweeper.is_alive():
+                return {'success': True, 'started': False}
+            
+            def sweep():
+                while True:
+                    result = self.expire_stale_requests()
+                    if not result['success']:
+                        print(f"❌ Request expiry sweep failed: {result['error']}")
+                    result = self.deactivate_expired_messages()
+                    if not result['success']:
+                        print(f"❌ Message expiry sweep failed: {result['error']}")
+                    result = self.update_trending_skills()
+                    if not result['success']:
+                        print(f"❌ Trending update failed: {result['error']}")
+                    # Jitter keeps app nodes from sweeping in lockstep
+                    time.sleep(interval * random.uniform(0.8, 1.2))
+            
+            self._expiry_sweeper = threading.Thread(target=sweep, name='request-expiry-sweeper', daemon=True)
+            self._expiry_sweeper.start()
+            return {'success': True, 'started': True}
+
+    
     # TRANSACTIONS COLLECTION
    
     
@@ -340,26 +911,7 @@ class SkillSwapDatabase:
             
             request_data = request_doc.to_dict()
             
-            transaction_data = {
-                'barter_request_id': request_id,
-                'user1_id': request_data['sender_id'],
-                'user2_id': request_data['receiver_id'],
-                'user1_skill': request_data['offered_skill_name'],
-                'user2_skill': request_data['requested_skill_name'],
-                'status': 'in_progress',  # in_progress, completed, cancelled, disputed
-                'start_date': firestore.SERVER_TIMESTAMP,
-                'expected_end_date': datetime.now() + timedelta(weeks=2),
-                'actual_end_date': None,
-                'user1_confirmed': False,
-                'user2_confirmed': False,
-                'completion_percentage': 0,
-                'sessions': [],
-                'is_disputed': False,
-                'dispute_reason': '',
-                'admin_notes': '',
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }
+            transaction_data = new_transaction_doc(request_id, request_data, firestore.SERVER_TIMESTAMP)
             
             doc_ref = self.db.collection('transactions').document()
             doc_ref.set(transaction_data)
@@ -372,30 +924,74 @@ class SkillSwapDatabase:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_user_transactions(self, user_id):
-        """Get user's transactions"""
+    def get_user_transactions(self, user_id, limit=None, view='full'):
+        """Get user's transactions, newest first"""
         try:
-            transactions = []
+            fields = view_fields('transactions', view)
+            
+            def fetch_transactions(user_role):
+                query = self.db.collection('transactions').where(f'{user_role}_id', '==', user_id)
+                query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+                if fields is not None:
+                    query = query.select(fields)
+                if limit:
+                    query = query.limit(limit)
+                
+                transactions = []
+                for doc in query.stream():
+                    transaction_data = doc.to_dict()
+                    transaction_data['transaction_id'] = doc.id
+                    transaction_data['user_role'] = user_role
+                    transactions.append(transaction_data)
+                return transactions
             
-            # Transactions where user is user1
-            query1 = self.db.collection('transactions').where('user1_id', '==', user_id)
-            for doc in query1.stream():
-                transaction_data = doc.to_dict()
-                transaction_data['transaction_id'] = doc.id
-                transaction_data['user_role'] = 'user1'
-                transactions.append(transaction_data)
+            # The user can be either side of a transaction; query both at once
+            transactions = list(heapq.merge(
+                *_run_concurrently(fetch_transactions, ['user1', 'user2']), key=lambda t: t['created_at'], reverse=True
+            ))
             
-            # Transactions where user is user2
-            query2 = self.db.collection('transactions').where('user2_id', '==', user_id)
-            for doc in query2.stream():
-                transaction_data = doc.to_dict()
-                transaction_data['transaction_id'] = doc.id
-                transaction_data['user_role'] = 'user2'
-                transactions.append(transaction_data)
+            return {'success': True, 'transactions': transactions[:limit] if limit else transactions}
             
-            return {'success': True, 'transactions': transactions}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    
+    # LIVE LISTENERS
+    
+    
+    def watch_user_activity(self, user_id, on_change, limit=None):
+        """Listen to a user's requests and transactions with on_snapshot.
+        
+        The four queries behind get_user_requests and get_user_transactions
+        each get a listener. on_change(source, changes) is called on the
+        listener thread with the source ('sent', 'received', 'user1' or
+        'user2') and a list of (change_type, doc_id, data) tuples; the first
+        call per source delivers its whole result set as ADDED changes.
+        """
+        watches = []
+        try:
+            queries = {
+                'sent': self.db.collection('barter_requests').where('sender_id', '==', user_id),
+                'received': self.db.collection('barter_requests').where('receiver_id', '==', user_id),
+                'user1': self.db.collection('transactions').where('user1_id', '==', user_id),
+                'user2': self.db.collection('transactions').where('user2_id', '==', user_id),
+            }
+            
+            for source, query in queries.items():
+                query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+                if limit:
+                    query = query.limit(limit)
+                
+                def on_snapshot(docs, changes, read_time, source=source):
+                    on_change(source, [(change.type.name, change.document.id, change.document.to_dict()) for change in changes])
+                
+                watches.append(query.on_snapshot(on_snapshot))
             
+            return {'success': True, 'watches': watches}
+        
         except Exception as e:
+            for watch in watches:
+                watch.unsubscribe()
             return {'success': False, 'error': str(e)}
 
     
@@ -405,33 +1001,33 @@ class SkillSwapDatabase:
     def create_review(self, reviewer_id, reviewee_id, transaction_id, rating, comment, title=""):
         """Create review after transaction"""
         try:
-            review_data = {
-                'reviewer_id': reviewer_id,
-                'reviewee_id': reviewee_id,
-                'transaction_id': transaction_id,
-                'rating': rating,  # 1-5 stars
-                'title': title,
-                'comment': comment,
-                'skills_learned': [],
-                'communication_rating': rating,
-                'teaching_ability': rating,
-                'reliability': rating,
-                'overall_experience': rating,
-                'is_public': True,
-                'is_verified': True,
-                'helpful_votes': 0,
-                'is_flagged': False,
-                'is_approved': True,
-                'admin_notes': '',
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            }
+            review_data = new_review_doc(reviewer_id, reviewee_id, transaction_id, rating, comment, title, firestore.SERVER_TIMESTAMP)
             
             doc_ref = self.db.collection('reviews').document()
-            doc_ref.set(review_data)
+            user_ref = self.db.collection('users').document(reviewee_id)
+            
+            # Write the review and fold it into the reviewee's running totals atomically
+            @firestore.transactional
+            def write_review(transaction):
+                user_data = user_ref.get(transaction=transaction).to_dict() or {}
+                transaction.set(doc_ref, review_data)
+                
+                if 'rating_sum' not in user_data:
+                    return False
+                
+                rating_sum = user_data['rating_sum'] + rating
+                rating_count = user_data.get('rating_count', 0) + 1
+                transaction.update(user_ref, {
+                    'rating_sum': rating_sum,
+                    'rating_count': rating_count,
+                    'rating_avg': round(rating_sum / rating_count, 1),
+                    f"rating_histogram.{rating_star(rating)}": firestore.Increment(1)
+                })
+                return True
             
-            # Update reviewee's rating
-            self.update_user_rating(reviewee_id)
+            # Profiles from before running totals existed get a one-off full recount
+            if not write_review(self.db.transaction()):
+                self.update_user_rating(reviewee_id)
             
             return {'success': True, 'review_id': doc_ref.id}
             
@@ -439,25 +1035,47 @@ class SkillSwapDatabase:
             return {'success': False, 'error': str(e)}
     
     def update_user_rating(self, user_id):
-        """Update user's average rating"""
+        """Recompute a user's rating aggregates from their approved reviews"""
         try:
             reviews_query = self.db.collection('reviews').where('reviewee_id', '==', user_id).where('is_approved', '==', True)
-            reviews = list(reviews_query.stream())
+            ratings = [doc.to_dict()['rating'] for doc in reviews_query.select(['rating']).stream()]
             
-            if reviews:
-                total_rating = sum([r.to_dict()['rating'] for r in reviews])
-                avg_rating = round(total_rating / len(reviews), 1)
-                
-                self.db.collection('users').document(user_id).update({
-                    'rating_avg': avg_rating,
-                    'rating_count': len(reviews)
-                })
+            self.db.collection('users').document(user_id).update(rating_aggregates(ratings))
             
             return {'success': True}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def rebuild_rating_aggregates(self, batch_size=400):
+        """Rebuild every user's rating aggregates from scratch, for repair"""
+        try:
+            ratings_by_user = {}
+            reviews_query = self.db.collection('reviews').where('is_approved', '==', True).select(['reviewee_id', 'rating'])
+            for doc in reviews_query.stream():
+                review_data = doc.to_dict()
+                ratings_by_user.setdefault(review_data['reviewee_id'], []).append(review_data['rating'])
+            
+            batch = self.db.batch()
+            pending = 0
+            updated = 0
+            for doc in self.db.collection('users').select(['rating_sum', 'rating_count']).stream():
+                batch.update(doc.reference, rating_aggregates(ratings_by_user.get(doc.id, [])))
+                pending += 1
+                updated += 1
+                if pending >= batch_size:
+                    batch.commit()
+                    batch = self.db.batch()
+                    pending = 0
+            
+            if pending:
+                batch.commit()
+            
+            return {'success': True, 'updated': updated}
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     def get_user_reviews(self, user_id, as_reviewee=True):
         """Get reviews for a user"""
         try:
@@ -477,61 +1095,286 @@ class SkillSwapDatabase:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    
+    # PLATFORM_STATS COLLECTION
+    
+    
+    def _bump_stats(self, deltas, batch):
+        """Add counter deltas to a random platform_stats shard as part of a batch or transaction"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        shard_ref = self.db.collection('platform_stats').document(f"shard_{random.randrange(STATS_SHARDS)}")
+        batch.set(shard_ref, {field: firestore.Increment(delta) for field, delta in deltas.items()}, merge=True)
+    
+    def get_platform_stats(self):
+        """Get platform-wide counters by summing the stats shards"""
+        try:
+            stats = {field: 0 for field in PLATFORM_STAT_FIELDS}
+            for doc in self.db.collection('platform_stats').stream():
+                for field, value in doc.to_dict().items():
+                    if field in stats:
+                        stats[field] += value
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def rebuild_platform_stats(self):
+        """Recount platform stats with aggregation queries and reset the shards"""
+        try:
+            queries = {
+                'users_total': self.db.collection('users'),
+                'users_admin': self.db.collection('users').where('role', '==', 'admin'),
+                'users_banned': self.db.collection('users').where('is_banned', '==', True),
+                'skills_total': self.db.collection('skills').where('is_approved', '==', True).where('is_flagged', '==', False),
+                'active_swaps': self.db.collection('transactions').where('status', '==', 'in_progress'),
+                'pending_requests': self.db.collection('barter_requests').where('status', '==', 'pending'),
+            }
+            stats = {field: query.count().get()[0][0].value for field, query in queries.items()}
+            
+            batch = self.db.batch()
+            for shard in range(STATS_SHARDS):
+                shard_ref = self.db.collection('platform_stats').document(f"shard_{shard}")
+                batch.set(shard_ref, stats if shard == 0 else {field: 0 for field in PLATFORM_STAT_FIELDS})
+            batch.commit()
+            
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_recent_users(self, limit=5):
+        """Get the most recently registered users"""
+        try:
+            query = self.db.collection('users').order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit)
+            users = []
+            for doc in query.stream():
+                user_data = doc.to_dict()
+                user_data['user_id'] = doc.id
+                users.append(user_data)
+            return {'success': True, 'users': users}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
   
     # SYSTEM_MESSAGES COLLECTION
    
     
-    def create_system_message(self, admin_id, title, message, message_type="announcement"):
-        """Create platform-wide message"""
-        try:
-            message_data = {
-                'admin_id': admin_id,
-                'admin_name': 'Admin',  # Get from user profile
-                'title': title,
-                'message': message,
-                'type': message_type,  # announcement, maintenance, feature_update, warning
-                'priority': 'normal',  # low, normal, high, urgent
-                'target_audience': 'all',  # all, users, admins, specific
-                'target_user_ids': [],
-                'target_roles': ['user'],
-                'is_active': True,
-                'is_dismissible': True,
-                'show_until': datetime.now() + timedelta(days=7),
-                'display_location': 'banner',  # banner, modal, notification
-                'view_count': 0,
-                'dismissal_count': 0,
-                'click_count': 0,
-                'created_at': firestore.SERVER_TIMESTAMP,
-                'updated_at': firestore.SERVER_TIMESTAMP,
-                'published_at': firestore.SERVER_TIMESTAMP
-            }
+    def create_system_message(self, admin_id, title, message, message_type="announcement", target_audience='all',
+                              target_roles=None, target_user_ids=None, show_until=None):
+        """Create a system message for everyone, some roles or specific users"""
+        try:
+            message_data = new_system_message_doc(
+                admin_id, title, message, message_type, firestore.SERVER_TIMESTAMP,
+                target_audience, target_roles, target_user_ids, show_until
+            )
             
             doc_ref = self.db.collection('system_messages').document()
             doc_ref.set(message_data)
+            self._clear_messages_cache()
             
             return {'success': True, 'message_id': doc_ref.id}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_active_messages(self):
-        """Get active system messages"""
+    def _clear_messages_cache(self):
+        with self._messages_cache_lock:
+            self._messages_cache.clear()
+    
+    def get_active_messages(self, user_id=None, role=None):
+        """Get live system messages, newest first.
+        
+        With a user_id and/or role only the messages targeted at that
+        viewer are returned; with neither, every live message (admin view).
+        Results are cached in-process until the first of them expires.
+        """
         try:
-            query = self.db.collection('system_messages').where('is_active', '==', True)
-            messages = []
+            audience = viewer_audience_keys(user_id, role) if user_id or role else None
+            cache_key = tuple(audience or ())
+            now = datetime.now()
             
-            for doc in query.stream():
+            with self._messages_cache_lock:
+                entry = self._messages_cache.get(cache_key)
+                if entry is not None and entry[0] > now:
+                    self._messages_cache.move_to_end(cache_key)
+                    return {'success': True, 'messages': copy.deepcopy(entry[1])}
+            
+            query = self.db.collection('system_messages').where('is_active', '==', True).where('show_until', '>', now)
+            if audience:
+                query = query.where('audience_keys', 'array_contains_any', audience)
+            
+            messages = []
+            for doc in query.order_by('show_until').stream():
                 message_data = doc.to_dict()
                 message_data['message_id'] = doc.id
-                
-                # Check if message is still valid
-                if message_data.get('show_until') and message_data['show_until'] > datetime.now():
-                    messages.append(message_data)
+                messages.append(message_data)
+            
+            # Firestore hands the app's naive datetimes back as UTC with the same wall-clock time
+            valid_until = now + timedelta(seconds=MESSAGES_CACHE_TTL)
+            if messages:
+                valid_until = min(valid_until, messages[0]['show_until'].replace(tzinfo=None))
+            messages.sort(key=lambda m: m.get('created_at') or now, reverse=True)
+            
+            with self._messages_cache_lock:
+                self._messages_cache[cache_key] = (valid_until, copy.deepcopy(messages))
+                self._messages_cache.move_to_end(cache_key)
+                while len(self._messages_cache) > MESSAGES_CACHE_ENTRIES:
+                    self._messages_cache.popitem(last=False)
             
             return {'success': True, 'messages': messages}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
+    
+    def deactivate_expired_messages(self, batch_size=MESSAGE_EXPIRY_BATCH, now=None):
+        """Set is_active to False on messages past show_until, a page at a time"""
+        try:
+            now = now or datetime.now()
+            deactivated = 0
+            while True:
+                query = self.db.collection('system_messages').where('is_active', '==', True).where('show_until', '<=', now)
+                query = query.order_by('show_until').limit(batch_size).select(['__name__'])
+                message_refs = [doc.reference for doc in query.stream()]
+                
+                if message_refs:
+                    batch = self.db.batch()
+                    for message_ref in message_refs:
+                        batch.update(message_ref, {'is_active': False, 'updated_at': firestore.SERVER_TIMESTAMP})
+                    batch.commit()
+                    deactivated += len(message_refs)
+                if len(message_refs) < batch_size:
+                    break
+            
+            if deactivated:
+                self._clear_messages_cache()
+            return {'success': True, 'deactivated': deactivated}
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def backfill_message_audience_keys(self, batch_size=400):
+        """Add audience_keys to system messages created before it existed"""
+        try:
+            batch = self.db.batch()
+            pending = 0
+            updated = 0
+            
+            for doc in self.db.collection('system_messages').where('is_active', '==', True).stream():
+                message_data = doc.to_dict()
+                keys = message_audience_keys(
+                    message_data.get('target_audience', 'all'),
+                    message_data.get('target_roles', []),
+                    message_data.get('target_user_ids', [])
+                )
+                if message_data.get('audience_keys') == keys:
+                    continue
+                
+                batch.update(doc.reference, {'audience_keys': keys})
+                pending += 1
+                updated += 1
+                if pending >= batch_size:
+                    batch.commit()
+                    batch = self.db.batch()
+                    pending = 0
+            
+            if pending:
+                batch.commit()
+            
+            self._clear_messages_cache()
+            return {'success': True, 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    
+    # BULK TRANSFER
+    
+    
+    def put_documents(self, collection, docs, ops_per_second=None):
+        """Write many (doc_id, data) pairs to a collection with a BulkWriter.
+        
+        Returns once every write is committed, so callers can checkpoint
+        after each call. ops_per_second pins the write rate; by default
+        the BulkWriter ramps up from 500 ops/s.
+        """
+        failures = []
+        
+        def on_write_error(failure, bulk_writer):
+            if failure.attempts < BULK_WRITE_ATTEMPTS:
+                return True
+            failures.append(failure)
+            return False
+        
+        options = BulkWriterOptions(initial_ops_per_second=ops_per_second, max_ops_per_second=ops_per_second) if ops_per_second else None
+        bulk_writer = self.db.bulk_writer(options=options)
+        bulk_writer.on_write_error(on_write_error)
+        
+        collection_ref = self.db.collection(collection)
+        for doc_id, data in docs:
+            bulk_writer.set(collection_ref.document(doc_id), data)
+        bulk_writer.close()
+        
+        if failures:
+            raise RuntimeError(f"{len(failures)} writes to {collection} failed: {failures[0].message}")
+    
+    def iter_collection_pages(self, collection, page_size=500, start_after=None, fields=None):
+        """Yield a whole collection as pages of (doc_id, data) in document id order.
+        
+        fields projects each document down to those fields on the server.
+        """
+        cursor = start_after
+        while True:
+            query = self.db.collection(collection).order_by('__name__').limit(page_size)
+            if fields:
+                query = query.select(fields)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+            
+            page = [(doc.id, doc.to_dict()) for doc in query.stream()]
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            cursor = page[-1][0]
+
+    
+    # COLLECTION EXPLORER
+    
+    
+    def query_collection(self, collection, fields=None, filters=None, order_by=None, descending=False, limit=50, start_after=None):
+        """Get one page of any collection, projected, filtered and ordered on the server.
+        
+        filters is a list of (field, op, value) with Firestore operators.
+        Pages are ordered by order_by (when given) and then document id;
+        pass the returned next_cursor as start_after to get the next page.
+        """
+        try:
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            query = self.db.collection(collection)
+            for field, op, value in filters or []:
+                query = query.where(field, op, value)
+            if order_by:
+                query = query.order_by(order_by, direction=direction)
+            query = query.order_by('__name__', direction=direction).limit(limit)
+            
+            if fields:
+                # The order field is needed to build the next cursor
+                query = query.select(list(dict.fromkeys(list(fields) + ([order_by] if order_by else []))))
+            if start_after:
+                query = query.start_after({order_by: start_after[0], '__name__': start_after[1]} if order_by else {'__name__': start_after})
+            
+            documents = []
+            cursor = None
+            for doc in query.stream():
+                doc_data = doc.to_dict()
+                cursor = [doc_data.get(order_by), doc.id] if order_by else doc.id
+                if fields:
+                    doc_data = {field: doc_data.get(field) for field in fields}
+                documents.append({'_id': doc.id, **doc_data})
+            
+            return {'success': True, 'documents': documents, 'next_cursor': cursor if len(documents) == limit else None}
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
 
     
     # SAMPLE DATA SETUP
@@ -541,20 +1384,7 @@ class SkillSwapDatabase:
         """Create sample data for testing"""
         try:
             # Sample skills
-            sample_skills = [
-                {'name': 'JavaScript Programming', 'description': 'Modern JavaScript development', 'category': 'Programming'},
-                {'name': 'Python Programming', 'description': 'Python for web development and data science', 'category': 'Programming'},
-                {'name': 'Graphic Design', 'description': 'Visual design and branding', 'category': 'Design'},
-                {'name': 'Photography', 'description': 'Digital photography and editing', 'category': 'Creative'},
-                {'name': 'Spanish Language', 'description': 'Conversational and business Spanish', 'category': 'Languages'},
-                {'name': 'Guitar Playing', 'description': 'Acoustic and electric guitar', 'category': 'Music'},
-                {'name': 'Cooking', 'description': 'International cuisine and baking', 'category': 'Lifestyle'},
-                {'name': 'Digital Marketing', 'description': 'Social media and online marketing', 'category': 'Business'},
-                {'name': 'Data Science', 'description': 'Data analysis and machine learning', 'category': 'Programming'},
-                {'name': 'UI/UX Design', 'description': 'User interface and experience design', 'category': 'Design'}
-            ]
-            
-            for skill in sample_skills:
+            for skill in SAMPLE_SKILLS:
                 self.create_skill(skill['name'], skill['description'], skill['category'])
             
             print("✅ Sample skills created successfully")
@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENT_FETCHES = 8
+
+
+def create_database(firebase_config, backend=None):
+    """Create the storage backend named by backend or the SKILLSWAP_BACKEND env var"""
+    backend = backend or os.getenv('SKILLSWAP_BACKEND', 'firestore')
+
+    if backend == 'firestore':
+        from complete_database import SkillSwapDatabase
+        return SkillSwapDatabase(firebase_config)
+    if backend == 'firestore_async':
+        from async_database import AsyncSkillSwapDatabase, BlockingSkillSwapDatabase
+        return BlockingSkillSwapDatabase(AsyncSkillSwapDatabase(firebase_config))
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteSkillSwapDatabase
+        return SQLiteSkillSwapDatabase(firebase_config)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def fetch_many(database, calls):
+    """Run independent reads together on any backend.
+
+    `calls` maps a name to a (method_name, *args) tuple. Backends with
+    their own fetch_many (the asyncio one) batch the calls natively;
+    anything else runs them on a thread pool.
+    """
+    if hasattr(database, 'fetch_many'):
+        return database.fetch_many(calls)
+    if not calls:
+        return {}
+
+    names = list(calls)
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FETCHES, len(names))) as executor:
+        futures = [executor.submit(getattr(database, calls[name][0]), *calls[name][1:]) for name in names]
+        return {name: future.result() for name, future in zip(names, futures)}
@@ -0,0 +1,404 @@
+import math
+from datetime import datetime, timedelta
+from skill_index import tokenize
+from geo import geocode, encode_geohash
+
+# Document layouts shared by every storage backend. `timestamp` is whatever
+# the backend stores for "now" (Firestore's SERVER_TIMESTAMP, or a datetime).
+
+# Longest word prefix stored in users.search_tokens
+MAX_SEARCH_PREFIX = 15
+
+# User skill type -> users field holding the names of the user's active
+# skills of that type, so a browse card needs no user_skills read
+USER_SKILL_NAME_FIELDS = {'offered': 'offered_skill_names', 'wanted': 'wanted_skill_names'}
+
+SAMPLE_SKILLS = [
+    {'name': 'JavaScript Programming', 'description': 'Modern JavaScript development', 'category': 'Programming'},
+    {'name': 'Python Programming', 'description': 'Python for web development and data science', 'category': 'Programming'},
+    {'name': 'Graphic Design', 'description': 'Visual design and branding', 'category': 'Design'},
+    {'name': 'Photography', 'description': 'Digital photography and editing', 'category': 'Creative'},
+    {'name': 'Spanish Language', 'description': 'Conversational and business Spanish', 'category': 'Languages'},
+    {'name': 'Guitar Playing', 'description': 'Acoustic and electric guitar', 'category': 'Music'},
+    {'name': 'Cooking', 'description': 'International cuisine and baking', 'category': 'Lifestyle'},
+    {'name': 'Digital Marketing', 'description': 'Social media and online marketing', 'category': 'Business'},
+    {'name': 'Data Science', 'description': 'Data analysis and machine learning', 'category': 'Programming'},
+    {'name': 'UI/UX Design', 'description': 'User interface and experience design', 'category': 'Design'}
+]
+
+
+# Counters kept in the platform_stats documents
+PLATFORM_STAT_FIELDS = ['users_total', 'users_admin', 'users_banned', 'skills_total', 'active_swaps', 'pending_requests']
+
+
+# Named field projections for list reads. 'card' is what a list card
+# renders, 'row' what an admin or detail row shows, and 'full' (not listed)
+# the whole document. Fields a backend sets from the document id, like
+# user_id on public users, come back whatever the view.
+VIEWS = {
+    'users': {
+        'card': ['name', 'location', 'availability', 'rating_avg', 'rating_count', 'offered_skill_names', 'wanted_skill_names'],
+        'row': ['name', 'email', 'location', 'availability', 'role', 'is_banned', 'profile_visibility',
+                'rating_avg', 'rating_count', 'total_swaps', 'created_at'],
+    },
+    'user_skills': {
+        'card': ['user_id', 'skill_name', 'type'],
+        'row': ['user_id', 'skill_name', 'type', 'proficiency_level', 'experience_years', 'description'],
+    },
+    'barter_requests': {
+        'card': ['offered_skill_name', 'requested_skill_name', 'status', 'message', 'created_at'],
+        'row': ['sender_id', 'receiver_id', 'offered_skill_name', 'requested_skill_name', 'status', 'message',
+                'response_message', 'transaction_id', 'created_at', 'responded_at', 'expires_at'],
+    },
+    'transactions': {
+        'card': ['user1_skill', 'user2_skill', 'status', 'completion_percentage', 'created_at'],
+        'row': ['barter_request_id', 'user1_id', 'user2_id', 'user1_skill', 'user2_skill', 'status',
+                'completion_percentage', 'start_date', 'expected_end_date', 'created_at'],
+    },
+}
+
+
+def view_fields(collection, view='full'):
+    """Fields a named view reads from a collection, or None for whole documents"""
+    if view == 'full':
+        return None
+    if view not in VIEWS.get(collection, {}):
+        raise ValueError(f"Unknown view for {collection}: {view}")
+    return VIEWS[collection][view]
+
+
+# Trending scores halve every TREND_HALF_LIFE_DAYS. A skill's score is kept
+# as log(sum of weight * 2 ** (event time - TREND_EPOCH) / half-life): it only
+# grows as events arrive, never overflows, and orders skills the same way at
+# any moment, so the current score is derived at read time.
+TREND_EPOCH = datetime(2024, 1, 1)
+TREND_HALF_LIFE_DAYS = 7
+TREND_WEIGHTS = {'skill_added': 1.0, 'request_created': 2.0, 'request_accepted': 5.0}
+
+
+def _trend_exponent(when):
+    return (when.replace(tzinfo=None) - TREND_EPOCH).total_seconds() / (TREND_HALF_LIFE_DAYS * 86400) * math.log(2)
+
+
+def add_log_scores(a, b):
+    """log(exp(a) + exp(b)), where None stands for a zero score"""
+    if a is None or b is None:
+        return b if a is None else a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_trend_score(log_score, now):
+    """Decayed trending score at `now` for a stored log score"""
+    return math.exp(log_score - _trend_exponent(now))
+
+
+def merge_trending(trending, entries, top_n):
+    """Fold updated skill entries into the materialized top-N lists.
+
+    Stored log scores only ever grow and rank the same at any time, so a
+    skill can only enter a list when it has new events, and merging the
+    touched skills into the current lists keeps them exact.
+    """
+    def merged(current, updates):
+        by_id = {entry['skill_id']: entry for entry in current}
+        by_id.update({entry['skill_id']: entry for entry in updates})
+        return sorted(by_id.values(), key=lambda entry: entry['log_score'], reverse=True)[:top_n]
+
+    categories = dict(trending.get('categories', {}))
+    for category in {entry['category'] for entry in entries}:
+        categories[category] = merged(categories.get(category, []), [e for e in entries if e['category'] == category])
+    return {'overall': merged(trending.get('overall', []), entries), 'categories': categories}
+
+
+# Roles a system message reaches for each target_audience when none are given
+AUDIENCE_ROLES = {'all': ['user'], 'users': ['user'], 'admins': ['admin'], 'specific': []}
+
+
+def message_audience_keys(target_audience, target_roles, target_user_ids):
+    """Build system_messages.audience_keys, matched with array_contains_any.
+
+    'all' reaches everyone; any other audience reaches the listed roles
+    and user ids.
+    """
+    if target_audience == 'all':
+        return ['all']
+    return [f'role:{role}' for role in target_roles] + [f'user:{user_id}' for user_id in target_user_ids]
+
+
+def viewer_audience_keys(user_id=None, role=None):
+    """Audience keys of the messages a viewer should see"""
+    keys = ['all']
+    if role:
+        keys.append(f'role:{role}')
+    if user_id:
+        keys.append(f'user:{user_id}')
+    return keys
+
+
+def skill_id_for(skill_name):
+    """Get the skills document id for a skill name"""
+    return skill_name.lower().replace(' ', '_').replace('-', '_')
+
+
+def user_search_tokens(name, location):
+    """Build the word prefixes stored in users.search_tokens"""
+    tokens = set()
+    for word in tokenize(f"{name} {location}"):
+        for length in range(1, min(len(word), MAX_SEARCH_PREFIX) + 1):
+            tokens.add(word[:length])
+    return sorted(tokens)
+
+
+def user_location_fields(location):
+    """Build the users coordinate fields for a free-text location.
+
+    They are None when the location is not in the bundled gazetteer.
+    """
+    coordinates = geocode(location)
+    if coordinates is None:
+        return {'latitude': None, 'longitude': None, 'geohash': None}
+    latitude, longitude = coordinates
+    return {'latitude': latitude, 'longitude': longitude, 'geohash': encode_geohash(latitude, longitude)}
+
+
+def merge_skill_names(names, added=(), removed=()):
+    """Apply added and removed skill names to a users skill name list.
+
+    Names are matched by skill id, so a re-added skill keeps its latest
+    spelling, and the list is kept sorted so rebuilds compare equal.
+    """
+    by_id = {skill_id_for(name): name for name in names}
+    for name in removed:
+        by_id.pop(skill_id_for(name), None)
+    for name in added:
+        by_id[skill_id_for(name)] = name
+    return sorted(by_id.values(), key=str.lower)
+
+
+def user_skill_names(user_skills):
+    """Build a user's skill name fields from their active user_skills documents"""
+    names = {field: [] for field in USER_SKILL_NAME_FIELDS.values()}
+    for user_skill in user_skills:
+        names[USER_SKILL_NAME_FIELDS[user_skill['type']]].append(user_skill['skill_name'])
+    return {field: merge_skill_names([], added) for field, added in names.items()}
+
+
+def skill_name_updates(user_data, added=(), removed=()):
+    """Get the users skill name fields that change when (skill_name, skill_type) pairs are added or removed"""
+    updates = {}
+    for skill_type, field in USER_SKILL_NAME_FIELDS.items():
+        names = merge_skill_names(
+            user_data.get(field) or [],
+            [name for name, kind in added if kind == skill_type],
+            [name for name, kind in removed if kind == skill_type]
+        )
+        if names != user_data.get(field):
+            updates[field] = names
+    return updates
+
+
+def rating_star(rating):
+    """Clamp a rating to the 1-5 histogram bucket it counts towards"""
+    return min(5, max(1, int(round(rating))))
+
+
+def rating_aggregates(ratings):
+    """Build the users rating fields from a list of ratings"""
+    histogram = {str(star): 0 for star in range(1, 6)}
+    for rating in ratings:
+        histogram[str(rating_star(rating))] += 1
+    rating_sum = sum(ratings)
+    return {
+        'rating_avg': round(rating_sum / len(ratings), 1) if ratings else 0.0,
+        'rating_count': len(ratings),
+        'rating_sum': rating_sum,
+        'rating_histogram': histogram
+    }
+
+
+def new_user_doc(user_id, email, name, location, timestamp):
+    """Build a new Users document"""
+    return {
+        'user_id': user_id,
+        'email': email,
+        'name': name,
+        'location': location,
+        'profile_photo': '',
+        'availability': 'weekends',  # weekends, evenings, flexible, anytime
+        'profile_visibility': 'public',  # public, private
+        'role': 'user',  # user, admin
+        'is_banned': False,
+        'ban_reason': '',
+        'banned_until': None,
+        'rating_avg': 0.0,
+        'rating_count': 0,
+        'rating_sum': 0,
+        'rating_histogram': {str(star): 0 for star in range(1, 6)},
+        'total_swaps': 0,
+        'successful_swaps': 0,
+        'pending_requests': 0,
+        'search_tokens': user_search_tokens(name, location),
+        **user_location_fields(location),
+        'offered_skill_names': [],
+        'wanted_skill_names': [],
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'last_login': timestamp
+    }
+
+
+def new_skill_doc(name, description, category, created_by, timestamp):
+    """Build a new Skills document"""
+    return {
+        'skill_id': skill_id_for(name),
+        'name': name,
+        'description': description,
+        'category': category,
+        'subcategory': '',
+        'tags': [],
+        'users_offering': 0,
+        'users_wanting': 0,
+        'total_swaps': 0,
+        'popularity_score': 0.0,  # trending score as of the last trending job run
+        'trend_log_score': None,  # see TREND_EPOCH
+        'is_approved': True,
+        'is_flagged': False,
+        'flag_count': 0,
+        'created_by': created_by,
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def new_user_skill_doc(user_id, skill_name, skill_type, proficiency_level, description, timestamp):
+    """Build a new User_Skills document"""
+    skill_id = skill_id_for(skill_name)
+    return {
+        'user_skill_id': f"{user_id}_{skill_id}_{skill_type}",
+        'user_id': user_id,
+        'skill_id': skill_id,
+        'skill_name': skill_name,
+        'type': skill_type,  # 'offered' or 'wanted'
+        'proficiency_level': proficiency_level,  # beginner, intermediate, advanced, expert
+        'experience_years': 0,
+        'description': description,
+        'certifications': [],
+        'is_active': True,
+        'available_for_swap': True,
+        'max_concurrent_swaps': 2,
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def new_barter_request_doc(sender_id, receiver_id, offered_skill, requested_skill, message, timestamp):
+    """Build a new Barter_Requests document"""
+    return {
+        'sender_id': sender_id,
+        'receiver_id': receiver_id,
+        'offered_skill_name': offered_skill,
+        'requested_skill_name': requested_skill,
+        'message': message,
+        'proposed_duration': '2 weeks',
+        'proposed_format': 'online',  # online, in_person, hybrid
+        'proposed_schedule': 'weekends',
+        'status': 'pending',  # pending, accepted, rejected, cancelled, completed, expired
+        'priority': 'normal',  # low, normal, high
+        'response_message': '',
+        'rejection_reason': '',
+        'transaction_id': None,
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'responded_at': None,
+        'expires_at': datetime.now() + timedelta(days=7)  # Auto-expire in 7 days
+    }
+
+
+def new_transaction_doc(request_id, request_data, timestamp):
+    """Build a Transactions document for an accepted request"""
+    return {
+        'barter_request_id': request_id,
+        'user1_id': request_data['sender_id'],
+        'user2_id': request_data['receiver_id'],
+        'user1_skill': request_data['offered_skill_name'],
+        'user2_skill': request_data['requested_skill_name'],
+        'status': 'in_progress',  # in_progress, completed, cancelled, disputed
+        'start_date': timestamp,
+        'expected_end_date': datetime.now() + timedelta(weeks=2),
+        'actual_end_date': None,
+        'user1_confirmed': False,
+        'user2_confirmed': False,
+        'completion_percentage': 0,
+        'sessions': [],
+        'is_disputed': False,
+        'dispute_reason': '',
+        'admin_notes': '',
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def new_review_doc(reviewer_id, reviewee_id, transaction_id, rating, comment, title, timestamp):
+    """Build a new Reviews document"""
+    return {
+        'reviewer_id': reviewer_id,
+        'reviewee_id': reviewee_id,
+        'transaction_id': transaction_id,
+        'rating': rating,  # 1-5 stars
+        'title': title,
+        'comment': comment,
+        'skills_learned': [],
+        'communication_rating': rating,
+        'teaching_ability': rating,
+        'reliability': rating,
+        'overall_experience': rating,
+        'is_public': True,
+        'is_verified': True,
+        'helpful_votes': 0,
+        'is_flagged': False,
+        'is_approved': True,
+        'admin_notes': '',
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def new_skill_event_doc(skill_id, event_type, timestamp, occurred_at=None):
+    """Build a new Skill_Events document, consumed by the trending job"""
+    occurred_at = occurred_at or datetime.now()
+    return {
+        'skill_id': skill_id,
+        'type': event_type,  # skill_added, request_created, request_accepted
+        'log_score': math.log(TREND_WEIGHTS[event_type]) + _trend_exponent(occurred_at),
+        'created_at': timestamp
+    }
+
+
+def new_system_message_doc(admin_id, title, message, message_type, timestamp, target_audience='all',
+                           target_roles=None, target_user_ids=None, show_until=None):
+    """Build a new System_Messages document"""
+    target_roles = AUDIENCE_ROLES.get(target_audience, []) if target_roles is None else list(target_roles)
+    target_user_ids = list(target_user_ids or [])
+    return {
+        'admin_id': admin_id,
+        'admin_name': 'Admin',  # Get from user profile
+        'title': title,
+        'message': message,
+        'type': message_type,  # announcement, maintenance, feature_update, warning
+        'priority': 'normal',  # low, normal, high, urgent
+        'target_audience': target_audience,  # all, users, admins, specific
+        'target_user_ids': target_user_ids,
+        'target_roles': target_roles,
+        'audience_keys': message_audience_keys(target_audience, target_roles, target_user_ids),
+        'is_active': True,
+        'is_dismissible': True,
+        'show_until': show_until or datetime.now() + timedelta(days=7),
+        'display_location': 'banner',  # banner, modal, notification
+        'view_count': 0,
+        'dismissal_count': 0,
+        'click_count': 0,
+        'created_at': timestamp,
+        'updated_at': timestamp,
+        'published_at': timestamp
+    }
@@ -0,0 +1,152 @@
+"""Offline geocoding and geohash radius search.
+
+Profile locations are free text, so they are geocoded against a small
+bundled gazetteer of cities. Users store the coordinates with a geohash,
+which turns "within radius_km of a point" into at most four prefix range
+queries on one indexed field; the candidates they return are then filtered
+by exact distance.
+
+Coordinates are city centres, not addresses: everyone in a city shares one
+point, so distances only tell cities apart.
+"""
+import math
+import re
+import unicodedata
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Length of the geohash stored on users (cells of about 5 x 5 m)
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+
+# City -> (latitude, longitude), keyed by normalized name
+GAZETTEER = {
+    # Europe
+    'london': (51.5074, -0.1278), 'manchester': (53.4808, -2.2426), 'birmingham': (52.4862, -1.8904),
+    'edinburgh': (55.9533, -3.1883), 'dublin': (53.3498, -6.2603), 'paris': (48.8566, 2.3522),
+    'lyon': (45.7640, 4.8357), 'marseille': (43.2965, 5.3698), 'berlin': (52.5200, 13.4050),
+    'munich': (48.1351, 11.5820), 'hamburg': (53.5511, 9.9937), 'frankfurt': (50.1109, 8.6821),
+    'amsterdam': (52.3676, 4.9041), 'brussels': (50.8503, 4.3517), 'zurich': (47.3769, 8.5417),
+    'vienna': (48.2082, 16.3738), 'prague': (50.0755, 14.4378), 'warsaw': (52.2297, 21.0122),
+    'budapest': (47.4979, 19.0402), 'copenhagen': (55.6761, 12.5683), 'stockholm': (59.3293, 18.0686),
+    'oslo': (59.9139, 10.7522), 'helsinki': (60.1699, 24.9384), 'madrid': (40.4168, -3.7038),
+    'barcelona': (41.3851, 2.1734), 'lisbon': (38.7223, -9.1393), 'rome': (41.9028, 12.4964),
+    'milan': (45.4642, 9.1900), 'athens': (37.9838, 23.7275), 'istanbul': (41.0082, 28.9784),
+    'kyiv': (50.4501, 30.5234), 'moscow': (55.7558, 37.6173),
+    # Americas
+    'new york': (40.7128, -74.0060), 'boston': (42.3601, -71.0589), 'washington': (38.9072, -77.0369),
+    'philadelphia': (39.9526, -75.1652), 'chicago': (41.8781, -87.6298), 'atlanta': (33.7490, -84.3880),
+    'miami': (25.7617, -80.1918), 'houston': (29.7604, -95.3698), 'dallas': (32.7767, -96.7970),
+    'austin': (30.2672, -97.7431), 'denver': (39.7392, -104.9903), 'phoenix': (33.4484, -112.0740),
+    'los angeles': (34.0522, -118.2437), 'san francisco': (37.7749, -122.4194), 'seattle': (47.6062, -122.3321),
+    'toronto': (43.6532, -79.3832), 'montreal': (45.5017, -73.5673), 'vancouver': (49.2827, -123.1207),
+    'mexico city': (19.4326, -99.1332), 'bogota': (4.7110, -74.0721), 'lima': (-12.0464, -77.0428),
+    'santiago': (-33.4489, -70.6693), 'buenos aires': (-34.6037, -58.3816), 'sao paulo': (-23.5505, -46.6333),
+    'rio de janeiro': (-22.9068, -43.1729),
+    # Africa and the Middle East
+    'lagos': (6.5244, 3.3792), 'accra': (5.6037, -0.1870), 'nairobi': (-1.2921, 36.8219),
+    'cairo': (30.0444, 31.2357), 'johannesburg': (-26.2041, 28.0473), 'cape town': (-33.9249, 18.4241),
+    'casablanca': (33.5731, -7.5898), 'dubai': (25.2048, 55.2708), 'riyadh': (24.7136, 46.6753),
+    'tel aviv': (32.0853, 34.7818),
+    # Asia and Oceania
+    'mumbai': (19.0760, 72.8777), 'delhi': (28.7041, 77.1025), 'bangalore': (12.9716, 77.5946),
+    'chennai': (13.0827, 80.2707), 'hyderabad': (17.3850, 78.4867), 'kolkata': (22.5726, 88.3639),
+    'karachi': (24.8607, 67.0011), 'dhaka': (23.8103, 90.4125), 'bangkok': (13.7563, 100.5018),
+    'singapore': (1.3521, 103.8198), 'kuala lumpur': (3.1390, 101.6869), 'jakarta': (-6.2088, 106.8456),
+    'manila': (14.5995, 120.9842), 'hong kong': (22.3193, 114.1694), 'shanghai': (31.2304, 121.4737),
+    'beijing': (39.9042, 116.4074), 'taipei': (25.0330, 121.5654), 'seoul': (37.5665, 126.9780),
+    'tokyo': (35.6762, 139.6503), 'osaka': (34.6937, 135.5023), 'sydney': (-33.8688, 151.2093),
+    'melbourne': (-37.8136, 144.9631), 'auckland': (-36.8485, 174.7633),
+}
+
+# Other common spellings -> gazetteer name
+ALIASES = {
+    'nyc': 'new york', 'new york city': 'new york', 'la': 'los angeles', 'sf': 'san francisco',
+    'washington dc': 'washington', 'new delhi': 'delhi', 'bombay': 'mumbai', 'bengaluru': 'bangalore',
+    'calcutta': 'kolkata', 'madras': 'chennai', 'munchen': 'munich', 'wien': 'vienna', 'praha': 'prague',
+    'roma': 'rome', 'milano': 'milan', 'lisboa': 'lisbon', 'kiev': 'kyiv', 'peking': 'beijing',
+}
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def geocode(location):
+    """Get (latitude, longitude) for a free-text location, or None.
+
+    The whole text is tried first and then each comma-separated part, so
+    "Berlin, Germany" finds Berlin.
+    """
+    for part in [location or ''] + (location or '').split(','):
+        name = _normalize(part)
+        name = ALIASES.get(name, name)
+        if name in GAZETTEER:
+            return GAZETTEER[name]
+    return None
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a point as a geohash of `precision` characters"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, value, even = [], 0, 0, True
+    while len(geohash) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        bounds, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            geohash.append(GEOHASH_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(geohash)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell_size(precision):
+    """(latitude, longitude) extent in degrees of a geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def geohash_ranges(latitude, longitude, radius_km):
+    """Get (start, end) geohash ranges that together cover a circle.
+
+    Uses the longest prefix whose cells are at least as large as the
+    circle's bounding box, so the box touches at most 2 x 2 cells and the
+    circle needs at most four range queries. Matching geohashes satisfy
+    start <= geohash <= end.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    # The box is widest on the side nearer the pole
+    widest_lat = abs(latitude) + lat_delta
+    lon_delta = 180.0 if widest_lat >= 90 else min(180.0, lat_delta / math.cos(math.radians(widest_lat)))
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = _cell_size(precision)
+        if cell_lat >= 2 * lat_delta and cell_lon >= 2 * lon_delta:
+            break
+    else:
+        return [('', '~')]
+
+    cells = set()
+    for lat in (max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0)):
+        for lon in (longitude - lon_delta, longitude + lon_delta):
+            # Longitudes past the antimeridian wrap around
+            cells.add(encode_geohash(lat, (lon + 180.0) % 360.0 - 180.0, precision))
+    return [(cell, cell + '~') for cell in sorted(cells)]
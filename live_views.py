@@ -0,0 +1,199 @@
+"""Listener-backed views of each user's requests and transactions.
+
+A view keeps its own copy of the documents behind get_user_requests and
+get_user_transactions and folds in on_snapshot changes as they arrive, so
+page renders are answered from memory without touching Firestore. Views
+are shared by every session of the same user in the process and reference
+counted: the first subscriber opens the listeners and the last one to
+leave closes them. A view whose listeners fail or never deliver their
+first snapshot is dropped, and for RETRY_AFTER seconds pages read through
+the database instead of opening new listeners for that user.
+"""
+import heapq
+import threading
+import time
+import weakref
+
+# Matches the page size of the requests and transactions pages
+LIVE_VIEW_LIMIT = 100
+
+# How long a page waits for a new view's first snapshots before reading directly
+READY_TIMEOUT = 5
+
+# Seconds after a failed view before listeners are tried again for that user
+RETRY_AFTER = 300
+
+REQUEST_SOURCES = ('sent', 'received')
+TRANSACTION_SOURCES = ('user1', 'user2')
+
+
+class UserActivityView:
+    """Incrementally updated sent/received requests and transactions of one user"""
+
+    def __init__(self, user_id, limit=LIVE_VIEW_LIMIT):
+        self.user_id = user_id
+        self.limit = limit
+        self._docs = {source: {} for source in REQUEST_SOURCES + TRANSACTION_SOURCES}  # source -> doc_id -> data
+        self._ready = {source: threading.Event() for source in self._docs}
+        self._lock = threading.Lock()
+        self._watches = []
+        self._closed = False
+        self.error = None
+
+    def start(self, database):
+        """Open the listeners on a database that supports watch_user_activity"""
+        result = database.watch_user_activity(self.user_id, self.apply_changes, self.limit)
+        if not result['success']:
+            self.fail(result['error'])
+            return result
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._watches = result['watches']
+        # The view failed or was released while the listeners were opening
+        if closed:
+            for watch in result['watches']:
+                watch.unsubscribe()
+        return result
+
+    def close(self):
+        """Stop listening"""
+        with self._lock:
+            self._closed = True
+            watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.unsubscribe()
+
+    def fail(self, error):
+        """Record a listener failure, wake any waiting pages and drop the view"""
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        for event in self._ready.values():
+            event.set()
+        _forget(self)
+        self.close()
+
+    def apply_changes(self, source, changes):
+        """Fold one snapshot's (change_type, doc_id, data) changes into the view"""
+        with self._lock:
+            docs = self._docs[source]
+            for change_type, doc_id, data in changes:
+                if change_type == 'REMOVED':
+                    docs.pop(doc_id, None)
+                else:
+                    docs[doc_id] = data
+        self._ready[source].set()
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Wait until every listener has delivered its first snapshot.
+
+        Returns False straight away once the view has failed; a view that
+        is not ready within the timeout is failed, so no page waits on it again.
+        """
+        if self.error is None:
+            deadline = time.monotonic() + timeout
+            if not all(event.wait(max(deadline - time.monotonic(), 0)) for event in self._ready.values()):
+                self.fail(f"Listeners sent no first snapshot within {timeout}s")
+            # A closed stream stops delivering without telling the callback
+            elif any(getattr(watch, '_closed', False) for watch in list(self._watches)):
+                self.fail("Listener stream closed")
+        return self.error is None
+
+    def _newest_first(self, sources, id_field, source_field, limit):
+        with self._lock:
+            halves = [
+                sorted(
+                    ({**data, id_field: doc_id, source_field: source} for doc_id, data in self._docs[source].items()),
+                    key=lambda d: d['created_at'], reverse=True
+                )
+                for source in sources
+            ]
+        merged = list(heapq.merge(*halves, key=lambda d: d['created_at'], reverse=True))
+        return merged[:limit] if limit else merged
+
+    def get_user_requests(self, request_type='all', limit=None):
+        """Get the user's barter requests, newest first, shaped like the database method"""
+        sources = [source for source in REQUEST_SOURCES if request_type in [source, 'all']]
+        return {'success': True, 'requests': self._newest_first(sources, 'request_id', 'type', limit)}
+
+    def get_user_transactions(self, limit=None):
+        """Get the user's transactions, newest first, shaped like the database method"""
+        return {'success': True, 'transactions': self._newest_first(TRANSACTION_SOURCES, 'transaction_id', 'user_role', limit)}
+
+
+_views = {}  # user_id -> [view, subscriber count]
+_failed_at = {}  # user_id -> monotonic time of the last view failure
+_views_lock = threading.Lock()
+
+
+def _forget(view):
+    """Drop a failed view so new subscribers don't get it"""
+    with _views_lock:
+        _failed_at[view.user_id] = time.monotonic()
+        entry = _views.get(view.user_id)
+        if entry is not None and entry[0] is view:
+            del _views[view.user_id]
+
+
+def _release(user_id, view):
+    with _views_lock:
+        entry = _views.get(user_id)
+        # A failed view has already been dropped, possibly for a newer one
+        if entry is None or entry[0] is not view:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _views[user_id]
+    view.close()
+
+
+class Subscription:
+    """One holder's reference to a shared view.
+
+    Closing the subscription, or letting it be garbage collected with the
+    session state that holds it, gives the reference back.
+    """
+
+    def __init__(self, user_id, view):
+        self.user_id = user_id
+        self.view = view
+        self._finalizer = weakref.finalize(self, _release, user_id, view)
+
+    def close(self):
+        self._finalizer()
+
+
+def subscribe(database, user_id):
+    """Get a subscription to the user's shared live view.
+
+    Returns None when the backend has no listeners (SQLite), they could
+    not be opened, or they failed for this user in the last RETRY_AFTER
+    seconds; callers then read through the database as usual.
+    """
+    if not hasattr(database, 'watch_user_activity'):
+        return None
+
+    with _views_lock:
+        failed_at = _failed_at.get(user_id)
+        if failed_at is not None and time.monotonic() - failed_at < RETRY_AFTER:
+            return None
+        entry = _views.get(user_id)
+        is_new = entry is None
+        if is_new:
+            entry = _views[user_id] = [UserActivityView(user_id), 0]
+        entry[1] += 1
+        subscription = Subscription(user_id, entry[0])
+
+    # Opening listeners can be slow, so it must not hold up other sessions
+    if is_new and not subscription.view.start(database)['success']:
+        subscription.close()
+        return None
+    return subscription
+
+
+def active_view_count():
+    """Number of users with open listeners in this process"""
+    with _views_lock:
+        return len(_views)
@@ -1,7 +1,16 @@
 import streamlit as st
 import pandas as pd
-from firebase_config import firebase_auth
-from admin_pages import show_admin_interface
+from firebase_config import firebase_auth as firebase_backend
+from cached_database import cached
+from admin_pages import show_admin_interface, discard_report_file
+from pagination import current_cursor, pagination_controls, reset_pagination
+from session_data import SessionWriteTracker, cached_page_data, clear_page_data
+from documents import user_location_fields
+import live_views
+
+# Serve repeated reads across reruns from the shared cache layer, and let
+# this session's writes mark its page snapshots stale
+firebase_auth = SessionWriteTracker(cached(firebase_backend))
 
 # Page configuration
 st.set_page_config(
@@ -97,6 +106,15 @@ st.markdown("""
         font-weight: bold;
         border: 1px solid #ef4444;
     }
+    .status-expired {
+        background: #f3f4f6;
+        color: #4b5563;
+        padding: 0.2rem 0.6rem;
+        border-radius: 10px;
+        font-size: 0.8rem;
+        font-weight: bold;
+        border: 1px solid #9ca3af;
+    }
     .admin-notice {
         background: #fef2f2;
         border: 2px solid #fca5a5;
@@ -134,6 +152,13 @@ st.markdown("""
 # Initialize Firebase
 firebase_auth.initialize()
 
+# Expire stale swap requests in the background (started once per process)
+firebase_auth.start_request_expiry_sweeper()
+
+# Start building the skill match index in the background so it is ready
+# before the first home page asks for matches
+firebase_auth.get_match_index()
+
 # Initialize session state
 if 'user' not in st.session_state:
     st.session_state.user = None
@@ -142,6 +167,28 @@ if 'user_profile' not in st.session_state:
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
 
+def live_activity_view(user_id):
+    """Get the live view of a user's requests and transactions, held in session state across reruns"""
+    subscription = st.session_state.get('live_activity')
+    if subscription is not None and subscription.user_id != user_id:
+        close_live_activity()
+        subscription = None
+    if subscription is None:
+        subscription = live_views.subscribe(firebase_auth, user_id)
+        st.session_state.live_activity = subscription
+    if subscription and subscription.view.wait_ready():
+        return subscription.view
+    # A failed view was dropped and won't be retried for a while, so later reruns read directly
+    if subscription:
+        close_live_activity()
+    return None
+
+def close_live_activity():
+    """Give back this session's reference to the live view"""
+    subscription = st.session_state.pop('live_activity', None)
+    if subscription is not None:
+        subscription.close()
+
 def show_header():
     """Display main header"""
     st.markdown("""
@@ -199,6 +246,9 @@ def show_navigation():
     with col7:
         if st.session_state.user:
             if st.button("🚪 Logout", use_container_width=True):
+                close_live_activity()
+                discard_report_file()
+                clear_page_data()
                 st.session_state.user = None
                 st.session_state.user_profile = None
                 st.session_state.current_page = 'home'
@@ -281,8 +331,28 @@ def home_page():
     """Home page"""
     if st.session_state.user:
         profile = st.session_state.user_profile
+        user_id = st.session_state.user['localId']
         st.subheader(f"👋 Welcome back, {profile['name']}!")
         
+        def fetch_home_data():
+            # The page's independent reads, fetched concurrently
+            data = firebase_auth.fetch_many({
+                'skills': ('get_user_skills', user_id, None, 'card'),
+                'matches': ('get_reciprocal_matches', user_id, 5),
+                'messages': ('get_active_messages', user_id, profile.get('role', 'user')),
+                'trending': ('get_trending_skills',),
+            })
+            matches = data['matches']['matches'] if data['matches']['success'] else []
+            data['match_profiles'] = {
+                'success': True,
+                'profiles': firebase_auth.fetch_many({
+                    match['user_id']: ('get_user_profile', match['user_id']) for match in matches
+                })
+            }
+            return data
+        
+        page_data = cached_page_data('home', (user_id,), ('skills', 'users', 'messages'), fetch_home_data)
+        
         # Debug info for admin
         with st.expander("🔧 Debug Info (Admin Check)"):
             st.markdown(f"""
@@ -311,7 +381,7 @@ def home_page():
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             # Get user skills count
-            skills_result = firebase_auth.get_user_skills(st.session_state.user['localId'])
+            skills_result = page_data['skills']
             offered_count = len([s for s in skills_result.get('skills', []) if s['type'] == 'offered']) if skills_result['success'] else 0
             st.metric("🎯 Skills Offered", offered_count)
         
@@ -346,8 +416,41 @@ def home_page():
                 st.session_state.current_page = 'requests'
                 st.rerun()
         
+        # Reciprocal skill matches
+        matches_result = page_data['matches']
+        if matches_result['success'] and matches_result['matches']:
+            st.markdown("---")
+            st.subheader("🤝 Suggested Swaps")
+            match_profiles = page_data['match_profiles']['profiles']
+            for match in matches_result['matches']:
+                match_result = match_profiles[match['user_id']]
+                if not match_result['success']:
+                    continue
+                match_user = match_result['profile']
+                if match_user.get('is_banned') or match_user.get('profile_visibility') != 'public':
+                    continue
+                match_user['user_id'] = match['user_id']
+                
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.write(f"**👤 {match_user['name']}** offers {', '.join(match['they_offer'])} "
+                             f"and wants {', '.join(match['they_want'])}")
+                with col2:
+                    if st.button("🤝 Request Swap", key=f"match_{match['user_id']}"):
+                        st.session_state.selected_user = match_user
+                        st.session_state.current_page = 'request_form'
+                        st.rerun()
+        
+        # Trending skills, materialized by the background trending job
+        trending_result = page_data['trending']
+        if trending_result['success'] and trending_result['skills']:
+            st.markdown("---")
+            st.subheader("🔥 Trending Skills")
+            trending_html = "".join([f'<span class="skill-tag">{skill["name"]}</span>' for skill in trending_result['skills']])
+            st.markdown(trending_html, unsafe_allow_html=True)
+        
         # System messages
-        messages_result = firebase_auth.get_active_messages()
+        messages_result = page_data['messages']
         if messages_result['success'] and messages_result['messages']:
             st.markdown("---")
             st.subheader("📢 Platform Updates")
@@ -378,41 +481,81 @@ def browse_users_page():
     """Browse users page"""
     st.subheader("👥 Browse Skill Swappers")
     
-    # Get public users
-    users_result = firebase_auth.get_public_users(50)
+    # Search and filter
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        search_term = st.text_input("🔍 Search by name or location")
+    with col2:
+        availability_filter = st.selectbox("📅 Availability", ["All", "weekends", "evenings", "flexible", "anytime"])
+    with col3:
+        distance_filter = st.selectbox("📍 Distance", ["Anywhere", "5 km", "25 km", "100 km"])
+    
+    # Nearby searches start from the coordinates geocoded from the profile location
+    origin = None
+    if distance_filter != "Anywhere":
+        profile = st.session_state.user_profile or {}
+        if profile.get('latitude') is None and profile.get('location'):
+            # Sessions that loaded the profile before it was geocoded get the
+            # coordinates from the location text directly
+            profile.update(user_location_fields(profile['location']))
+        if profile.get('latitude') is None:
+            st.info("📍 Set your location to a city name in your profile to find swappers near you.")
+        else:
+            origin = (profile['latitude'], profile['longitude'], float(distance_filter.split()[0]))
+    
+    # New filters start again from the first page
+    browse_filters = (search_term, availability_filter, distance_filter)
+    if st.session_state.get('browse_filters') != browse_filters:
+        st.session_state.browse_filters = browse_filters
+        reset_pagination('browse_pager')
+    
+    def fetch_browse_data():
+        if origin:
+            # Nearest first within each page; the other filters are applied to the page
+            users_result = firebase_auth.get_nearby_users(*origin, limit=50, start_after=current_cursor('browse_pager'), view='card')
+            if users_result['success']:
+                words = search_term.lower().split()
+                users_result['users'] = [
+                    u for u in users_result['users']
+                    if availability_filter in ["All", u.get('availability')]
+                    and all(word in f"{u.get('name', '')} {u.get('location', '')}".lower() for word in words)
+                ]
+        else:
+            # One query per page: the cards carry each user's skill names
+            users_result = firebase_auth.get_public_users(
+                50,
+                start_after=current_cursor('browse_pager'),
+                availability=None if availability_filter == "All" else availability_filter,
+                search=search_term,
+                view='card'
+            )
+        return {'users': users_result, 'trending': firebase_auth.get_trending_skills(limit=8)}
+    
+    page_data = cached_page_data(
+        'browse', (search_term, availability_filter, origin, current_cursor('browse_pager')), ('users', 'skills'), fetch_browse_data
+    )
+    users_result = page_data['users']
+    
+    trending_result = page_data['trending']
+    if trending_result['success'] and trending_result['skills']:
+        st.caption("🔥 Trending: " + ", ".join(skill['name'] for skill in trending_result['skills']))
     
     if users_result['success']:
         users = users_result['users']
         
         if users:
-            # Search and filter
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                search_term = st.text_input("🔍 Search by name or location")
-            with col2:
-                availability_filter = st.selectbox("📅 Availability", ["All", "weekends", "evenings", "flexible", "anytime"])
-            
-            # Filter users
-            filtered_users = users
-            if search_term:
-                filtered_users = [u for u in filtered_users if
-                                search_term.lower() in u.get('name', '').lower() or
-                                search_term.lower() in u.get('location', '').lower()]
-            if availability_filter != "All":
-                filtered_users = [u for u in filtered_users if u.get('availability') == availability_filter]
-            
             # Display users
-            for user in filtered_users:
-                # Get user skills
-                skills_result = firebase_auth.get_user_skills(user['user_id'])
-                offered_skills = [s['skill_name'] for s in skills_result.get('skills', []) if s['type'] == 'offered'] if skills_result['success'] else []
-                wanted_skills = [s['skill_name'] for s in skills_result.get('skills', []) if s['type'] == 'wanted'] if skills_result['success'] else []
+            for user in users:
+                offered_skills = user.get('offered_skill_names') or []
+                wanted_skills = user.get('wanted_skill_names') or []
+                
+                distance = f" · {user['distance_km']:.1f} km away" if 'distance_km' in user else ""
                 
                 with st.container():
                     st.markdown(f"""
                     <div class="user-card">
                         <h3>👤 {user['name']}</h3>
-                        <p>📍 {user.get('location', 'Location not specified')}</p>
+                        <p>📍 {user.get('location', 'Location not specified')}{distance}</p>
                         <p>📅 Available: {user.get('availability', 'Not specified')}</p>
                     </div>
                     """, unsafe_allow_html=True)
@@ -446,6 +589,13 @@ def browse_users_page():
                                 st.session_state.selected_user = user
                                 st.session_state.current_page = 'request_form'
                                 st.rerun()
+            
+            pagination_controls('browse_pager', users_result['next_cursor'])
+        elif users_result['next_cursor']:
+            st.info("No matching users on this page.")
+            pagination_controls('browse_pager', users_result['next_cursor'])
+        elif search_term or availability_filter != "All" or origin:
+            st.info("No users match your search.")
         else:
             st.info("No users found. Be the first to join!")
     else:
@@ -469,7 +619,7 @@ def profile_page():
         st.write("**📋 Profile Information**")
         with st.form("profile_form"):
             name = st.text_input("Full Name", value=profile.get('name', ''))
-            location = st.text_input("Location", value=profile.get('location', ''))
+            location = st.text_input("Location", value=profile.get('location', ''), help="Use a city name, e.g. 'Berlin', to show up in nearby searches")
             availability = st.selectbox(
                 "Availability",
                 ["weekends", "evenings", "flexible", "anytime"],
@@ -491,7 +641,8 @@ def profile_page():
                 
                 result = firebase_auth.update_user_profile(user_id, updates)
                 if result['success']:
-                    st.session_state.user_profile.update(updates)
+                    # Includes the search and location fields derived from the form
+                    st.session_state.user_profile.update(result['updates'])
                     st.success("✅ Profile updated successfully!")
                     st.rerun()
                 else:
@@ -522,7 +673,9 @@ def profile_page():
     st.markdown("---")
     st.subheader("📚 My Current Skills")
     
-    skills_result = firebase_auth.get_user_skills(user_id)
+    skills_result = cached_page_data(
+        'profile', (user_id,), ('skills',), lambda: {'skills': firebase_auth.get_user_skills(user_id, view='row')}
+    )['skills']
     if skills_result['success']:
         skills = skills_result['skills']
         
@@ -572,7 +725,13 @@ def requests_page():
     st.subheader("📋 My Skill Swap Requests")
     
     user_id = st.session_state.user['localId']
-    requests_result = firebase_auth.get_user_requests(user_id)
+    view = live_activity_view(user_id)
+    if view:
+        requests_result = view.get_user_requests(limit=100)
+    else:
+        requests_result = cached_page_data(
+            'requests', (user_id,), ('requests',), lambda: {'requests': firebase_auth.get_user_requests(user_id, limit=100, view='card')}
+        )['requests']
     
     if requests_result['success']:
         requests = requests_result['requests']
@@ -626,6 +785,8 @@ def render_request_card(req, is_sender):
                     if result['success']:
                         st.success("Request accepted!")
                         st.rerun()
+                    else:
+                        st.error(f"❌ {result['error']}")
             
             with col2:
                 if st.button(f"❌ Reject", key=f"reject_{req['request_id']}"):
@@ -633,6 +794,8 @@ def render_request_card(req, is_sender):
                     if result['success']:
                         st.success("Request rejected!")
                         st.rerun()
+                    else:
+                        st.error(f"❌ {result['error']}")
 
 def transactions_page():
     """View transactions"""
@@ -643,7 +806,13 @@ def transactions_page():
     st.subheader("🔄 My Transactions")
     
     user_id = st.session_state.user['localId']
-    transactions_result = firebase_auth.get_user_transactions(user_id)
+    view = live_activity_view(user_id)
+    if view:
+        transactions_result = view.get_user_transactions(limit=100)
+    else:
+        transactions_result = cached_page_data(
+            'transactions', (user_id,), ('requests',), lambda: {'transactions': firebase_auth.get_user_transactions(user_id, limit=100, view='card')}
+        )['transactions']
     
     if transactions_result['success']:
         transactions = transactions_result['transactions']
@@ -671,15 +840,30 @@ def request_form_page():
     user = st.session_state.selected_user
     st.subheader(f"🤝 Request Skill Swap with {user['name']}")
     
-    # Get current user's offered skills
     user_id = st.session_state.user['localId']
-    skills_result = firebase_auth.get_user_skills(user_id, 'offered')
+    page_data = cached_page_data('request_form', (user_id, user['user_id']), ('skills',), lambda: firebase_auth.fetch_many({
+        'my_skills': ('get_user_skills', user_id, 'offered', 'card'),
+        'target_skills': ('get_user_skills', user['user_id'], 'offered', 'card'),
+        'match': ('get_swap_match', user_id, user['user_id']),
+    }))
+    
+    # Get current user's offered skills
+    skills_result = page_data['my_skills']
     my_skills = [s['skill_name'] for s in skills_result.get('skills', [])] if skills_result['success'] else []
     
     # Get target user's offered skills
-    target_skills_result = firebase_auth.get_user_skills(user['user_id'], 'offered')
+    target_skills_result = page_data['target_skills']
     target_skills = [s['skill_name'] for s in target_skills_result.get('skills', [])] if target_skills_result['success'] else []
     
+    # Put the skills that make this a two-way swap first
+    match_result = page_data['match']
+    match = match_result.get('match') if match_result['success'] else None
+    if match:
+        st.success(f"✨ Great match! {user['name']} offers {', '.join(match['they_offer'])} "
+                   f"and wants {', '.join(match['they_want'])}")
+        my_skills = sorted(my_skills, key=lambda skill: skill not in match['they_want'])
+        target_skills = sorted(target_skills, key=lambda skill: skill not in match['they_offer'])
+    
     with st.form("swap_request_form"):
         if not my_skills:
             st.error("You need to add skills to your profile first!")
@@ -0,0 +1,43 @@
+import streamlit as st
+
+
+def _pager_state(state_key):
+    if state_key not in st.session_state:
+        st.session_state[state_key] = {'cursors': [None], 'page': 0}
+    return st.session_state[state_key]
+
+
+def current_cursor(state_key):
+    """Get the start_after cursor for the page currently shown"""
+    state = _pager_state(state_key)
+    return state['cursors'][state['page']]
+
+
+def reset_pagination(state_key):
+    """Go back to the first page, e.g. when filters change"""
+    st.session_state[state_key] = {'cursors': [None], 'page': 0}
+
+
+def pagination_controls(state_key, next_cursor):
+    """Show previous/next buttons for a cursor-paginated list"""
+    state = _pager_state(state_key)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if state['page'] > 0:
+            if st.button("⬅️ Previous", key=f"{state_key}_prev", use_container_width=True):
+                state['page'] -= 1
+                st.rerun()
+
+    with col2:
+        st.write(f"Page {state['page'] + 1}")
+
+    with col3:
+        if next_cursor:
+            if st.button("Next ➡️", key=f"{state_key}_next", use_container_width=True):
+                # Keep earlier cursors so Previous never has to re-scan
+                del state['cursors'][state['page'] + 1:]
+                state['cursors'].append(next_cursor)
+                state['page'] += 1
+                st.rerun()
@@ -0,0 +1,169 @@
+"""Admin reports streamed from paged, projected collection reads.
+
+Reports page through a collection by document id, fetching only the
+report's columns, and write each page to a CSV or Parquet file as it
+arrives, so memory stays flat however many documents the report covers.
+"""
+import atexit
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Report -> (collection, [(column, type)]). Types drive the Parquet schema.
+REPORTS = {
+    'users': ('users', [
+        ('name', 'string'), ('email', 'string'), ('role', 'string'), ('location', 'string'),
+        ('availability', 'string'), ('rating_avg', 'float'), ('rating_count', 'int'), ('total_swaps', 'int'),
+        ('pending_requests', 'int'), ('is_banned', 'bool'), ('created_at', 'timestamp'),
+    ]),
+    'skills': ('skills', [
+        ('name', 'string'), ('category', 'string'), ('users_offering', 'int'), ('users_wanting', 'int'),
+        ('total_swaps', 'int'), ('popularity_score', 'float'), ('is_approved', 'bool'), ('is_flagged', 'bool'),
+    ]),
+    'requests': ('barter_requests', [
+        ('sender_id', 'string'), ('receiver_id', 'string'), ('offered_skill_name', 'string'),
+        ('requested_skill_name', 'string'), ('status', 'string'), ('created_at', 'timestamp'),
+        ('responded_at', 'timestamp'), ('expires_at', 'timestamp'),
+    ]),
+    'transactions': ('transactions', [
+        ('user1_id', 'string'), ('user2_id', 'string'), ('user1_skill', 'string'), ('user2_skill', 'string'),
+        ('status', 'string'), ('completion_percentage', 'float'), ('created_at', 'timestamp'),
+    ]),
+}
+
+FORMATS = ('csv', 'parquet')
+MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+# Rows fetched per page and written per CSV write / Parquet row group
+REPORT_CHUNK_ROWS = 5000
+
+# Report files of sessions that ended without replacing or discarding them
+# are removed once they are this old
+REPORT_FILE_MAX_AGE = 3600
+
+_report_dir = None
+_report_dir_lock = threading.Lock()
+
+
+def _cell(value, column_type):
+    if value is None:
+        return None
+    if column_type == 'timestamp':
+        # Firestore hands back UTC-aware datetimes, SQLite naive ones
+        return value.replace(tzinfo=None) if isinstance(value, datetime) else None
+    if column_type == 'float':
+        return float(value)
+    if column_type == 'int':
+        return int(value)
+    if column_type == 'bool':
+        return bool(value)
+    return str(value)
+
+
+def report_chunks(db, report, chunk_rows=REPORT_CHUNK_ROWS):
+    """Yield a report as lists of row tuples, id first, one page at a time"""
+    collection, columns = REPORTS[report]
+    fields = [column for column, _ in columns]
+    for page in db.iter_collection_pages(collection, page_size=chunk_rows, fields=fields):
+        yield [(doc_id,) + tuple(_cell(data.get(column), column_type) for column, column_type in columns) for doc_id, data in page]
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_csv(path, header, chunks):
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for chunk in chunks:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in chunk
+            )
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(path, columns, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet reports need pyarrow (pip install pyarrow)")
+
+    arrow_types = {'string': pa.string(), 'float': pa.float64(), 'int': pa.int64(), 'bool': pa.bool_(), 'timestamp': pa.timestamp('us')}
+    schema = pa.schema([('id', pa.string())] + [(column, arrow_types[column_type]) for column, column_type in columns])
+
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            # One row group per chunk
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)], schema=schema
+            ))
+            rows += len(chunk)
+        if not rows:
+            writer.write_table(schema.empty_table())
+    return rows
+
+
+def write_report(db, report, path, file_format='csv', chunk_rows=REPORT_CHUNK_ROWS):
+    """Stream a report into a file, returning how many rows it has"""
+    if report not in REPORTS:
+        raise ValueError(f"Unknown report: {report}")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format}")
+
+    columns = REPORTS[report][1]
+    header = ['id'] + [column for column, _ in columns]
+    chunks = report_chunks(db, report, chunk_rows)
+    if file_format == 'csv':
+        return _write_csv(path, header, chunks)
+    return _write_parquet(path, columns, chunks)
+
+
+def _report_directory():
+    """This process's directory for report files, removed when it exits"""
+    global _report_dir
+    with _report_dir_lock:
+        if _report_dir is None:
+            _report_dir = tempfile.mkdtemp(prefix='skillswap_reports_')
+            atexit.register(shutil.rmtree, _report_dir, ignore_errors=True)
+        return _report_dir
+
+
+def remove_stale_report_files(max_age=REPORT_FILE_MAX_AGE):
+    """Delete report files older than max_age"""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(_report_directory()):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def build_report_file(db, report, file_format='csv', chunk_rows=REPORT_CHUNK_ROWS):
+    """Write a report to a new temporary file and return (path, rows).
+
+    The caller owns the file and should remove it once it has been served.
+    Files a caller never removed go when they are REPORT_FILE_MAX_AGE old,
+    or when the process exits.
+    """
+    remove_stale_report_files()
+    fd, path = tempfile.mkstemp(prefix=f"skillswap_{report}_", suffix=f".{file_format}", dir=_report_directory())
+    os.close(fd)
+    try:
+        return path, write_report(db, report, path, file_format, chunk_rows)
+    except BaseException:
+        os.remove(path)
+        raise
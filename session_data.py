@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict
+import streamlit as st
+
+
+# Seconds a page snapshot may be reused, which bounds how long changes made
+# by other sessions can go unseen
+PAGE_DATA_MAX_AGE = 60
+
+# Snapshots kept per page and session (e.g. recently viewed browse pages)
+PAGE_DATA_ENTRIES = 8
+
+# Write method -> data scopes it makes stale for the calling session
+WRITE_SCOPES = {
+    'create_user_profile': ['users', 'stats'],
+    'update_user_profile': ['users', 'stats'],
+    'add_user_skill': ['skills', 'stats'],
+    'remove_user_skill': ['skills'],
+    'add_user_skills': ['skills', 'stats'],
+    'remove_user_skills': ['skills'],
+    'create_skill': ['skills', 'stats'],
+    'create_barter_request': ['requests', 'stats'],
+    'update_request_status': ['requests', 'stats'],
+    'create_transaction_from_request': ['requests'],
+    'create_review': ['users'],
+    'create_system_message': ['messages'],
+    'rebuild_platform_stats': ['stats'],
+    'setup_sample_data': ['users', 'skills', 'messages', 'stats'],
+}
+
+
+def _versions():
+    if 'data_versions' not in st.session_state:
+        st.session_state.data_versions = {}
+    return st.session_state.data_versions
+
+
+def bump_versions(*scopes):
+    """Mark this session's page snapshots of the given data scopes stale"""
+    versions = _versions()
+    for scope in scopes:
+        versions[scope] = versions.get(scope, 0) + 1
+
+
+def cached_page_data(page, inputs, scopes, fetch, max_age=PAGE_DATA_MAX_AGE):
+    """Get a page's reads from this session's snapshot.
+
+    fetch() returns a dict of result dictionaries and is only called when
+    the page's inputs or the version of one of its scopes changed, or the
+    snapshot is older than max_age, so reruns from widgets that don't feed
+    the page's queries never reach the backend. Results are only kept when
+    every read succeeded.
+    """
+    if 'page_snapshots' not in st.session_state:
+        st.session_state.page_snapshots = {}
+    snapshots = st.session_state.page_snapshots.setdefault(page, OrderedDict())
+
+    versions = _versions()
+    key = (inputs, tuple(versions.get(scope, 0) for scope in scopes))
+    now = time.monotonic()
+
+    entry = snapshots.get(key)
+    if entry is not None and now - entry[0] < max_age:
+        snapshots.move_to_end(key)
+        return entry[1]
+
+    data = fetch()
+    if all(result.get('success') for result in data.values()):
+        snapshots[key] = (now, data)
+        snapshots.move_to_end(key)
+        while len(snapshots) > PAGE_DATA_ENTRIES:
+            snapshots.popitem(last=False)
+    return data
+
+
+def clear_page_data():
+    """Drop every page snapshot of this session, e.g. on logout"""
+    st.session_state.page_snapshots = {}
+
+
+class SessionWriteTracker:
+    """Passes calls through to a database and bumps the calling session's
+    data versions after each write listed in WRITE_SCOPES."""
+
+    def __init__(self, database, write_scopes=None):
+        self._database = database
+        self._write_scopes = dict(WRITE_SCOPES if write_scopes is None else write_scopes)
+
+    def __getattr__(self, name):
+        if name == '_database':
+            raise AttributeError(name)
+        attr = getattr(self._database, name)
+        if name not in self._write_scopes:
+            return attr
+
+        def write(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                bump_versions(*self._write_scopes[name])
+
+        return write
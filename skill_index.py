@@ -0,0 +1,138 @@
+import bisect
+import re
+import threading
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+
+def tokenize(text):
+    """Split text into lowercase search tokens"""
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+def trigrams(token):
+    """Get the trigrams of a single token"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SkillSearchIndex:
+    """In-memory token/trigram index over skill name, description and tags.
+
+    Query tokens match indexed tokens by prefix, and tokens of three or more
+    characters also match anywhere inside a word through the trigram index.
+    All query tokens must match for a skill to be returned.
+    """
+
+    def __init__(self, skills=()):
+        self._skills = {}            # skill_id -> skill data
+        self._skill_tokens = {}      # skill_id -> set of tokens
+        self._postings = {}          # token -> set of skill ids
+        self._sorted_tokens = []     # every token, sorted for prefix lookups
+        self._trigram_tokens = {}    # trigram -> set of tokens
+        self._categories = {}        # category -> set of skill ids
+        self._lock = threading.RLock()
+
+        for skill_data in skills:
+            self.add(skill_data)
+
+    def __len__(self):
+        return len(self._skills)
+
+    def add(self, skill_data):
+        """Index a skill, replacing any previous version of it"""
+        skill_id = skill_data['skill_id']
+        text = ' '.join([
+            skill_data.get('name', ''),
+            skill_data.get('description', ''),
+            ' '.join(skill_data.get('tags', []) or []),
+        ])
+        tokens = set(tokenize(text))
+
+        with self._lock:
+            self.remove(skill_id)
+            self._skills[skill_id] = skill_data
+            self._skill_tokens[skill_id] = tokens
+            self._categories.setdefault(skill_data.get('category'), set()).add(skill_id)
+
+            for token in tokens:
+                if token not in self._postings:
+                    self._postings[token] = set()
+                    bisect.insort(self._sorted_tokens, token)
+                    for trigram in trigrams(token):
+                        self._trigram_tokens.setdefault(trigram, set()).add(token)
+                self._postings[token].add(skill_id)
+
+    def remove(self, skill_id):
+        """Drop a skill from the index"""
+        with self._lock:
+            skill_data = self._skills.pop(skill_id, None)
+            if skill_data is None:
+                return
+
+            category_ids = self._categories.get(skill_data.get('category'))
+            if category_ids is not None:
+                category_ids.discard(skill_id)
+
+            for token in self._skill_tokens.pop(skill_id):
+                posting = self._postings[token]
+                posting.discard(skill_id)
+                if not posting:
+                    del self._postings[token]
+                    del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+                    for trigram in trigrams(token):
+                        self._trigram_tokens[trigram].discard(token)
+
+    def _prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        end = bisect.bisect_left(self._sorted_tokens, prefix + '\uffff')
+        return self._sorted_tokens[start:end]
+
+    def _matching_ids(self, query_token):
+        tokens = set(self._prefix_tokens(query_token))
+
+        if len(query_token) >= 3:
+            candidate_tokens = None
+            for trigram in trigrams(query_token):
+                trigram_tokens = self._trigram_tokens.get(trigram, set())
+                candidate_tokens = trigram_tokens if candidate_tokens is None else candidate_tokens & trigram_tokens
+                if not candidate_tokens:
+                    break
+            tokens.update(t for t in candidate_tokens or () if query_token in t)
+
+        skill_ids = set()
+        for token in tokens:
+            skill_ids.update(self._postings[token])
+        return skill_ids
+
+    def search(self, query, category=None, limit=None):
+        """Find skills matching every token in query, best name matches first"""
+        query_tokens = tokenize(query)
+
+        with self._lock:
+            skill_ids = None
+            for query_token in sorted(query_tokens, key=len, reverse=True):
+                matching_ids = self._matching_ids(query_token)
+                skill_ids = matching_ids if skill_ids is None else skill_ids & matching_ids
+                if not skill_ids:
+                    break
+
+            if skill_ids is None:
+                skill_ids = self._skills.keys()
+            if category is not None:
+                skill_ids = self._categories.get(category, set()).intersection(skill_ids)
+
+            skills = [self._skills[skill_id] for skill_id in skill_ids]
+
+        query_text = ' '.join(query_tokens)
+
+        def rank(skill_data):
+            name = skill_data.get('name', '').lower()
+            return (
+                not name.startswith(query_text),
+                query_text not in name,
+                name,
+            )
+
+        skills.sort(key=rank)
+        return skills[:limit] if limit else skills
@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Users read from each skill's posting set per lookup, so a skill everyone
+# offers can't turn top_matches into a scan of the whole user base
+MAX_CANDIDATES_PER_SKILL = 1000
+
+# A failed background build is retried after this many seconds
+MATCH_INDEX_RETRY_AFTER = 60
+
+
+def _bit_numbers(bits):
+    """Yield the positions of the set bits in an int"""
+    while bits:
+        low_bit = bits & -bits
+        yield low_bit.bit_length() - 1
+        bits ^= low_bit
+
+
+def _bit_count(bits):
+    return bin(bits).count('1')
+
+
+class SkillMatchIndex:
+    """Reciprocal match index over offered/wanted user skills.
+
+    Skill ids are mapped to small integers and each user's offered and wanted
+    skills are kept as int bitsets. Per-skill posting sets find the users who
+    offer or want a skill, so a lookup only touches candidate users instead
+    of scanning everyone.
+    """
+
+    def __init__(self, user_skills=(), max_candidates_per_skill=MAX_CANDIDATES_PER_SKILL):
+        self.max_candidates_per_skill = max_candidates_per_skill
+        self._skill_numbers = {}   # skill_id -> int
+        self._skill_ids = []       # int -> skill_id
+        self._skill_names = {}     # skill_id -> display name
+        self._offered = {}         # user_id -> bitset of offered skills
+        self._wanted = {}          # user_id -> bitset of wanted skills
+        self._offered_by = {}      # skill number -> set of user ids
+        self._wanted_by = {}       # skill number -> set of user ids
+        self._lock = threading.RLock()
+
+        for user_skill in user_skills:
+            self.add(user_skill['user_id'], user_skill['skill_id'], user_skill['type'], user_skill.get('skill_name'))
+
+    def _skill_number(self, skill_id):
+        number = self._skill_numbers.get(skill_id)
+        if number is None:
+            number = len(self._skill_ids)
+            self._skill_numbers[skill_id] = number
+            self._skill_ids.append(skill_id)
+        return number
+
+    def _maps(self, skill_type):
+        if skill_type == 'offered':
+            return self._offered, self._offered_by
+        return self._wanted, self._wanted_by
+
+    def add(self, user_id, skill_id, skill_type, skill_name=None):
+        """Record that a user offers or wants a skill"""
+        with self._lock:
+            number = self._skill_number(skill_id)
+            if skill_name:
+                self._skill_names.setdefault(skill_id, skill_name)
+            user_bits, users_by_skill = self._maps(skill_type)
+            user_bits[user_id] = user_bits.get(user_id, 0) | (1 << number)
+            users_by_skill.setdefault(number, set()).add(user_id)
+
+    def remove(self, user_id, skill_id, skill_type):
+        """Forget that a user offers or wants a skill"""
+        with self._lock:
+            number = self._skill_numbers.get(skill_id)
+            if number is None:
+                return
+            user_bits, users_by_skill = self._maps(skill_type)
+            bits = user_bits.get(user_id, 0) & ~(1 << number)
+            if bits:
+                user_bits[user_id] = bits
+            else:
+                user_bits.pop(user_id, None)
+            users_by_skill.get(number, set()).discard(user_id)
+
+    def _skill_list(self, bits):
+        skill_ids = [self._skill_ids[number] for number in _bit_numbers(bits)]
+        return [self._skill_names.get(skill_id, skill_id) for skill_id in skill_ids]
+
+    def _describe(self, user_id, other_id, my_offered, my_wanted):
+        they_offer = self._offered.get(other_id, 0) & my_wanted
+        they_want = self._wanted.get(other_id, 0) & my_offered
+        if not they_offer or not they_want:
+            return None
+        offer_count, want_count = _bit_count(they_offer), _bit_count(they_want)
+        return {
+            'user_id': other_id,
+            'score': min(offer_count, want_count) + 0.1 * (offer_count + want_count),
+            'they_offer': self._skill_list(they_offer),
+            'they_want': self._skill_list(they_want),
+        }
+
+    def match_between(self, user_id, other_id):
+        """Describe the reciprocal match between two users, or None"""
+        with self._lock:
+            return self._describe(user_id, other_id, self._offered.get(user_id, 0), self._wanted.get(user_id, 0))
+
+    def top_matches(self, user_id, k=10):
+        """Find the k users who offer what user_id wants and want what user_id offers"""
+        with self._lock:
+            my_offered = self._offered.get(user_id, 0)
+            my_wanted = self._wanted.get(user_id, 0)
+            if not my_offered or not my_wanted:
+                return []
+
+            # Walk whichever side of the match has fewer candidate users
+            offering_sets = [self._offered_by.get(n, ()) for n in _bit_numbers(my_wanted)]
+            wanting_sets = [self._wanted_by.get(n, ()) for n in _bit_numbers(my_offered)]
+            if sum(map(len, offering_sets)) > sum(map(len, wanting_sets)):
+                offering_sets = wanting_sets
+            candidates = set()
+            for users in offering_sets:
+                candidates.update(itertools.islice(users, self.max_candidates_per_skill))
+            candidates.discard(user_id)
+
+            offered, wanted = self._offered, self._wanted
+            scored = []
+            for other_id in candidates:
+                they_offer = offered.get(other_id, 0) & my_wanted
+                they_want = wanted.get(other_id, 0) & my_offered
+                if they_offer and they_want:
+                    offer_count, want_count = _bit_count(they_offer), _bit_count(they_want)
+                    scored.append((min(offer_count, want_count), offer_count + want_count, other_id))
+
+            best = heapq.nlargest(k, scored)
+            return [self._describe(user_id, other_id, my_offered, my_wanted) for _, _, other_id in best]
+
+
+class MatchIndexMaintainer:
+    """Keeps a SkillMatchIndex current without building it on the request path.
+
+    load() returns the active user_skills documents and is only ever called
+    on a background thread: once when the index is first asked for, then
+    every max_age seconds so skills written by other app instances show up.
+    Until the first build finishes there is no index. This process's own
+    skill changes go straight into the live index, and are replayed onto a
+    rebuild that was already loading when they were made.
+    """
+
+    def __init__(self, load, max_age):
+        self._load = load
+        self._max_age = max_age
+        self._index = None
+        self._next_build_at = 0
+        self._builder = None
+        self._changes = None   # (method, args) made while a build is loading
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Get the current index, or None before the first build finishes.
+
+        Starts a background rebuild when the index is missing or stale.
+        """
+        with self._lock:
+            if time.monotonic() >= self._next_build_at:
+                self._start_build()
+            return self._index
+
+    def rebuild(self):
+        """Build the index now and wait for it, for scripts and benchmarks"""
+        with self._lock:
+            self._start_build()
+            builder = self._builder
+        builder.join()
+        return self._index
+
+    def _start_build(self):
+        if self._builder is not None:
+            return
+        self._changes = []
+        self._builder = threading.Thread(target=self._build, name='match-index-builder', daemon=True)
+        self._builder.start()
+
+    def _build(self):
+        try:
+            index = SkillMatchIndex(self._load())
+        except Exception as e:
+            print(f"❌ Building the match index failed: {e}")
+            index = None
+
+        with self._lock:
+            if index is not None:
+                for method, args in self._changes:
+                    getattr(index, method)(*args)
+                self._index = index
+                self._next_build_at = time.monotonic() + self._max_age
+            else:
+                self._next_build_at = time.monotonic() + MATCH_INDEX_RETRY_AFTER
+            self._changes = None
+            self._builder = None
+
+    def _apply(self, method, *args):
+        with self._lock:
+            if self._index is not None:
+                getattr(self._index, method)(*args)
+            if self._changes is not None:
+                self._changes.append((method, args))
+
+    def add(self, user_id, skill_id, skill_type, skill_name=None):
+        """Record that a user offers or wants a skill"""
+        self._apply('add', user_id, skill_id, skill_type, skill_name)
+
+    def remove(self, user_id, skill_id, skill_type):
+        """Forget that a user offers or wants a skill"""
+        self._apply('remove', user_id, skill_id, skill_type)
@@ -0,0 +1,1209 @@
+import heapq
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from skill_index import SkillSearchIndex, tokenize
+from skill_matcher import MatchIndexMaintainer
+from geo import geohash_ranges, distance_km
+from documents import (
+    MAX_SEARCH_PREFIX, PLATFORM_STAT_FIELDS, SAMPLE_SKILLS, skill_id_for, user_search_tokens, rating_star,
+    rating_aggregates, new_user_doc, new_skill_doc, new_user_skill_doc, new_barter_request_doc,
+    new_transaction_doc, new_review_doc, new_system_message_doc, message_audience_keys, viewer_audience_keys,
+    new_skill_event_doc, add_log_scores, current_trend_score, merge_trending, view_fields, USER_SKILL_NAME_FIELDS,
+    user_skill_names, skill_name_updates, user_location_fields
+)
+
+DEFAULT_SQLITE_PATH = 'skillswap.db'
+
+# Every collection is a table of JSON documents. The listed fields are
+# copied into real columns so they can be filtered and indexed.
+TABLE_COLUMNS = {
+    'users': ['profile_visibility', 'is_banned', 'availability', 'role', 'created_at', 'geohash'],
+    'skills': ['category', 'is_approved', 'is_flagged'],
+    'user_skills': ['user_id', 'skill_id', 'type', 'is_active'],
+    'barter_requests': ['sender_id', 'receiver_id', 'status', 'created_at', 'expires_at'],
+    'transactions': ['user1_id', 'user2_id', 'status', 'created_at'],
+    'reviews': ['reviewer_id', 'reviewee_id', 'is_approved'],
+    'system_messages': ['is_active', 'show_until'],
+    'skill_events': ['skill_id'],
+    'trending': [],
+}
+
+INDEXES = {
+    'users': [('profile_visibility', 'is_banned', 'availability', 'id'), ('created_at',), ('profile_visibility', 'is_banned', 'geohash', 'id')],
+    'skills': [('is_approved', 'is_flagged'), ('category',)],
+    'user_skills': [('user_id', 'type'), ('type', 'skill_id')],
+    'barter_requests': [('sender_id', 'created_at'), ('receiver_id', 'created_at'), ('status', 'expires_at')],
+    'transactions': [('user1_id', 'created_at'), ('user2_id', 'created_at')],
+    'reviews': [('reviewee_id', 'is_approved'), ('reviewer_id',)],
+    'system_messages': [('is_active', 'show_until')],
+}
+
+SKILL_INDEX_MAX_AGE = 600
+MATCH_INDEX_MAX_AGE = 3600
+MATCH_INDEX_PAGE_SIZE = 1000
+
+REQUEST_EXPIRY_BATCH = 200
+REQUEST_SWEEP_INTERVAL = 300
+MESSAGE_EXPIRY_BATCH = 400
+
+TREND_EVENT_BATCH = 100
+TRENDING_TOP_N = 20
+
+NEARBY_RADIUS_KM = 25
+
+# Firestore filter operators and their SQL comparison for query_collection
+FILTER_OPERATORS = {'==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>=', 'in': 'IN', 'not-in': 'NOT IN',
+                    'array_contains': '=', 'array_contains_any': 'IN'}
+FIELD_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+# Other processes (e.g. parallel data loaders) may hold the write lock for a while
+BUSY_TIMEOUT_SECONDS = 60
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _column_value(value):
+    """Convert a document field into something SQLite can index and compare"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _projection_sql(fields):
+    """SQL building a JSON object of just these document fields"""
+    values = []
+    for field in fields:
+        if not FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field name: {field}")
+        # json_extract reads JSON booleans back as 1 and 0
+        values.append(
+            f"'{field}', CASE json_type(data, '$.{field}') WHEN 'true' THEN json('true') WHEN 'false' THEN json('false') "
+            f"ELSE json_extract(data, '$.{field}') END"
+        )
+    return f"json_object({', '.join(values)})"
+
+
+class SQLiteSkillSwapDatabase:
+    """SkillSwapDatabase API backed by a local SQLite file.
+
+    Drop-in replacement for the Firestore backend for single-node
+    deployments, benchmarks and offline testing. Every method returns the
+    same result dictionaries as SkillSwapDatabase.
+    """
+
+    def __init__(self, firebase_config=None, path=None):
+        self.path = path or os.getenv('SKILLSWAP_SQLITE_PATH', DEFAULT_SQLITE_PATH)
+        self.conn = None
+        self.initialized = False
+        self.api_key = (firebase_config or {}).get('apiKey')
+        self.skill_index = None
+        self.skill_index_built_at = 0
+        self.match_index = MatchIndexMaintainer(self._load_match_index, MATCH_INDEX_MAX_AGE)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._expiry_sweeper = None
+        # Document-level I/O counters, read by benchmark.py
+        self.docs_read = 0
+        self.docs_written = 0
+
+    def initialize(self):
+        """Open the database file and create tables and indexes"""
+        try:
+            if self.conn is None:
+                self.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None)
+                self.conn.execute('PRAGMA journal_mode=WAL')
+                self.conn.execute('PRAGMA synchronous=NORMAL')
+                self.conn.execute('PRAGMA foreign_keys=OFF')
+
+                for table, columns in TABLE_COLUMNS.items():
+                    column_sql = ''.join(f', {column}' for column in columns)
+                    self.conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY{column_sql}, data TEXT NOT NULL)')
+                    self._add_missing_columns(table)
+                    for index_columns in INDEXES.get(table, []):
+                        index_name = f"idx_{table}_{'_'.join(index_columns)}"
+                        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(index_columns)})")
+
+                # Stands in for array_contains on users.search_tokens
+                self.conn.execute(
+                    'CREATE TABLE IF NOT EXISTS user_search_tokens '
+                    '(token TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (token, user_id)) WITHOUT ROWID'
+                )
+                # Rewriting a user replaces their tokens, which must not scan the table
+                self.conn.execute('CREATE INDEX IF NOT EXISTS idx_user_search_tokens_user_id ON user_search_tokens (user_id)')
+
+            self.initialized = True
+            print("✅ Database initialized successfully")
+            return True
+
+        except Exception as e:
+            print(f"❌ Database initialization failed: {e}")
+            return False
+
+    def _add_missing_columns(self, table):
+        """Add columns introduced after the table was created and fill them from the documents"""
+        existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+        for column in TABLE_COLUMNS[table]:
+            if column in existing:
+                continue
+            self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {column}')
+            # Dates are stored as {"$date": iso}, everything else as plain JSON values
+            self.conn.execute(
+                f"UPDATE {table} SET {column} = CASE WHEN json_type(data, '$.{column}') = 'object' "
+                f"THEN json_extract(data, '$.{column}.\"$date\"') ELSE json_extract(data, '$.{column}') END"
+            )
+
+    # STORAGE PRIMITIVES
+
+    @contextmanager
+    def write_batch(self):
+        """Group writes into one SQLite transaction; nested batches join the outer one"""
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth -= 1
+                return
+
+            self.conn.execute('BEGIN IMMEDIATE')
+            self._batch_depth = 1
+            try:
+                yield
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            finally:
+                self._batch_depth = 0
+
+    def _row_values(self, table, doc_id, data):
+        columns = TABLE_COLUMNS[table]
+        return [doc_id] + [_column_value(data.get(column)) for column in columns] + [json.dumps(data, default=_encode_value)]
+
+    def _put_many(self, table, docs):
+        """Insert or replace (doc_id, data) pairs"""
+        columns = ['id'] + TABLE_COLUMNS[table] + ['data']
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        rows = [self._row_values(table, doc_id, data) for doc_id, data in docs]
+        with self.write_batch():
+            self.conn.executemany(sql, rows)
+            self.docs_written += len(rows)
+            if table == 'users':
+                user_ids = [(doc_id,) for doc_id, _ in docs]
+                self.conn.executemany('DELETE FROM user_search_tokens WHERE user_id = ?', user_ids)
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO user_search_tokens (token, user_id) VALUES (?, ?)',
+                    [(token, doc_id) for doc_id, data in docs for token in data.get('search_tokens', [])]
+                )
+
+    def put_documents(self, collection, docs, ops_per_second=None):
+        """Write many (doc_id, data) pairs to a collection in one transaction"""
+        # ops_per_second only throttles the Firestore BulkWriter
+        self._put_many(collection, list(docs))
+
+    def iter_collection_pages(self, collection, page_size=500, start_after=None, fields=None):
+        """Yield a whole collection as pages of (doc_id, data) in document id order.
+
+        fields projects each document down to those fields.
+        """
+        if collection not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown collection: {collection}")
+        cursor = start_after
+        while True:
+            where, params = ('id > ?', [cursor]) if cursor else ('1', [])
+            page = self._query(collection, where, params, order_by='id', limit=page_size, fields=fields)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            cursor = page[-1][0]
+
+    def _put(self, table, doc_id, data):
+        self._put_many(table, [(doc_id, data)])
+
+    def _get(self, table, doc_id):
+        with self._lock:
+            row = self.conn.execute(f'SELECT data FROM {table} WHERE id = ?', (doc_id,)).fetchone()
+            self.docs_read += 1
+        return json.loads(row[0], object_hook=_decode_object) if row else None
+
+    def _update(self, table, doc_id, updates, increments=None):
+        """Apply field updates and numeric increments to an existing document"""
+        with self.write_batch():
+            data = self._get(table, doc_id)
+            if data is None:
+                raise LookupError(f"No document to update: {table}/{doc_id}")
+            data.update(updates)
+            for field, delta in (increments or {}).items():
+                data[field] = data.get(field, 0) + delta
+            self._put(table, doc_id, data)
+        return data
+
+    def _delete(self, table, doc_id):
+        with self.write_batch():
+            self.conn.execute(f'DELETE FROM {table} WHERE id = ?', (doc_id,))
+            self.docs_written += 1
+
+    def _count(self, table, where='1', params=()):
+        with self._lock:
+            count = self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params).fetchone()[0]
+            # Billed like a Firestore aggregation query
+            self.docs_read += 1
+        return count
+
+    def _query(self, table, where='1', params=(), order_by=None, limit=None, fields=None):
+        """Get (doc_id, data) pairs matching a SQL condition.
+
+        fields projects each document down to those fields inside SQLite,
+        so the rest of the document is never copied out or decoded.
+        """
+        sql = f"SELECT id, {_projection_sql(fields) if fields else 'data'} FROM {table} WHERE {where}"
+        if order_by:
+            sql += f' ORDER BY {order_by}'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+            self.docs_read += len(rows)
+        return [(doc_id, json.loads(data, object_hook=_decode_object)) for doc_id, data in rows]
+
+    # USERS COLLECTION
+
+    def create_user_profile(self, user_id, email, name, location=""):
+        """Create user profile in Users collection"""
+        try:
+            user_data = new_user_doc(user_id, email, name, location, datetime.now())
+            self._put('users', user_id, user_data)
+            return {'success': True, 'message': 'User profile created'}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_user_profile(self, user_id):
+        """Get user profile"""
+        try:
+            profile = self._get('users', user_id)
+            if profile is not None:
+                return {'success': True, 'profile': profile}
+            else:
+                return {'success': False, 'error': 'User not found'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def update_user_profile(self, user_id, updates):
+        """Update user profile.
+
+        The result's 'updates' holds every field written, derived ones included;
+        the caller's dict is left as it was.
+        """
+        try:
+            changes = dict(updates)
+            with self.write_batch():
+                if 'name' in changes or 'location' in changes:
+                    current = self._get('users', user_id) or {}
+                    name = changes.get('name', current.get('name', ''))
+                    location = changes.get('location', current.get('location', ''))
+                    changes['search_tokens'] = user_search_tokens(name, location)
+                if 'location' in changes:
+                    changes.update(user_location_fields(changes['location']))
+
+                changes['updated_at'] = datetime.now()
+                self._update('users', user_id, changes)
+            return {'success': True, 'message': 'Profile updated', 'updates': changes}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_public_users(self, limit=50, start_after=None, availability=None, search=None, view='full'):
+        """Get a page of public user profiles, ordered by user id"""
+        try:
+            fields = view_fields('users', view)
+            where = "profile_visibility = 'public' AND is_banned = 0"
+            params = []
+
+            if availability:
+                where += ' AND availability = ?'
+                params.append(availability)
+
+            search_words = [word[:MAX_SEARCH_PREFIX] for word in tokenize(search)]
+            if search_words:
+                where += ' AND id IN (SELECT user_id FROM user_search_tokens WHERE token = ?)'
+                params.append(max(search_words, key=len))
+
+            if start_after:
+                where += ' AND id > ?'
+                params.append(start_after)
+
+            if fields is not None and search_words:
+                fields = fields + ['search_tokens']
+            rows = self._query('users', where, params, order_by='id', limit=limit, fields=fields)
+
+            users = []
+            for doc_id, user_data in rows:
+                user_data['user_id'] = doc_id
+                if all(word in user_data.get('search_tokens', []) for word in search_words):
+                    users.append(user_data)
+
+            next_cursor = rows[-1][0] if len(rows) == limit else None
+            return {'success': True, 'users': users, 'next_cursor': next_cursor}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def iter_public_users(self, page_size=100):
+        """Yield public user profiles one page at a time"""
+        cursor = None
+        while True:
+            result = self.get_public_users(page_size, start_after=cursor)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            if result['users']:
+                yield result['users']
+            cursor = result['next_cursor']
+            if cursor is None:
+                return
+
+    def get_nearby_users(self, latitude, longitude, radius_km=NEARBY_RADIUS_KM, limit=50, start_after=None, view='full'):
+        """Get a page of public users within radius_km of a point, paged through in (geohash, id) order"""
+        try:
+            fields = view_fields('users', view)
+            if fields is not None:
+                fields = fields + ['latitude', 'longitude', 'geohash']
+            ranges = geohash_ranges(latitude, longitude, radius_km)
+            range_index, last_geohash, last_user_id = start_after or (0, None, None)
+
+            users = []
+            read = 0
+            while range_index < len(ranges) and read < limit:
+                where = "profile_visibility = 'public' AND is_banned = 0 AND geohash >= ? AND geohash <= ?"
+                params = list(ranges[range_index])
+                if last_user_id:
+                    where += ' AND (geohash > ? OR (geohash = ? AND id > ?))'
+                    params += [last_geohash, last_geohash, last_user_id]
+
+                wanted = limit - read
+                page = self._query('users', where, params, order_by='geohash, id', limit=wanted, fields=fields)
+                read += len(page)
+                for user_id, user_data in page:
+                    distance = distance_km(latitude, longitude, user_data['latitude'], user_data['longitude'])
+                    if distance <= radius_km:
+                        user_data['user_id'] = user_id
+                        user_data['distance_km'] = distance
+                        users.append(user_data)
+
+                if len(page) < wanted:
+                    range_index, last_geohash, last_user_id = range_index + 1, None, None
+                else:
+                    last_user_id, last_geohash = page[-1][0], page[-1][1]['geohash']
+
+            users.sort(key=lambda user: user['distance_km'])
+            next_cursor = (range_index, last_geohash, last_user_id) if range_index < len(ranges) else None
+            return {'success': True, 'users': users, 'next_cursor': next_cursor}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def backfill_user_search_fields(self, batch_size=400):
+        """Add search_tokens and coordinates to user profiles created before they existed"""
+        try:
+            updated = 0
+            for doc_id, user_data in self._query('users'):
+                search_fields = {
+                    'search_tokens': user_search_tokens(user_data.get('name', ''), user_data.get('location', '')),
+                    **user_location_fields(user_data.get('location', ''))
+                }
+                if any(field not in user_data or user_data[field] != value for field, value in search_fields.items()):
+                    user_data.update(search_fields)
+                    self._put('users', doc_id, user_data)
+                    updated += 1
+            return {'success': True, 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # SKILLS COLLECTION
+
+    def create_skill(self, name, description, category="General", created_by="system"):
+        """Create a skill in Skills collection"""
+        try:
+            skill_id, skill_data = self._put_skill(name, description, category, created_by)
+
+            if self.skill_index is not None:
+                self.skill_index.add(skill_data)
+
+            return {'success': True, 'skill_id': skill_id}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _put_skill(self, name, description, category="General", created_by="system"):
+        """Write a new skill document, raising on failure, and return (skill_id, skill_data)"""
+        skill_id = skill_id_for(name)
+        skill_data = new_skill_doc(name, description, category, created_by, datetime.now())
+        self._put('skills', skill_id, skill_data)
+        return skill_id, skill_data
+
+    def get_all_skills(self):
+        """Get all approved skills"""
+        try:
+            skills = [data for _, data in self._query('skills', 'is_approved = 1 AND is_flagged = 0')]
+            return {'success': True, 'skills': skills}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_skill_index(self, refresh=False):
+        """Get the skill search index, building it when missing or stale"""
+        with self._lock:
+            is_stale = time.monotonic() - self.skill_index_built_at > SKILL_INDEX_MAX_AGE
+            if self.skill_index is None or is_stale or refresh:
+                self.skill_index = SkillSearchIndex(data for _, data in self._query('skills', 'is_approved = 1'))
+                self.skill_index_built_at = time.monotonic()
+            return self.skill_index
+
+    def update_trending_skills(self, batch_size=TREND_EVENT_BATCH, top_n=TRENDING_TOP_N):
+        """Fold pending skill events into trending scores and the top-N lists"""
+        try:
+            applied = 0
+            while True:
+                with self.write_batch():
+                    events = self._query('skill_events', limit=batch_size)
+                    log_scores, swaps = {}, {}
+                    for _, event in events:
+                        skill_id = event['skill_id']
+                        log_scores[skill_id] = add_log_scores(log_scores.get(skill_id), event['log_score'])
+                        swaps[skill_id] = swaps.get(skill_id, 0) + (event['type'] == 'request_accepted')
+
+                    now = datetime.now()
+                    entries = []
+                    for skill_id, log_score in log_scores.items():
+                        skill_data = self._get('skills', skill_id)
+                        if skill_data is None:
+                            continue
+                        log_score = add_log_scores(skill_data.get('trend_log_score'), log_score)
+                        skill_data = self._update('skills', skill_id, {
+                            'trend_log_score': log_score,
+                            'popularity_score': round(current_trend_score(log_score, now), 3)
+                        }, {'total_swaps': swaps[skill_id]})
+                        if skill_data.get('is_approved') and not skill_data.get('is_flagged'):
+                            entries.append({
+                                'skill_id': skill_id,
+                                'name': skill_data.get('name', skill_id),
+                                'category': skill_data.get('category', 'General'),
+                                'log_score': log_score
+                            })
+
+                    if events:
+                        trending = self._get('trending', 'skills') or {}
+                        self._put('trending', 'skills', {**merge_trending(trending, entries, top_n), 'updated_at': now})
+                        for event_id, _ in events:
+                            self._delete('skill_events', event_id)
+
+                applied += len(events)
+                if len(events) < batch_size:
+                    break
+
+            return {'success': True, 'applied': applied}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_trending_skills(self, category=None, limit=10):
+        """Get the trending skills overall or in one category, with their current scores"""
+        try:
+            trending = self._get('trending', 'skills') or {}
+            entries = trending.get('categories', {}).get(category, []) if category else trending.get('overall', [])
+
+            now = datetime.now()
+            skills = [{**entry, 'score': round(current_trend_score(entry['log_score'], now), 3)} for entry in entries[:limit]]
+            return {'success': True, 'skills': skills, 'categories': sorted(trending.get('categories', {}))}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def search_skills(self, query, category=None, limit=None):
+        """Search skills by name, description or tags"""
+        try:
+            skills = self.get_skill_index().search(query, category=category, limit=limit)
+            return {'success': True, 'skills': skills}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # USER_SKILLS COLLECTION
+
+    def add_user_skill(self, user_id, skill_name, skill_type, proficiency_level="intermediate", description=""):
+        """Add skill to User_Skills collection"""
+        result = self.add_user_skills(user_id, [{
+            'skill_name': skill_name,
+            'skill_type': skill_type,
+            'proficiency_level': proficiency_level,
+            'description': description
+        }])
+        if not result['success']:
+            return result
+        return {'success': True, 'message': 'Skill added successfully'}
+
+    def add_user_skills(self, user_id, skills):
+        """Add or update many user skills in one transaction"""
+        try:
+            entries = {}
+            for skill in skills:
+                skill_id = skill_id_for(skill['skill_name'])
+                entries[f"{user_id}_{skill_id}_{skill['skill_type']}"] = (skill_id, skill)
+
+            added, new_skills = [], []
+            with self.write_batch():
+                for user_skill_id, (skill_id, skill) in entries.items():
+                    skill_name, skill_type = skill['skill_name'], skill['skill_type']
+                    if self._get('skills', skill_id) is None:
+                        # Errors roll back the whole batch, user skills included
+                        new_skills.append(self._put_skill(skill_name, f"User-added skill: {skill_name}")[1])
+
+                    user_skill_data = new_user_skill_doc(
+                        user_id, skill_name, skill_type,
+                        skill.get('proficiency_level', 'intermediate'), skill.get('description', ''), datetime.now()
+                    )
+                    existing = self._get('user_skills', user_skill_id)
+                    if existing is not None:
+                        user_skill_data['created_at'] = existing['created_at']
+                    self._put('user_skills', user_skill_id, user_skill_data)
+
+                    # Counters only move when the relationship becomes active
+                    if existing is None or not existing.get('is_active'):
+                        counter = 'users_offering' if skill_type == 'offered' else 'users_wanting'
+                        self._update('skills', skill_id, {}, {counter: 1})
+                        self._put('skill_events', uuid.uuid4().hex, new_skill_event_doc(skill_id, 'skill_added', datetime.now()))
+                        added.append(user_skill_id)
+
+                self._sync_skill_names(user_id, added=[(skill['skill_name'], skill['skill_type']) for _, skill in entries.values()])
+
+            # In-memory indexes only learn about the skills once the batch has committed
+            if self.skill_index is not None:
+                for skill_data in new_skills:
+                    self.skill_index.add(skill_data)
+            for skill_id, skill in entries.values():
+                self.match_index.add(user_id, skill_id, skill['skill_type'], skill['skill_name'])
+
+            return {'success': True, 'added': len(added), 'updated': len(entries) - len(added)}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_user_skills(self, user_id, skill_type=None, view='full'):
+        """Get user's skills"""
+        try:
+            where = 'user_id = ? AND is_active = 1'
+            params = [user_id]
+            if skill_type:
+                where += ' AND type = ?'
+                params.append(skill_type)
+
+            skills = [data for _, data in self._query('user_skills', where, params, fields=view_fields('user_skills', view))]
+            return {'success': True, 'skills': skills}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_skills_for_users(self, user_ids, skill_type=None, view='full'):
+        """Get skills for many users at once, keyed by user id"""
+        try:
+            fields = view_fields('user_skills', view)
+            user_ids = list(dict.fromkeys(user_ids))
+            skills_by_user = {user_id: [] for user_id in user_ids}
+            if not user_ids:
+                return {'success': True, 'skills': skills_by_user}
+
+            where = f"user_id IN ({', '.join('?' * len(user_ids))}) AND is_active = 1"
+            params = list(user_ids)
+            if skill_type:
+                where += ' AND type = ?'
+                params.append(skill_type)
+
+            for _, skill_data in self._query('user_skills', where, params, fields=fields):
+                skills_by_user.setdefault(skill_data['user_id'], []).append(skill_data)
+
+            return {'success': True, 'skills': skills_by_user}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def remove_user_skill(self, user_id, skill_name, skill_type):
+        """Remove user skill"""
+        result = self.remove_user_skills(user_id, [(skill_name, skill_type)])
+        if not result['success']:
+            return result
+        return {'success': True, 'message': 'Skill removed'}
+
+    def remove_user_skills(self, user_id, skills):
+        """Remove many (skill_name, skill_type) user skills in one transaction"""
+        try:
+            entries = {}
+            for skill_name, skill_type in skills:
+                skill_id = skill_id_for(skill_name)
+                entries[f"{user_id}_{skill_id}_{skill_type}"] = (skill_id, skill_type, skill_name)
+
+            removed = []
+            with self.write_batch():
+                for user_skill_id, (skill_id, skill_type, _) in entries.items():
+                    existing = self._get('user_skills', user_skill_id)
+                    if existing is None:
+                        continue
+                    self._delete('user_skills', user_skill_id)
+                    removed.append(user_skill_id)
+
+                    if existing.get('is_active') and self._get('skills', skill_id) is not None:
+                        counter = 'users_offering' if skill_type == 'offered' else 'users_wanting'
+                        self._update('skills', skill_id, {}, {counter: -1})
+
+                self._sync_skill_names(user_id, removed=[(skill_name, skill_type) for _, skill_type, skill_name in entries.values()])
+
+            for skill_id, skill_type, _ in entries.values():
+                self.match_index.remove(user_id, skill_id, skill_type)
+
+            return {'success': True, 'removed': len(removed)}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _sync_skill_names(self, user_id, added=(), removed=()):
+        """Fold added and removed (skill_name, skill_type) pairs into the user's embedded skill names"""
+        user_data = self._get('users', user_id)
+        if user_data is None:
+            return
+        if any(field not in user_data for field in USER_SKILL_NAME_FIELDS.values()):
+            # Profiles from before the embedded names existed get a one-off recount
+            names = user_skill_names(data for _, data in self._query('user_skills', 'user_id = ? AND is_active = 1', [user_id]))
+            updates = {**names, **skill_name_updates(names, added, removed)}
+        else:
+            updates = skill_name_updates(user_data, added, removed)
+        if updates:
+            self._update('users', user_id, updates)
+
+    def backfill_user_skill_names(self, batch_size=400):
+        """Rebuild the offered and wanted skill names embedded in user profiles"""
+        try:
+            updated = 0
+            for page in self.iter_collection_pages('users', page_size=batch_size, fields=list(USER_SKILL_NAME_FIELDS.values())):
+                skills_result = self.get_skills_for_users([user_id for user_id, _ in page], view='card')
+                if not skills_result['success']:
+                    raise RuntimeError(skills_result['error'])
+
+                with self.write_batch():
+                    for user_id, user_data in page:
+                        names = user_skill_names(skills_result['skills'][user_id])
+                        changed = {field: value for field, value in names.items() if user_data.get(field) != value}
+                        if changed:
+                            self._update('users', user_id, changed)
+                            updated += 1
+
+            return {'success': True, 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # SKILL MATCHING
+
+    def _load_match_index(self):
+        """Yield the active user_skills for the match index, a page at a time"""
+        fields = ['user_id', 'skill_id', 'type', 'skill_name', 'is_active']
+        for page in self.iter_collection_pages('user_skills', page_size=MATCH_INDEX_PAGE_SIZE, fields=fields):
+            yield from (data for _, data in page if data.get('is_active'))
+
+    def get_match_index(self, refresh=False):
+        """Get the reciprocal match index, or None while it is first built in the background.
+
+        refresh builds it now and waits, for scripts and benchmarks.
+        """
+        if refresh:
+            return self.match_index.rebuild()
+        return self.match_index.get()
+
+    def get_reciprocal_matches(self, user_id, k=10):
+        """Get users who offer what this user wants and want what this user offers"""
+        try:
+            index = self.get_match_index()
+            if index is None:
+                # Not an empty result, so page snapshots don't keep it
+                return {'success': False, 'error': 'The match index is still being built'}
+            return {'success': True, 'matches': index.top_matches(user_id, k)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_swap_match(self, user_id, other_user_id):
+        """Get the reciprocal match between two users, if there is one"""
+        try:
+            index = self.get_match_index()
+            if index is None:
+                return {'success': False, 'error': 'The match index is still being built'}
+            return {'success': True, 'match': index.match_between(user_id, other_user_id)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # BARTER_REQUESTS COLLECTION
+
+    def create_barter_request(self, sender_id, receiver_id, offered_skill, requested_skill, message=""):
+        """Create a skill swap request"""
+        try:
+            request_id = uuid.uuid4().hex
+            now = datetime.now()
+            request_data = new_barter_request_doc(sender_id, receiver_id, offered_skill, requested_skill, message, now)
+
+            with self.write_batch():
+                self._put('barter_requests', request_id, request_data)
+                self._update('users', receiver_id, {}, {'pending_requests': 1})
+                for skill_name in (offered_skill, requested_skill):
+                    self._put('skill_events', uuid.uuid4().hex, new_skill_event_doc(skill_id_for(skill_name), 'request_created', now))
+
+            return {'success': True, 'request_id': request_id}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_user_requests(self, user_id, request_type='all', limit=None, view='full'):
+        """Get user's barter requests, newest first"""
+        try:
+            fields = view_fields('barter_requests', view)
+            sides = []
+            for request_side, field in (('sent', 'sender_id'), ('received', 'receiver_id')):
+                if request_type not in [request_side, 'all']:
+                    continue
+                requests = []
+                for doc_id, request_data in self._query('barter_requests', f'{field} = ?', [user_id], 'created_at DESC', limit, fields):
+                    request_data['request_id'] = doc_id
+                    request_data['type'] = request_side
+                    requests.append(request_data)
+                sides.append(requests)
+
+            requests = list(heapq.merge(*sides, key=lambda r: r['created_at'], reverse=True))
+            return {'success': True, 'requests': requests[:limit] if limit else requests}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def update_request_status(self, request_id, status, response_message=""):
+        """Answer a pending barter request, leaving answered or expired ones untouched"""
+        try:
+            now = datetime.now()
+            updates = {
+                'status': status,
+                'updated_at': now,
+                'responded_at': now,
+                'response_message': response_message
+            }
+
+            with self.write_batch():
+                previous = self._get('barter_requests', request_id)
+                if previous is None:
+                    return {'success': False, 'error': 'Request not found'}
+                if previous.get('status') != 'pending':
+                    return {'success': False, 'error': f"Request is already {previous.get('status')}"}
+
+                self._update('barter_requests', request_id, updates)
+                self._update('users', previous['receiver_id'], {}, {'pending_requests': -1})
+
+                if status == 'accepted':
+                    for skill_name in (previous['offered_skill_name'], previous['requested_skill_name']):
+                        self._put('skill_events', uuid.uuid4().hex, new_skill_event_doc(skill_id_for(skill_name), 'request_accepted', now))
+                    self.create_transaction_from_request(request_id)
+
+            return {'success': True, 'message': 'Request status updated'}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def expire_stale_requests(self, batch_size=REQUEST_EXPIRY_BATCH, now=None):
+        """Flip pending requests past their expires_at to 'expired', a page at a time"""
+        try:
+            now = now or datetime.now()
+            expired = 0
+            while True:
+                # Select inside the write transaction so concurrent sweepers never double-count
+                with self.write_batch():
+                    page = self._query(
+                        'barter_requests', 'status = ? AND expires_at < ?', ['pending', _column_value(now)],
+                        'expires_at', batch_size
+                    )
+                    expired_by_receiver = {}
+                    for request_id, request_data in page:
+                        request_data.update(status='expired', updated_at=now)
+                        self._put('barter_requests', request_id, request_data)
+                        receiver_id = request_data['receiver_id']
+                        expired_by_receiver[receiver_id] = expired_by_receiver.get(receiver_id, 0) + 1
+                    for receiver_id, count in expired_by_receiver.items():
+                        if self._get('users', receiver_id) is not None:
+                            self._update('users', receiver_id, {}, {'pending_requests': -count})
+
+                expired += len(page)
+                if len(page) < batch_size:
+                    break
+
+            return {'success': True, 'expired': expired}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def start_request_expiry_sweeper(self, interval=REQUEST_SWEEP_INTERVAL):
+        """Run the expiry sweeps and update_trending_skills on a background thread, once per process"""
+        with self._lock:
+            if self._expiry_sweeper is not None and self._expiry_sweeper.is_alive():
+                return {'success': True, 'started': False}
+
+            def sweep():
+                while True:
+                    result = self.expire_stale_requests()
+                    if not result['success']:
+                        print(f"❌ Request expiry sweep failed: {result['error']}")
+                    result = self.deactivate_expired_messages()
+                    if not result['success']:
+                        print(f"❌ Message expiry sweep failed: {result['error']}")
+                    result = self.update_trending_skills()
+                    if not result['success']:
+                        print(f"❌ Trending update failed: {result['error']}")
+                    time.sleep(interval * random.uniform(0.8, 1.2))
+
+            self._expiry_sweeper = threading.Thread(target=sweep, name='request-expiry-sweeper', daemon=True)
+            self._expiry_sweeper.start()
+            return {'success': True, 'started': True}
+
+    # TRANSACTIONS COLLECTION
+
+    def create_transaction_from_request(self, request_id):
+        """Create transaction when request is accepted"""
+        try:
+            request_data = self._get('barter_requests', request_id)
+            if request_data is None:
+                return {'success': False, 'error': 'Request not found'}
+
+            transaction_id = uuid.uuid4().hex
+            transaction_data = new_transaction_doc(request_id, request_data, datetime.now())
+
+            with self.write_batch():
+                self._put('transactions', transaction_id, transaction_data)
+                self._update('barter_requests', request_id, {'transaction_id': transaction_id})
+
+            return {'success': True, 'transaction_id': transaction_id}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_user_transactions(self, user_id, limit=None, view='full'):
+        """Get user's transactions, newest first"""
+        try:
+            fields = view_fields('transactions', view)
+            sides = []
+            for user_role in ('user1', 'user2'):
+                transactions = []
+                for doc_id, transaction_data in self._query('transactions', f'{user_role}_id = ?', [user_id], 'created_at DESC', limit, fields):
+                    transaction_data['transaction_id'] = doc_id
+                    transaction_data['user_role'] = user_role
+                    transactions.append(transaction_data)
+                sides.append(transactions)
+
+            transactions = list(heapq.merge(*sides, key=lambda t: t['created_at'], reverse=True))
+            return {'success': True, 'transactions': transactions[:limit] if limit else transactions}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # REVIEWS COLLECTION
+
+    def create_review(self, reviewer_id, reviewee_id, transaction_id, rating, comment, title=""):
+        """Create review after transaction"""
+        try:
+            review_id = uuid.uuid4().hex
+            review_data = new_review_doc(reviewer_id, reviewee_id, transaction_id, rating, comment, title, datetime.now())
+
+            with self.write_batch():
+                self._put('reviews', review_id, review_data)
+
+                user_data = self._get('users', reviewee_id)
+                if user_data is None or 'rating_sum' not in user_data:
+                    self.update_user_rating(reviewee_id)
+                else:
+                    histogram = dict(user_data.get('rating_histogram') or {})
+                    histogram[str(rating_star(rating))] = histogram.get(str(rating_star(rating)), 0) + 1
+                    rating_sum = user_data['rating_sum'] + rating
+                    rating_count = user_data.get('rating_count', 0) + 1
+                    self._update('users', reviewee_id, {
+                        'rating_sum': rating_sum,
+                        'rating_count': rating_count,
+                        'rating_avg': round(rating_sum / rating_count, 1),
+                        'rating_histogram': histogram
+                    })
+
+            return {'success': True, 'review_id': review_id}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def update_user_rating(self, user_id):
+        """Recompute a user's rating aggregates from their approved reviews"""
+        try:
+            reviews = self._query('reviews', 'reviewee_id = ? AND is_approved = 1', [user_id])
+            self._update('users', user_id, rating_aggregates([review['rating'] for _, review in reviews]))
+            return {'success': True}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def rebuild_rating_aggregates(self, batch_size=400):
+        """Rebuild every user's rating aggregates from scratch, for repair"""
+        try:
+            ratings_by_user = {}
+            for _, review in self._query('reviews', 'is_approved = 1'):
+                ratings_by_user.setdefault(review['reviewee_id'], []).append(review['rating'])
+
+            updated = 0
+            with self.write_batch():
+                for doc_id, user_data in self._query('users'):
+                    user_data.update(rating_aggregates(ratings_by_user.get(doc_id, [])))
+                    self._put('users', doc_id, user_data)
+                    updated += 1
+
+            return {'success': True, 'updated': updated}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_user_reviews(self, user_id, as_reviewee=True):
+        """Get reviews for a user"""
+        try:
+            if as_reviewee:
+                rows = self._query('reviews', 'reviewee_id = ?', [user_id])
+                rows = [(doc_id, review) for doc_id, review in rows if review.get('is_public')]
+            else:
+                rows = self._query('reviews', 'reviewer_id = ?', [user_id])
+
+            reviews = []
+            for doc_id, review_data in rows:
+                review_data['review_id'] = doc_id
+                reviews.append(review_data)
+
+            return {'success': True, 'reviews': reviews}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # PLATFORM STATS
+
+    def get_platform_stats(self):
+        """Get platform-wide counters from indexed COUNT queries"""
+        try:
+            queries = {
+                'users_total': ('users', '1'),
+                'users_admin': ('users', "role = 'admin'"),
+                'users_banned': ('users', 'is_banned = 1'),
+                'skills_total': ('skills', 'is_approved = 1 AND is_flagged = 0'),
+                'active_swaps': ('transactions', "status = 'in_progress'"),
+                'pending_requests': ('barter_requests', "status = 'pending'"),
+            }
+            stats = {field: self._count(*queries[field]) for field in PLATFORM_STAT_FIELDS}
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def rebuild_platform_stats(self):
+        """Stats are always counted live here, so there is nothing to rebuild"""
+        return self.get_platform_stats()
+
+    def get_recent_users(self, limit=5):
+        """Get the most recently registered users"""
+        try:
+            users = []
+            for doc_id, user_data in self._query('users', order_by='created_at DESC', limit=limit):
+                user_data['user_id'] = doc_id
+                users.append(user_data)
+            return {'success': True, 'users': users}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # SYSTEM_MESSAGES COLLECTION
+
+    def create_system_message(self, admin_id, title, message, message_type="announcement", target_audience='all',
+                              target_roles=None, target_user_ids=None, show_until=None):
+        """Create a system message for everyone, some roles or specific users"""
+        try:
+            message_id = uuid.uuid4().hex
+            self._put('system_messages', message_id, new_system_message_doc(
+                admin_id, title, message, message_type, datetime.now(),
+                target_audience, target_roles, target_user_ids, show_until
+            ))
+            return {'success': True, 'message_id': message_id}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_active_messages(self, user_id=None, role=None):
+        """Get live system messages, newest first.
+
+        With a user_id and/or role only the messages targeted at that
+        viewer are returned; with neither, every live message (admin view).
+        """
+        try:
+            where = 'is_active = 1 AND show_until > ?'
+            params = [datetime.now().isoformat()]
+            if user_id or role:
+                audience = viewer_audience_keys(user_id, role)
+                # Stands in for array_contains_any on audience_keys
+                where += (" AND EXISTS (SELECT 1 FROM json_each(data, '$.audience_keys') "
+                          f"WHERE value IN ({', '.join('?' * len(audience))}))")
+                params += audience
+
+            messages = []
+            for doc_id, message_data in self._query('system_messages', where, params):
+                message_data['message_id'] = doc_id
+                messages.append(message_data)
+            messages.sort(key=lambda m: m['created_at'], reverse=True)
+
+            return {'success': True, 'messages': messages}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def deactivate_expired_messages(self, batch_size=MESSAGE_EXPIRY_BATCH, now=None):
+        """Set is_active to False on messages past show_until, a page at a time"""
+        try:
+            now = now or datetime.now()
+            deactivated = 0
+            while True:
+                with self.write_batch():
+                    page = self._query(
+                        'system_messages', 'is_active = 1 AND show_until <= ?', [_column_value(now)], 'show_until', batch_size
+                    )
+                    for message_id, message_data in page:
+                        message_data.update(is_active=False, updated_at=now)
+                        self._put('system_messages', message_id, message_data)
+
+                deactivated += len(page)
+                if len(page) < batch_size:
+                    break
+
+            return {'success': True, 'deactivated': deactivated}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def backfill_message_audience_keys(self, batch_size=400):
+        """Add audience_keys to system messages created before it existed"""
+        try:
+            updated = 0
+            for doc_id, message_data in self._query('system_messages', 'is_active = 1'):
+                keys = message_audience_keys(
+                    message_data.get('target_audience', 'all'),
+                    message_data.get('target_roles', []),
+                    message_data.get('target_user_ids', [])
+                )
+                if message_data.get('audience_keys') != keys:
+                    message_data['audience_keys'] = keys
+                    self._put('system_messages', doc_id, message_data)
+                    updated += 1
+            return {'success': True, 'updated': updated}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # COLLECTION EXPLORER
+
+    def _field_sql(self, table, field):
+        """SQL expression for a document field, using its column when it has one"""
+        if not FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field name: {field}")
+        if field in TABLE_COLUMNS[table]:
+            return field
+        # Dates are stored as {"$date": iso}, everything else as plain JSON values
+        return f"COALESCE(json_extract(data, '$.{field}.\"$date\"'), json_extract(data, '$.{field}'))"
+
+    def query_collection(self, collection, fields=None, filters=None, order_by=None, descending=False, limit=50, start_after=None):
+        """Get one page of any collection, projected, filtered and ordered in SQL.
+
+        filters is a list of (field, op, value) with Firestore operators.
+        Pages are ordered by order_by (when given) and then document id;
+        pass the returned next_cursor as start_after to get the next page.
+        """
+        try:
+            if collection not in TABLE_COLUMNS:
+                raise ValueError(f"Unknown collection: {collection}")
+
+            conditions, params = [], []
+            for field, op, value in filters or []:
+                if op not in FILTER_OPERATORS:
+                    raise ValueError(f"Unsupported operator: {op}")
+                values = [_column_value(v) for v in value] if op in ('in', 'not-in', 'array_contains_any') else [_column_value(value)]
+                placeholders = f"({', '.join('?' * len(values))})" if FILTER_OPERATORS[op] in ('IN', 'NOT IN') else '?'
+                field_sql = self._field_sql(collection, field)
+                if op.startswith('array_contains'):
+                    conditions.append(f"EXISTS (SELECT 1 FROM json_each(data, '$.{field}') WHERE value {FILTER_OPERATORS[op]} {placeholders})")
+                else:
+                    conditions.append(f"{field_sql} {FILTER_OPERATORS[op]} {placeholders}")
+                params += values
+
+            direction, after = ('DESC', '<') if descending else ('ASC', '>')
+            order_sql = f'id {direction}'
+            if order_by:
+                order_expr = self._field_sql(collection, order_by)
+                # Like Firestore, ordering by a field leaves out documents without it
+                conditions.append(f'{order_expr} IS NOT NULL')
+                order_sql = f'{order_expr} {direction}, {order_sql}'
+                if start_after:
+                    conditions.append(f'({order_expr} {after} ? OR ({order_expr} = ? AND id {after} ?))')
+                    value = _column_value(start_after[0])
+                    params += [value, value, start_after[1]]
+            elif start_after:
+                conditions.append(f'id {after} ?')
+                params.append(start_after)
+
+            # The cursor needs the order_by field even when it isn't shown
+            query_fields = list(dict.fromkeys(fields + ([order_by] if order_by else []))) if fields else None
+            page = self._query(collection, ' AND '.join(conditions) or '1', params, order_sql, limit, query_fields)
+
+            documents = []
+            cursor = None
+            for doc_id, doc_data in page:
+                cursor = [doc_data.get(order_by), doc_id] if order_by else doc_id
+                if fields and order_by not in fields:
+                    doc_data.pop(order_by, None)
+                documents.append({'_id': doc_id, **doc_data})
+
+            return {'success': True, 'documents': documents, 'next_cursor': cursor if len(documents) == limit else None}
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    # SAMPLE DATA SETUP
+
+    def setup_sample_data(self):
+        """Create sample data for testing"""
+        try:
+            with self.write_batch():
+                new_skills = [self._put_skill(skill['name'], skill['description'], skill['category'])[1] for skill in SAMPLE_SKILLS]
+            if self.skill_index is not None:
+                for skill_data in new_skills:
+                    self.skill_index.add(skill_data)
+
+            print("✅ Sample skills created successfully")
+
+            self.create_system_message(
+                'admin',
+                'Welcome to Skill Swap Platform!',
+                'Start connecting with other learners and share your skills today.',
+                'announcement'
+            )
+
+            print("✅ Sample system message created")
+            return {'success': True, 'message': 'Sample data created successfully'}
+
+        except Exception as e:
+            print(f"❌ Error creating sample data: {e}")
+            return {'success': False, 'error': str(e)}
@@ -0,0 +1,351 @@
+"""Deterministic synthetic SkillSwap data for load testing.
+
+    python synthetic_data.py --backend sqlite --users 1000000 --processes 8
+    SKILLSWAP_BACKEND=firestore python synthetic_data.py --users 100000 --seed 7
+
+Users are generated in fixed-size shards. Each shard is a pure function of
+(seed, shard number, as-of date) and holds its users together with their
+user_skills, the barter requests they send, and the resulting transactions
+and reviews, with the counters on those users kept consistent. Shards can
+therefore be generated and written by separate processes, and the same
+seed always produces the same documents.
+"""
+import argparse
+import itertools
+import multiprocessing
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from database_backends import create_database
+from documents import (
+    SAMPLE_SKILLS, USER_SKILL_NAME_FIELDS, skill_id_for, merge_skill_names, rating_aggregates, new_user_doc,
+    new_skill_doc, new_user_skill_doc, new_barter_request_doc, new_transaction_doc, new_review_doc, new_system_message_doc
+)
+
+FIRST_NAMES = ['Aisha', 'Ben', 'Chen', 'Diego', 'Emma', 'Farah', 'George', 'Hana', 'Ivan', 'Julia', 'Kofi', 'Lena', 'Mateo', 'Nina', 'Omar', 'Priya']
+LAST_NAMES = ['Ahmed', 'Brown', 'Garcia', 'Ito', 'Kim', 'Kumar', 'Lopez', 'Müller', 'Novak', 'Okafor', 'Rossi', 'Silva', 'Smith', 'Wang']
+CITIES = ['London', 'Paris', 'Berlin', 'Mumbai', 'Delhi', 'Toronto', 'Lagos', 'Tokyo', 'Sydney', 'Madrid', 'Chicago', 'Seoul']
+AVAILABILITY = ['weekends', 'evenings', 'flexible', 'anytime']
+CATEGORIES = ['Programming', 'Design', 'Creative', 'Languages', 'Music', 'Lifestyle', 'Business', 'General']
+PROFICIENCY_LEVELS = ['beginner', 'intermediate', 'advanced', 'expert']
+
+# How many barter requests a user sends, and how they end up
+REQUESTS_SENT_WEIGHTS = {0: 35, 1: 30, 2: 20, 3: 10, 4: 5}
+REQUEST_STATUS_WEIGHTS = {'pending': 30, 'accepted': 15, 'completed': 30, 'rejected': 15, 'cancelled': 10}
+# Star ratings skew positive, and not everyone leaves a review
+RATING_WEIGHTS = {1: 1, 2: 1, 3: 3, 4: 8, 5: 10}
+REVIEW_PROBABILITY = 0.7
+# Zipf exponent for skill popularity
+SKILL_POPULARITY_EXPONENT = 1.1
+
+SYSTEM_MESSAGES = 5
+
+SHARD_USERS = 10000
+WRITE_CHUNK = 5000
+SHARD_COLLECTIONS = ['users', 'user_skills', 'barter_requests', 'transactions', 'reviews']
+
+
+def _mean(weights):
+    return sum(value * weight for value, weight in weights.items()) / sum(weights.values())
+
+
+def dataset_plan(scale):
+    """Expected document counts per collection for a number of users"""
+    requests = scale * _mean(REQUESTS_SENT_WEIGHTS)
+    status_total = sum(REQUEST_STATUS_WEIGHTS.values())
+    swapped = requests * (REQUEST_STATUS_WEIGHTS['accepted'] + REQUEST_STATUS_WEIGHTS['completed']) / status_total
+    completed = requests * REQUEST_STATUS_WEIGHTS['completed'] / status_total
+    return {
+        'users': scale,
+        'skills': max(len(SAMPLE_SKILLS), scale // 100),
+        'user_skills': round(scale * 4),
+        'barter_requests': round(requests),
+        'transactions': round(swapped),
+        'reviews': round(completed * 2 * REVIEW_PROBABILITY),
+        'system_messages': SYSTEM_MESSAGES,
+    }
+
+
+def default_as_of():
+    """Midnight today, so runs on the same day produce identical timestamps"""
+    return datetime.combine(datetime.now().date(), datetime.min.time())
+
+
+def user_id_for(index):
+    return f"user{index:07d}"
+
+
+def shard_count(scale):
+    return (scale + SHARD_USERS - 1) // SHARD_USERS
+
+
+def skill_catalog(scale, seed=42):
+    """The (skill_id, name, category) catalog plus Zipf cumulative weights for picking skills"""
+    rng = random.Random(f"{seed}:skills")
+    skills = [(skill_id_for(skill['name']), skill['name'], skill['category']) for skill in SAMPLE_SKILLS]
+    for i in range(dataset_plan(scale)['skills'] - len(skills)):
+        name = f"Skill {i}"
+        skills.append((skill_id_for(name), name, rng.choice(CATEGORIES)))
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** SKILL_POPULARITY_EXPONENT for rank in range(len(skills))))
+    return skills, cum_weights
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def _between(rng, start, end):
+    return start + (end - start) * rng.random()
+
+
+def generate_shard(scale, shard, seed=42, as_of=None, catalog=None):
+    """Build every document for one shard of users.
+
+    Returns ({collection: [(doc_id, data)]}, skill_tallies) where
+    skill_tallies maps skill ids to the counter deltas this shard adds.
+    """
+    as_of = as_of or default_as_of()
+    skills, cum_weights = catalog or skill_catalog(scale, seed)
+    rng = random.Random(f"{seed}:{shard}")
+    docs = {collection: [] for collection in SHARD_COLLECTIONS}
+    skill_tallies = {}
+
+    def tally(skill_name, field):
+        counters = skill_tallies.setdefault(skill_id_for(skill_name), {'users_offering': 0, 'users_wanting': 0, 'total_swaps': 0})
+        counters[field] += 1
+
+    users = {}
+    offered_names = {}
+    for index in range(shard * SHARD_USERS, min(scale, (shard + 1) * SHARD_USERS)):
+        user_id = user_id_for(index)
+        created_at = as_of - timedelta(days=365 * rng.random())
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        user_data = new_user_doc(user_id, f"{user_id}@example.com", name, rng.choice(CITIES), created_at)
+        user_data['availability'] = rng.choice(AVAILABILITY)
+        user_data['profile_visibility'] = 'public' if rng.random() < 0.9 else 'private'
+        user_data['role'] = 'admin' if rng.random() < 0.01 else 'user'
+        if rng.random() < 0.02:
+            user_data.update(is_banned=True, ban_reason='Spam', banned_until=as_of + timedelta(days=30))
+        user_data['last_login'] = _between(rng, created_at, as_of)
+        users[user_id] = user_data
+
+        for skill_type in ('offered', 'wanted'):
+            picks = {skill[1] for skill in rng.choices(skills, cum_weights=cum_weights, k=rng.randint(1, 3))}
+            for skill_name in sorted(picks):
+                user_skill = new_user_skill_doc(user_id, skill_name, skill_type, rng.choice(PROFICIENCY_LEVELS), '', created_at)
+                docs['user_skills'].append((user_skill['user_skill_id'], user_skill))
+                tally(skill_name, 'users_offering' if skill_type == 'offered' else 'users_wanting')
+                name_field = USER_SKILL_NAME_FIELDS[skill_type]
+                user_data[name_field] = merge_skill_names(user_data[name_field], [skill_name])
+                if skill_type == 'offered':
+                    offered_names.setdefault(user_id, []).append(skill_name)
+
+    user_ids = list(users)
+    ratings = {}
+    for sender_id in user_ids if len(user_ids) > 1 else []:
+        for k in range(_weighted(rng, REQUESTS_SENT_WEIGHTS)):
+            receiver_id = rng.choice(user_ids)
+            while receiver_id == sender_id:
+                receiver_id = rng.choice(user_ids)
+            status = _weighted(rng, REQUEST_STATUS_WEIGHTS)
+
+            # Pending requests are recent; the rest are spread since both users joined
+            if status == 'pending':
+                created_at = as_of - timedelta(days=7 * rng.random())
+            else:
+                created_at = _between(rng, max(users[sender_id]['created_at'], users[receiver_id]['created_at']), as_of)
+
+            request_id = f"req_{sender_id}_{k}"
+            request_data = new_barter_request_doc(
+                sender_id, receiver_id, rng.choice(offered_names[sender_id]), rng.choice(offered_names[receiver_id]),
+                "Hi! Would you like to swap skills?", created_at
+            )
+            request_data.update(status=status, expires_at=created_at + timedelta(days=7))
+            if status == 'pending':
+                users[receiver_id]['pending_requests'] += 1
+            else:
+                request_data['responded_at'] = min(as_of, created_at + timedelta(hours=48 * rng.random()))
+                request_data['updated_at'] = request_data['responded_at']
+
+            if status in ('accepted', 'completed'):
+                transaction_id = f"txn_{sender_id}_{k}"
+                request_data['transaction_id'] = transaction_id
+                started_at = request_data['responded_at']
+                transaction_data = new_transaction_doc(request_id, request_data, started_at)
+                transaction_data['expected_end_date'] = started_at + timedelta(weeks=2)
+
+                for user_id in (sender_id, receiver_id):
+                    users[user_id]['total_swaps'] += 1
+                tally(request_data['offered_skill_name'], 'total_swaps')
+                tally(request_data['requested_skill_name'], 'total_swaps')
+
+                if status == 'completed':
+                    ended_at = min(as_of, started_at + timedelta(weeks=4 * rng.random()))
+                    transaction_data.update(
+                        status='completed', actual_end_date=ended_at, user1_confirmed=True, user2_confirmed=True,
+                        completion_percentage=100, updated_at=ended_at
+                    )
+                    for reviewer_id, reviewee_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+                        users[reviewer_id]['successful_swaps'] += 1
+                        if rng.random() < REVIEW_PROBABILITY:
+                            rating = _weighted(rng, RATING_WEIGHTS)
+                            review_data = new_review_doc(reviewer_id, reviewee_id, transaction_id, rating, 'Great swap', '', ended_at)
+                            docs['reviews'].append((f"rev_{transaction_id}_{reviewer_id}", review_data))
+                            ratings.setdefault(reviewee_id, []).append(rating)
+                else:
+                    transaction_data['completion_percentage'] = rng.choice([0, 25, 50, 75])
+
+                docs['transactions'].append((transaction_id, transaction_data))
+
+            docs['barter_requests'].append((request_id, request_data))
+
+    for user_id, user_ratings in ratings.items():
+        users[user_id].update(rating_aggregates(user_ratings))
+    docs['users'] = list(users.items())
+    return docs, skill_tallies
+
+
+def generate_skills(scale, seed=42, as_of=None, skill_tallies=None):
+    """Build the skills documents, with counters summed from every shard's tallies"""
+    as_of = as_of or default_as_of()
+    skills, _ = skill_catalog(scale, seed)
+    skill_tallies = skill_tallies or {}
+    total_users = max(scale, 1)
+
+    docs = []
+    for skill_id, name, category in skills:
+        skill_data = new_skill_doc(name, f"About {name}", category, 'system', as_of - timedelta(days=400))
+        skill_data.update(skill_tallies.get(skill_id, {}))
+        skill_data['popularity_score'] = round((skill_data['users_offering'] + skill_data['users_wanting']) / total_users, 6)
+        docs.append((skill_id, skill_data))
+    return docs
+
+
+def generate_system_messages(as_of=None):
+    as_of = as_of or default_as_of()
+    docs = []
+    for i in range(SYSTEM_MESSAGES):
+        message_data = new_system_message_doc(
+            'admin', f"Notice {i}", 'Synthetic load-test message', 'announcement', as_of, show_until=as_of + timedelta(days=7)
+        )
+        docs.append((f"msg{i}", message_data))
+    return docs
+
+
+def _merge_tallies(total, tallies):
+    for skill_id, counters in tallies.items():
+        merged = total.setdefault(skill_id, {field: 0 for field in counters})
+        for field, value in counters.items():
+            merged[field] += value
+
+
+def write_documents(db, docs_by_collection):
+    """Write {collection: [(doc_id, data)]} through the bulk path, returning counts"""
+    counts = {}
+    for collection, docs in docs_by_collection.items():
+        for start in range(0, len(docs), WRITE_CHUNK):
+            db.put_documents(collection, docs[start:start + WRITE_CHUNK])
+        counts[collection] = len(docs)
+    return counts
+
+
+def _finish(db, scale, seed, as_of, skill_tallies):
+    """Write the catalog-wide documents once every shard is in, then recount stats"""
+    counts = write_documents(db, {
+        'skills': generate_skills(scale, seed, as_of, skill_tallies),
+        'system_messages': generate_system_messages(as_of),
+    })
+    db.rebuild_platform_stats()
+    return counts
+
+
+def seed_database(db, scale, seed=42, as_of=None):
+    """Write a synthetic dataset into an open backend in this process, returning the user ids"""
+    as_of = as_of or default_as_of()
+    catalog = skill_catalog(scale, seed)
+    skill_tallies = {}
+    for shard in range(shard_count(scale)):
+        docs, tallies = generate_shard(scale, shard, seed, as_of, catalog)
+        write_documents(db, docs)
+        _merge_tallies(skill_tallies, tallies)
+    _finish(db, scale, seed, as_of, skill_tallies)
+    return [user_id_for(index) for index in range(scale)]
+
+
+# PARALLEL LOADING
+
+
+_worker_db = None
+
+
+def _init_worker(backend):
+    global _worker_db
+    _worker_db = create_database(None, backend)
+    if not _worker_db.initialize():
+        raise RuntimeError("Database initialization failed")
+
+
+def _load_shard(job):
+    scale, shard, seed, as_of = job
+    docs, tallies = generate_shard(scale, shard, seed, as_of)
+    return write_documents(_worker_db, docs), tallies
+
+
+def load_parallel(scale, seed=42, as_of=None, backend=None, processes=None):
+    """Generate and write shards across worker processes, each with its own connection"""
+    as_of = as_of or default_as_of()
+    processes = processes or multiprocessing.cpu_count()
+    jobs = [(scale, shard, seed, as_of) for shard in range(shard_count(scale))]
+    totals, skill_tallies = {}, {}
+    started = time.monotonic()
+
+    # Workers open their connections before this process opens its own
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(backend,)) as pool:
+        for done, (counts, tallies) in enumerate(pool.imap_unordered(_load_shard, jobs), 1):
+            for collection, count in counts.items():
+                totals[collection] = totals.get(collection, 0) + count
+            _merge_tallies(skill_tallies, tallies)
+            written = sum(totals.values())
+            print(f"  shard {done:>5}/{len(jobs)}  {written:>12,} documents  "
+                  f"({written / (time.monotonic() - started):,.0f}/s)", flush=True)
+
+    db = create_database(None, backend)
+    if not db.initialize():
+        raise RuntimeError("Database initialization failed")
+    totals.update(_finish(db, scale, seed, as_of, skill_tallies))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load deterministic synthetic data into a SkillSwap database")
+    parser.add_argument('--backend', choices=['sqlite', 'firestore'], default=None,
+                        help="Storage backend (defaults to SKILLSWAP_BACKEND)")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--as-of', type=datetime.fromisoformat, default=None,
+                        help="Date the data is generated relative to (defaults to today)")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (defaults to CPU count)")
+    parser.add_argument('--plan', action='store_true', help="Only print the expected document counts")
+    args = parser.parse_args()
+
+    if args.plan:
+        for collection, count in dataset_plan(args.users).items():
+            print(f"  {collection:<16} {count:>12,}")
+        return
+
+    print(f"🌱 Loading {args.users:,} users (seed {args.seed})...")
+    started = time.monotonic()
+    try:
+        totals = load_parallel(args.users, args.seed, args.as_of, args.backend, args.processes)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for collection, count in totals.items():
+        print(f"  {collection:<16} {count:>12,}")
+    print(f"✅ Wrote {sum(totals.values()):,} documents in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()